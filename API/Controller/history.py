@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Dict, List
+
+from Utils.logger import get_logger
+from Utils.storage import get_storage
+from Utils.response import create_response
+from Constant.http import HTTP_STATUS
+
+logger = get_logger(__name__)
+
+class NSEHistoryController:
+    def __init__(self):
+        self.db_manager = get_storage()
+
+    def get_symbol_history(
+        self,
+        symbols: List[str],
+        datasets: List[str],
+        start: datetime,
+        end: datetime,
+        fields: List[str]
+    ) -> Dict:
+        """Column-array time series for symbols across datasets, merged in time order"""
+        try:
+            series = {"dataset": [], "symbol": [], "timestamp": [], **{field: [] for field in fields}}
+            for dataset in datasets:
+                history = self.db_manager.get_symbol_history(
+                    dataset, symbols, start.isoformat(), end.isoformat(), fields
+                )
+                series["dataset"].extend([dataset] * len(history["timestamp"]))
+                for column, values in history.items():
+                    series[column].extend(values)
+
+            if len(datasets) > 1:
+                order = sorted(range(len(series["timestamp"])), key=series["timestamp"].__getitem__)
+                series = {column: [values[index] for index in order] for column, values in series.items()}
+
+            return create_response(
+                success=True,
+                data=series,
+                message=f"Retrieved {len(series['timestamp'])} points",
+                metadata={"start": start.isoformat(), "end": end.isoformat()}
+            )
+        except (KeyError, ValueError) as e:
+            return create_response(
+                success=False,
+                message=f"Invalid history query: {str(e)}",
+                status_code=HTTP_STATUS.BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving symbol history: {str(e)}")
+            return create_response(
+                success=False,
+                message=f"Error retrieving data: {str(e)}",
+                status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,81 @@
+from functools import partial
+from typing import Dict, List
+
+from Utils.logger import get_logger
+from Utils.storage import get_storage
+from Utils.response import create_response
+from Utils.single_flight import SingleFlight
+from Utils.payload_hash import payload_hashes
+from Utils.write_queue import write_queue
+from Services.scrape_engine import scrape_engine, SCRAPE_DATASETS
+from Constant.http import HTTP_STATUS
+
+logger = get_logger(__name__)
+
+class NSEMarketSweepController:
+    def __init__(self):
+        self.db_manager = get_storage()
+        self.sweep_flights = SingleFlight()
+
+    def _save_to_database(self, data: Dict, table_name: str, payload_hash: str = None, on_saved=None) -> bool:
+        """Queue processed data for the write-behind snapshot writer"""
+        if write_queue.enqueue(data, table_name, payload_hash, on_saved):
+            logger.info(f"Data queued for database table: {table_name}")
+            return True
+        return False
+
+    async def sweep(self, datasets: List[str] = None) -> Dict:
+        """Scrape several NSE datasets in one cycle, joining an identical sweep already in flight"""
+        key = ",".join(sorted(set(datasets))) if datasets else "*"
+        return await self.sweep_flights.do(key, self._sweep, datasets)
+
+    async def _sweep(self, datasets: List[str] = None) -> Dict:
+        """Scrape several NSE datasets in one concurrent cycle"""
+        try:
+            results = await scrape_engine.sweep(datasets)
+
+            for dataset, result in results.items():
+                if not result["success"] or result["not_modified"]:
+                    continue
+                table_name = SCRAPE_DATASETS[dataset].get("table")
+                # Only stored payloads may be skipped when unchanged: a dataset without a table
+                # would answer later sweeps with not_modified and no data to fall back on
+                if table_name:
+                    # The writer remembers the hash once the snapshot is committed
+                    remember = partial(payload_hashes.remember, dataset, result["payload_hash"])
+                    result["stored"] = self._save_to_database(
+                        result["data"], table_name, result["payload_hash"], on_saved=remember
+                    )
+
+            failed = [dataset for dataset, result in results.items() if not result["success"]]
+            dropped = [dataset for dataset, result in results.items() if result.get("stored") is False]
+            return create_response(
+                success=len(failed) < len(results),
+                data=results,
+                message=f"Scraped {len(results) - len(failed)} of {len(results)} datasets",
+                errors=[
+                    *(f"{dataset}: {results[dataset]['error']}" for dataset in failed),
+                    *(f"{dataset}: snapshot dropped, write queue is full" for dataset in dropped)
+                ] or None
+            )
+        except ValueError as e:
+            return create_response(
+                success=False,
+                message=str(e),
+                status_code=HTTP_STATUS.BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(f"Error running market sweep: {str(e)}")
+            return create_response(
+                success=False,
+                message=f"Error running market sweep: {str(e)}",
+                status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR
+            )
+
+    def list_datasets(self) -> Dict:
+        """List the datasets available for scraping"""
+        return create_response(
+            success=True,
+            data=scrape_engine.available_datasets(),
+            message="Available NSE datasets"
+        )
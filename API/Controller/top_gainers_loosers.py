@@ -1,15 +1,17 @@
-import requests
 import sqlite3
 import datetime
-import requests
 import json
 
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from Utils.logger import get_logger
-from Utils.db import DatabaseManager
+from Utils.storage import get_storage
 from Utils.response import create_response
-from Services.get_nse_cookies import get_nse_cookies
+from Utils.single_flight import SingleFlight
+from Utils.payload_hash import payload_hashes
+from Utils.write_queue import write_queue
+from Services.nse_client import get_nse_client
+from Services.nse_parsers import parse_gainers_loosers
 from Constant.general import DB_COLLECTIONS, NSE_GET_COOKIES_HEADERS, REQUIRED_NSE_COOKIES
 from Utils.config_reader import ConfigReader
 from Utils.config_reader import configure
@@ -22,67 +24,71 @@ logger = get_logger(__name__)
 
 class NSETopGainersloosersController:
     def __init__(self):
-        self.db_manager = DatabaseManager()
+        self.db_manager = get_storage()
         self.base_url = configure.get('NSE', 'BASE_URL')
         self.nse_headers_url = configure.get('NSE', 'HEADERS_URL_GAINER_LOOSER')
-        self.cookies = None
+        # Concurrent scrapes of the same dataset share one upstream fetch and DB insert
+        self.scrape_flights = SingleFlight()
 
-    def _get_cookies(self):
-        """Get NSE cookies for authenticated requests"""
-        try:
-            if not self.cookies:
-                self.cookies = get_nse_cookies()
-            return self.cookies
-        except Exception as e:
-            logger.error(f"Failed to get NSE cookies: {str(e)}")
-            return None
-        
-    def _make_request(self, url: str, headers: Dict = None) -> Optional[Dict]:
-        """Make HTTP request to NSE API"""
+    async def _make_request(
+        self,
+        url: str,
+        headers: Dict = None,
+        known_hash: str = None
+    ) -> Optional[Tuple[Optional[Dict], str]]:
+        """Make HTTP request to NSE API, returning (data, payload hash); data is None when unchanged"""
         try:
             default_headers = load_nse_headers(self.nse_headers_url)
             
             if headers:
                 default_headers.update(headers)
                 
-            cookies = self._get_cookies()
-            
-            response = requests.get(
-                url, 
-                headers=default_headers, 
-                cookies=cookies,
-                timeout=configure.getint('SCRAPING', 'TIMEOUT')
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Request failed with status code: {response.status_code}")
-                return None
+            return await get_nse_client().get_payload(url, headers=default_headers, known_hash=known_hash)
                 
         except Exception as e:
             logger.error(f"Request failed: {str(e)}")
             return None
     
-    def scrape_top_gainers(self) -> Dict:
+    async def scrape_top_gainers(self) -> Dict:
+        """Scrape top gainers data from NSE, joining any scrape already in flight"""
+        return await self.scrape_flights.do("top_gainers", self._scrape_top_gainers)
+
+    async def _scrape_top_gainers(self) -> Dict:
         """Scrape top gainers data from NSE"""
         try:
             url = f"{self.base_url}/api/live-analysis-variations?index=gainers"
             logger.info(f"Scraping top gainers from: {url}")
             
-            data = self._make_request(url)
-            if data:
+            payload = await self._make_request(url, known_hash=payload_hashes.get("gainers"))
+            if payload and payload[0] is None:
+                # Byte-identical to the last stored payload: nothing to parse or insert
+                logger.info("Top gainers payload unchanged since last scrape")
+                return create_response(
+                    success=True,
+                    message="Top gainers data not modified since last scrape",
+                    status_code=HTTP_STATUS.NOT_MODIFIED,
+                    metadata={"not_modified": True, "payload_hash": payload[1]}
+                )
+            if payload and payload[0]:
+                data, payload_hash = payload
+
                 # Process and clean the data
                 processed_data = self._process_gainers_loosers_data(data, "gainers")
                 
-                # Save to database
-                self._save_to_database(processed_data, "top_gainers")
+                # Queue for the snapshot writer; the hash is remembered once the snapshot is committed
+                stored = self._save_to_database(
+                    processed_data, "top_gainers", payload_hash,
+                    on_saved=lambda: payload_hashes.remember("gainers", payload_hash)
+                )
                 
                 logger.info(f"Successfully scraped {len(processed_data.get('data', []))} top gainers")
                 return create_response(
                     success=True,
                     data=processed_data,
-                    message="Top gainers data retrieved successfully"
+                    message="Top gainers data retrieved successfully" if stored
+                        else "Top gainers data retrieved but not stored: write queue is full",
+                    errors=None if stored else ["Snapshot dropped: write queue is full"],
+                    metadata={"stored": stored}
                 )
             else:
                 return create_response(
@@ -99,25 +105,46 @@ class NSETopGainersloosersController:
                 status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR
             )
 
-    def scrape_top_loosers(self) -> Dict:
+    async def scrape_top_loosers(self) -> Dict:
+        """Scrape top loosers data from NSE, joining any scrape already in flight"""
+        return await self.scrape_flights.do("top_loosers", self._scrape_top_loosers)
+
+    async def _scrape_top_loosers(self) -> Dict:
         """Scrape top loosers data from NSE"""
         try:
             url = f"{self.base_url}/api/live-analysis-variations?index=loosers"
             logger.info(f"Scraping top loosers from: {url}")
             
-            data = self._make_request(url)
-            if data:
+            payload = await self._make_request(url, known_hash=payload_hashes.get("loosers"))
+            if payload and payload[0] is None:
+                # Byte-identical to the last stored payload: nothing to parse or insert
+                logger.info("Top loosers payload unchanged since last scrape")
+                return create_response(
+                    success=True,
+                    message="Top loosers data not modified since last scrape",
+                    status_code=HTTP_STATUS.NOT_MODIFIED,
+                    metadata={"not_modified": True, "payload_hash": payload[1]}
+                )
+            if payload and payload[0]:
+                data, payload_hash = payload
+
                 # Process and clean the data
                 processed_data = self._process_gainers_loosers_data(data, "loosers")
                 
-                # Save to database
-                self._save_to_database(processed_data, "top_loosers")
+                # Queue for the snapshot writer; the hash is remembered once the snapshot is committed
+                stored = self._save_to_database(
+                    processed_data, "top_loosers", payload_hash,
+                    on_saved=lambda: payload_hashes.remember("loosers", payload_hash)
+                )
                 
                 logger.info(f"Successfully scraped {len(processed_data.get('data', []))} top loosers")
                 return create_response(
                     success=True,
                     data=processed_data,
-                    message="Top loosers data retrieved successfully"
+                    message="Top loosers data retrieved successfully" if stored
+                        else "Top loosers data retrieved but not stored: write queue is full",
+                    errors=None if stored else ["Snapshot dropped: write queue is full"],
+                    metadata={"stored": stored}
                 )
             else:
                 return create_response(
@@ -136,53 +163,14 @@ class NSETopGainersloosersController:
     
     def _process_gainers_loosers_data(self, raw_data: Dict, data_type: str) -> Dict:
         """Process and clean gainers/loosers data"""
-        try:
-            processed_data = {
-                "timestamp": datetime.now().isoformat(),
-                "data_type": data_type,
-                "legends": raw_data.get("legends", []),
-                "data": []
-            }
-            
-            # Process each category (NIFTY, BANKNIFTY, etc.)
-            for category, category_data in raw_data.items():
-                if category == "legends":
-                    continue
-                    
-                if isinstance(category_data, dict) and "data" in category_data:
-                    for stock in category_data["data"]:
-                        processed_stock = {
-                            "category": category,
-                            "symbol": stock.get("symbol"),
-                            "series": stock.get("series"),
-                            "open_price": stock.get("open_price"),
-                            "high_price": stock.get("high_price"),
-                            "low_price": stock.get("low_price"),
-                            "ltp": stock.get("ltp"),
-                            "prev_price": stock.get("prev_price"),
-                            "net_price": stock.get("net_price"),
-                            "per_change": stock.get("perChange"),
-                            "trade_quantity": stock.get("trade_quantity"),
-                            "turnover": stock.get("turnover"),
-                            "market_type": stock.get("market_type"),
-                            "ca_ex_dt": stock.get("ca_ex_dt"),
-                            "ca_purpose": stock.get("ca_purpose")
-                        }
-                        processed_data["data"].append(processed_stock)
-            
-            return processed_data
-            
-        except Exception as e:
-            logger.error(f"Error processing {data_type} data: {str(e)}")
-            return {"timestamp": datetime.now().isoformat(), "data_type": data_type, "data": []}
+        return parse_gainers_loosers(raw_data, data_type)
 
-    def _save_to_database(self, data: Dict, table_name: str):
-        """Save processed data to database"""
-        try:
-            self.db_manager.save_data(data, table_name)
-            logger.info(f"Data saved to database table: {table_name}")
-        except Exception as e:
-            logger.error(f"Failed to save data to database: {str(e)}")
+    def _save_to_database(self, data: Dict, table_name: str, payload_hash: str = None, on_saved=None) -> bool:
+        """Queue processed data for the write-behind snapshot writer"""
+        if write_queue.enqueue(data, table_name, payload_hash, on_saved):
+            logger.info(f"Data queued for database table: {table_name}")
+            return True
+        return False
 
     def get_top_gainers_from_db(self, limit: int = 50) -> Dict:
         """Get top gainers data from database"""
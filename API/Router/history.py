@@ -0,0 +1,41 @@
+from datetime import datetime, time
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from API.Controller.history import NSEHistoryController
+from Utils.verify_token import verify_token
+from Constant.http import HTTP_STATUS
+
+router = APIRouter()
+controller = NSEHistoryController()
+
+def _split(value: str):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+@router.get("/history")
+def get_symbol_history(
+    symbols: str = Query(..., description="Comma separated symbols, e.g. RELIANCE,TCS"),
+    datasets: str = Query("top_gainers,top_loosers", description="Comma separated tables to search"),
+    fields: str = Query("ltp,per_change", description="Comma separated columns to return"),
+    start: Optional[datetime] = Query(None, description="Range start (default: today 00:00)"),
+    end: Optional[datetime] = Query(None, description="Range end (default: now)"),
+    token: str = Depends(verify_token)
+):
+    """
+    Intraday time series for one or more symbols, returned as column arrays
+
+    Parameters:
+    - symbols: Symbols to chart
+    - datasets: Tables to read (default: top_gainers,top_loosers)
+    - fields: Columns to return for each point (default: ltp,per_change)
+    - start / end: ISO datetimes bounding the range
+    - token: Authentication token
+    """
+    try:
+        start = start or datetime.combine(datetime.now().date(), time.min)
+        end = end or datetime.now()
+        return controller.get_symbol_history(_split(symbols), _split(datasets), start, end, _split(fields))
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
+            detail=f"Failed to retrieve symbol history: {str(e)}"
+        )
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from API.Controller.market_sweep import NSEMarketSweepController
+from Utils.verify_token import verify_token
+from Utils.response import json_response
+from Constant.http import HTTP_STATUS
+
+router = APIRouter()
+controller = NSEMarketSweepController()
+
+@router.get("/market/sweep")
+async def market_sweep(
+    datasets: Optional[str] = Query(None, description="Comma separated dataset names (default: all)"),
+    token: str = Depends(verify_token)
+):
+    """
+    Scrape several NSE datasets concurrently in one cycle
+    Requires valid authentication token
+    """
+    try:
+        selected = [name.strip() for name in datasets.split(",") if name.strip()] if datasets else None
+        return json_response(await controller.sweep(selected))
+    except Exception as e:
+        raise HTTPException(
+            status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
+            detail=f"Failed to run market sweep: {str(e)}"
+        )
+
+@router.get("/market/datasets")
+def list_datasets(token: str = Depends(verify_token)):
+    """
+    List the NSE datasets available for scraping
+    """
+    return controller.list_datasets()
@@ -3,8 +3,10 @@ from typing import Optional
 from API.Controller.top_gainers_loosers import NSETopGainersloosersController
 from Utils.verify_token import verify_token
 # from Utils.verify_token import verify_token
-from Utils.response import create_response
+from Utils.response import create_response, json_response
 from Constant.http import HTTP_STATUS
+from Services.cookie_manager import cookie_manager
+from Utils.write_queue import write_queue
 
 router = APIRouter()
 controller = NSETopGainersloosersController()
@@ -16,8 +18,8 @@ async def scrape_top_gainers(token: str = Depends(verify_token)):
     Requires valid authentication token
     """
     try:
-        result = controller.scrape_top_gainers()
-        return result
+        result = await controller.scrape_top_gainers()
+        return json_response(result)
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
@@ -31,8 +33,8 @@ async def scrape_top_looser(token: str = Depends(verify_token)):
     Requires valid authentication token
     """
     try:
-        result = controller.scrape_top_loosers()
-        return result
+        result = await controller.scrape_top_loosers()
+        return json_response(result)
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
@@ -40,7 +42,7 @@ async def scrape_top_looser(token: str = Depends(verify_token)):
         )
 
 @router.get("/top-gainers")
-async def get_top_gainers(
+def get_top_gainers(
     limit: Optional[int] = Query(50, ge=1, le=100, description="Number of records to return"),
     token: str = Depends(verify_token)
 ):
@@ -48,14 +50,14 @@ async def get_top_gainers(
     Get top gainers data from database
     
     Parameters:
-    - limit: Number of records to return (1-100, default: 50)
+    - limit: Number of records to return (1-100, default: 50); whole snapshots only, the latest is always complete
     - token: Authentication token
     """
     try:
         result = controller.get_top_gainers_from_db(limit=limit)
         print(f"🔍 Retrieved {len(result)} top gainers from database")
         print(f"🔍 Limit applied: {limit}, data: {result}")
-        return result
+        return json_response(result)
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
@@ -63,7 +65,7 @@ async def get_top_gainers(
         )
 
 @router.get("/top-looser")
-async def get_top_looser(
+def get_top_looser(
     limit: Optional[int] = Query(50, ge=1, le=100, description="Number of records to return"),
     token: str = Depends(verify_token)
 ):
@@ -71,12 +73,12 @@ async def get_top_looser(
     Get top looser data from database
     
     Parameters:
-    - limit: Number of records to return (1-100, default: 50)
+    - limit: Number of records to return (1-100, default: 50); whole snapshots only, the latest is always complete
     - token: Authentication token
     """
     try:
         result = controller.get_top_loosers_from_db(limit=limit)
-        return result
+        return json_response(result)
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
@@ -90,17 +92,17 @@ async def refresh_gainers_looser_data(token: str = Depends(verify_token)):
     Requires valid authentication token
     """
     try:
-        gainers_result = controller.scrape_top_gainers()
-        looser_result = controller.scrape_top_loosers()
+        gainers_result = await controller.scrape_top_gainers()
+        looser_result = await controller.scrape_top_loosers()
 
-        return create_response(
+        return json_response(create_response(
             success=True,
             data={
                 "gainers": gainers_result,
                 "looser": looser_result
             },
             message="Top gainers and looser data refreshed successfully"
-        )
+        ))
     except Exception as e:
         raise HTTPException(
             status_code=HTTP_STATUS.INTERNAL_SERVER_ERROR,
@@ -114,6 +116,11 @@ async def health_check():
     """
     return create_response(
         success=True,
-        data={"status": "healthy", "service": "top_gainers_looser"},
+        data={
+            "status": "healthy",
+            "service": "top_gainers_looser",
+            "cookies": cookie_manager.status(),
+            "write_queue": write_queue.status()
+        },
         message="Top gainers/looser service is running"
     )
@@ -47,6 +47,7 @@ NSE_GET_COOKIES_HEADERS = {
 # NSE API paths
 NSE_API_PATHS = {
     "gainers_loosers": "/api/live-analysis-variations",
+    "all_indices": "/api/allIndices",
     "equity_master": "/api/equity-master",
     "equity_indices": "/api/equity-stockIndices",
     "most_active_securities": "/api/live-analysis-most-active-securities",
@@ -186,3 +187,4 @@ ERROR_MESSAGES = {
 # Database types
 DB_SQLITE = "sqlite"
 DB_MONGODB = "mongodb"
+DB_MEMORY = "memory"
@@ -1,16 +1,48 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from API.Router import top_gainers_loosers
+from API.Router import top_gainers_loosers, market_sweep, history
+from Services.nse_client import nse_client
+from Services.cookie_manager import cookie_manager
+from Utils.write_queue import write_queue
+from Utils.payload_hash import payload_hashes
+from Services.scrape_engine import scrape_engine
+from Services.retention import retention_engine
+from Services.archive import snapshot_archive
 import threading
 # from Services.cron_jobs_top_gainer_looser import job as run_gainers_loosers_cron
 
 
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive NSE client shared by every controller
+    await nse_client.start()
+    # Keep NSE cookies warm off the request path
+    cookie_manager.start()
+    # Snapshots are persisted by one writer thread, off the scrape path
+    write_queue.start()
+    # Skip payloads identical to what was stored before the restart
+    payload_hashes.seed(write_queue.db_manager, scrape_engine.stored_datasets())
+    # Weekly rollup and compaction of old snapshots
+    retention_engine.start()
+    # Daily Parquet archive of stored snapshots
+    snapshot_archive.start()
+    yield
+    snapshot_archive.stop()
+    retention_engine.stop()
+    cookie_manager.stop()
+    await nse_client.close()
+    # Flush queued snapshots before exit
+    write_queue.stop()
+
+
 app = FastAPI(
     title="NSE Scraper API",
     description="Scrape and serve NSE top gainers and loosers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -26,6 +58,8 @@ app.add_middleware(
 
 # Include all routers
 app.include_router(top_gainers_loosers.router)
+app.include_router(market_sweep.router)
+app.include_router(history.router)
 
 
 
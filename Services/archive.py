@@ -0,0 +1,183 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+from Utils.db import SQLITE_SYMBOL_COLUMNS
+from Utils.storage import SnapshotStorage, get_storage
+
+logger = get_logger(__name__)
+
+# Hive-style date=YYYY-MM-DD directories; kept as strings so range filters compare lexically
+ARCHIVE_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+class SnapshotArchive:
+    """
+    Date-partitioned Parquet archive of stored snapshots
+
+    A daily job copies each day's snapshots out of the database; analytical reads go
+    to the Parquet files with partition, row and column pruning instead of the live DB.
+    """
+
+    def __init__(self, root: str = None, db_manager_factory=None):
+        self.root = root or configure.get('ARCHIVE', 'PATH', fallback='archive')
+        self.db_manager_factory = db_manager_factory or get_storage
+        self.tables = [
+            table.strip()
+            for table in configure.get('ARCHIVE', 'TABLES', fallback='top_gainers, top_loosers, all_indexes').split(',')
+            if table.strip()
+        ]
+        self.backup_time = configure.get('CRON_JOBS', 'DAILY_BACKUP_TIME', fallback='18:00')
+        self._db_manager = None
+        self._scheduler: Optional[BackgroundScheduler] = None
+        self._run_lock = threading.Lock()
+        self._last_run: Optional[Dict] = None
+
+    @property
+    def db_manager(self) -> SnapshotStorage:
+        if self._db_manager is None:
+            self._db_manager = self.db_manager_factory()
+        return self._db_manager
+
+    def partition_path(self, table_name: str, day: date) -> str:
+        return os.path.join(self.root, table_name, f"date={day.isoformat()}", "data.parquet")
+
+    def archived_days(self, table_name: str) -> List[date]:
+        """Days that already have a partition, oldest first"""
+        table_root = os.path.join(self.root, table_name)
+        if not os.path.isdir(table_root):
+            return []
+        return sorted(
+            date.fromisoformat(name.split("=", 1)[1])
+            for name in os.listdir(table_root) if name.startswith("date=")
+        )
+
+    def archive_day(self, table_name: str, day: date) -> int:
+        """Write one day's snapshots of a table to its partition, replacing it; returns rows written"""
+        start = datetime.combine(day, datetime.min.time())
+        rows = self.db_manager.get_snapshots_between(
+            table_name, start.isoformat(), (start + timedelta(days=1)).isoformat()
+        )
+        if not rows:
+            return 0
+        path = self.partition_path(table_name, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename, so a reader never opens a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            pd.DataFrame(rows).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return len(rows)
+
+    def run(self, today: date = None) -> Dict:
+        """Archive every day not yet archived, re-writing the newest archived day and today"""
+        with self._run_lock:
+            today = today or date.today()
+            summary = {"started_at": datetime.now().isoformat(), "datasets": {}, "errors": []}
+            for table_name in self.tables:
+                try:
+                    archived = self.archived_days(table_name)
+                    if archived:
+                        # The newest partition may have been written before its day ended
+                        first_day = archived[-1]
+                    else:
+                        oldest, _ = self.db_manager.get_snapshot_bounds(table_name)
+                        if oldest is None:
+                            continue
+                        first_day = date.fromisoformat(oldest[:10])
+                    written = {}
+                    day = first_day
+                    while day <= today:
+                        rows = self.archive_day(table_name, day)
+                        if rows:
+                            written[day.isoformat()] = rows
+                        day += timedelta(days=1)
+                    summary["datasets"][table_name] = written
+                except Exception as e:
+                    logger.error(f"Failed to archive {table_name}: {e}")
+                    summary["errors"].append(f"{table_name}: {e}")
+            summary["finished_at"] = datetime.now().isoformat()
+            self._last_run = summary
+            logger.info(f"Archive run finished: {summary['datasets']}")
+            return summary
+
+    def read(
+        self,
+        table_name: str,
+        start_date: date,
+        end_date: date,
+        symbols: List[str] = None,
+        columns: List[str] = None
+    ) -> pd.DataFrame:
+        """Load archived rows for [start_date, end_date], optionally filtered by symbol and pruned to columns"""
+        table_root = os.path.join(self.root, table_name)
+        if not os.path.isdir(table_root):
+            return pd.DataFrame(columns=columns)
+        symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+        dataset = ds.dataset(table_root, format="parquet", partitioning=ARCHIVE_PARTITIONING)
+        # A column that was all null (or all integer) on one day must still read alongside other days
+        schema = pa.unify_schemas(
+            [fragment.physical_schema for fragment in dataset.get_fragments()] + [ARCHIVE_PARTITIONING.schema],
+            promote_options="permissive"
+        )
+        dataset = ds.dataset(table_root, schema=schema, format="parquet", partitioning=ARCHIVE_PARTITIONING)
+        condition = (ds.field("date") >= start_date.isoformat()) & (ds.field("date") <= end_date.isoformat())
+        if symbols:
+            condition &= ds.field(symbol_column).isin(symbols)
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+    def start(self):
+        """Schedule the daily run at DAILY_BACKUP_TIME"""
+        if self._scheduler is not None:
+            return
+        hour, minute = (int(part) for part in self.backup_time.split(':'))
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(
+            self.run,
+            CronTrigger(hour=hour, minute=minute),
+            id="daily-archive",
+            coalesce=True,
+            max_instances=1
+        )
+        self._scheduler.start()
+        logger.info(f"Snapshot archive scheduled daily at {self.backup_time}")
+
+    def stop(self):
+        """Stop the scheduler, letting a run in progress finish"""
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=True)
+            self._scheduler = None
+        if self._db_manager is not None:
+            self._db_manager.close_connection()
+            self._db_manager = None
+
+    def status(self) -> Dict:
+        """Next scheduled run and the last run's summary"""
+        job = self._scheduler.get_job("daily-archive") if self._scheduler is not None else None
+        return {
+            "next_run": job.next_run_time.isoformat() if job and job.next_run_time else None,
+            "last_run": self._last_run
+        }
+
+snapshot_archive = SnapshotArchive()
+
+def read_archive(
+    table_name: str,
+    start_date: date,
+    end_date: date,
+    symbols: List[str] = None,
+    columns: List[str] = None
+) -> pd.DataFrame:
+    """Load archived snapshots of a table for a date range (see SnapshotArchive.read)"""
+    return snapshot_archive.read(table_name, start_date, end_date, symbols, columns)
@@ -0,0 +1,224 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+from Services.get_nse_cookies import cookie_service
+
+logger = get_logger(__name__)
+
+class NSECookieManager:
+    """
+    Keep a valid NSE cookie jar warm in a background thread
+
+    Request handlers only read the current jar through get_cookies(); the browser
+    harvest always runs on the refresher thread, ahead of the jar's expiry.
+    Worker processes share the jar through the service's cookie store: one worker
+    holds the refresh lock and the others adopt the jar it publishes.
+    """
+
+    def __init__(self, service=cookie_service):
+        self.service = service
+        self.refresh_margin = configure.getint('COOKIES', 'REFRESH_MARGIN', fallback=300)
+        self.retry_interval = configure.getint('COOKIES', 'RETRY_INTERVAL', fallback=60)
+        # How often readers look for a jar published by another worker, in seconds
+        self.store_check_interval = configure.getfloat('COOKIES', 'STORE_CHECK_INTERVAL', fallback=1)
+        self._cookies: Optional[Dict[str, str]] = None
+        self._expiry = 0.0
+        self._next_attempt = 0.0
+        self._last_refresh: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        # Notified after every refresh attempt so request-path waiters can resume
+        self._refreshed = threading.Condition(self._lock)
+        self._refresh_attempts = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._store_mtime: Optional[float] = None
+        self._last_store_check = 0.0
+        self._rejected: Optional[Dict[str, str]] = None
+
+    def start(self):
+        """Start the background refresher (called once at application startup)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="nse-cookie-manager", daemon=True)
+            self._thread.start()
+        logger.info("NSE cookie manager started")
+
+    def stop(self, timeout: float = 5):
+        """Stop the background refresher"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.service.close_browser()
+        logger.info("NSE cookie manager stopped")
+
+    def get_cookies(self) -> Optional[Dict[str, str]]:
+        """Return the current cookie jar without ever blocking on a refresh"""
+        if self._thread is None:
+            self.start()
+        self._sync_from_store()
+        with self._lock:
+            return self._cookies if time.time() < self._expiry else None
+
+    def _sync_from_store(self):
+        """Adopt a jar another worker published, checking the store at most every store_check_interval"""
+        now = time.monotonic()
+        if now - self._last_store_check < self.store_check_interval:
+            return
+        self._last_store_check = now
+        mtime = self.service.store.mtime()
+        if mtime is not None and mtime != self._store_mtime:
+            self._adopt_stored(validate=False)
+
+    def invalidate(self, stale_cookies: Optional[Dict[str, str]]):
+        """
+        Drop a jar NSE has rejected and schedule an immediate refresh
+
+        Only the jar that was actually used is dropped, so many requests failing on
+        the same jar cause one refresh, and a jar already replaced is left alone.
+        """
+        if not stale_cookies:
+            return
+        with self._lock:
+            if self._cookies != stale_cookies:
+                return
+            self._cookies = None
+            self._expiry = 0
+            self._next_attempt = 0
+            # Never re-adopt this jar from the shared store
+            self._rejected = stale_cookies
+        logger.warning("NSE cookies rejected, refreshing")
+        self._wake.set()
+
+    def mark_valid(self, cookies: Optional[Dict[str, str]]):
+        """A successful data fetch proves the jar is valid, skip re-validating it"""
+        if cookies:
+            self.service.mark_valid(cookies)
+
+    def wait_for_cookies(self, timeout: float) -> Optional[Dict[str, str]]:
+        """Block until a jar is available or the next refresh attempt finishes (request retry path)"""
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            attempts = self._refresh_attempts
+            self._refreshed.wait_for(
+                lambda: self._cookies is not None or self._refresh_attempts != attempts,
+                timeout
+            )
+            return self._cookies if time.time() < self._expiry else None
+
+    def status(self) -> Dict:
+        """Current jar state for health reporting"""
+        with self._lock:
+            return {
+                "has_cookies": self._cookies is not None and time.time() < self._expiry,
+                "expires_in": max(0, round(self._expiry - time.time())),
+                "last_refresh": self._last_refresh,
+                "last_error": self._last_error,
+                "tiers": self.service.get_tier_stats()
+            }
+
+    def _set_jar(self, cookies: Dict[str, str], expiry: float):
+        with self._lock:
+            self._cookies = cookies
+            self._expiry = expiry
+            self._last_refresh = datetime.now().isoformat()
+            self._last_error = None
+
+    def _adopt_stored(self, validate: bool) -> bool:
+        """Adopt the unexpired jar in the shared store unless it is the one we hold or rejected"""
+        mtime = self.service.store.mtime()
+        record = self.service.load_cookie_record()
+        self._store_mtime = mtime
+        if not record or record["expiry"] - time.time() <= self.refresh_margin:
+            return False
+        cookies = record["cookies"]
+        with self._lock:
+            if cookies == self._cookies or cookies == self._rejected:
+                return False
+        if validate and not self.service.validate_cookies(cookies):
+            return False
+        self._set_jar(cookies, record["expiry"])
+        logger.info("Adopted stored NSE cookies")
+        return True
+
+    def _wait_for_peer_refresh(self) -> bool:
+        """Wait for the worker holding the refresh lock to publish its jar"""
+        deadline = time.monotonic() + self.service.store.lock_lease
+        while time.monotonic() < deadline and not self._stop.is_set():
+            if self.service.store.mtime() != self._store_mtime and self._adopt_stored(validate=False):
+                return True
+            self._stop.wait(0.5)
+        return False
+
+    def refresh(self) -> bool:
+        """Harvest a fresh jar (blocking, runs on the refresher thread)"""
+        try:
+            return self._refresh()
+        finally:
+            with self._lock:
+                self._refresh_attempts += 1
+                self._refreshed.notify_all()
+
+    def _refresh(self) -> bool:
+        store = self.service.store
+        try:
+            # Another worker may already have published a newer jar
+            if self._adopt_stored(validate=False):
+                return True
+
+            if not store.try_acquire_refresh_lock():
+                logger.info("Another worker is refreshing NSE cookies, waiting for its jar")
+                if self._wait_for_peer_refresh():
+                    return True
+                with self._lock:
+                    self._last_error = "Timed out waiting for another worker's cookie refresh"
+            else:
+                try:
+                    cookies = self.service.refresh_cookies(save=False)
+                    if cookies and self.service.validate_cookies(cookies):
+                        # Only validated jars are published to the other workers
+                        record = self.service.save_cookies(cookies)
+                        self._store_mtime = store.mtime()
+                        expiry = record["expiry"] if record else time.time() + self.service.cookie_expiry
+                        self._set_jar(cookies, expiry)
+                        logger.info("NSE cookies refreshed in background")
+                        return True
+                finally:
+                    store.release_refresh_lock()
+                with self._lock:
+                    self._last_error = "Unable to obtain valid cookies"
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+            logger.error(f"Background cookie refresh failed: {e}")
+        # Back off after a failed harvest instead of relaunching Chrome in a tight loop
+        self._next_attempt = time.time() + self.retry_interval
+        return False
+
+    def _seconds_until_refresh(self) -> float:
+        with self._lock:
+            due = self._expiry - self.refresh_margin if self._cookies is not None else 0
+        return max(0, due - time.time(), self._next_attempt - time.time())
+
+    def _run(self):
+        self._adopt_stored(validate=True)
+
+        while not self._stop.is_set():
+            delay = self._seconds_until_refresh()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            self.refresh()
+
+cookie_manager = NSECookieManager()
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+
+logger = get_logger(__name__)
+
+class SharedCookieStore:
+    """
+    Cookie jar file shared by every worker process
+
+    Writes go to a temp file that is atomically renamed over the jar, so readers never
+    see half-written JSON. A lock file elects the single worker allowed to refresh.
+    """
+
+    def __init__(self, cookies_file: str):
+        self.cookies_file = cookies_file
+        self.lock_file = f"{cookies_file}.lock"
+        # A lock older than this is treated as left behind by a crashed worker
+        self.lock_lease = configure.getint('COOKIES', 'REFRESH_LOCK_LEASE', fallback=120)
+
+    def write(self, record: Dict):
+        """Atomically replace the stored jar"""
+        tmp_file = f"{self.cookies_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(record, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.cookies_file)
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def read(self) -> Optional[Dict]:
+        """Read the stored jar record, None when missing"""
+        if not os.path.exists(self.cookies_file):
+            return None
+        with open(self.cookies_file, "r") as f:
+            return json.load(f)
+
+    def mtime(self) -> Optional[float]:
+        """Modification time of the stored jar, None when missing"""
+        try:
+            return os.stat(self.cookies_file).st_mtime
+        except OSError:
+            return None
+
+    def try_acquire_refresh_lock(self) -> bool:
+        """Try to become the one worker refreshing cookies; never blocks"""
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, "w") as f:
+                    f.write(f"{os.getpid()} {time.time()}")
+                return True
+            except FileExistsError:
+                try:
+                    seen = self._lock_state(self.lock_file)
+                except OSError:
+                    continue  # Released between the two calls, try again
+                age = time.time() - seen[1] / 1e9
+                if age < self.lock_lease:
+                    return False
+                logger.warning(f"Breaking stale cookie refresh lock ({age:.0f}s old)")
+                if not self._break_stale_lock(seen):
+                    return False
+        return False
+
+    def _lock_state(self, path: str) -> Tuple[str, int]:
+        """Owner line and mtime of a lock file, which together tell one lock from the next"""
+        with open(path, "r") as f:
+            return f.read(), os.stat(path).st_mtime_ns
+
+    def _break_stale_lock(self, seen: Tuple[str, int]) -> bool:
+        """
+        Remove the lock only if it is still the stale one seen
+
+        The lock is first renamed aside, which only one worker can do, and checked there:
+        a worker that broke and re-took it in between gets its lock handed back.
+        """
+        stale_file = f"{self.lock_file}.{os.getpid()}.stale"
+        try:
+            os.replace(self.lock_file, stale_file)
+        except OSError:
+            return False  # Another worker broke or released it first
+        try:
+            moved = self._lock_state(stale_file)
+            if moved == seen:
+                return True
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, "w") as f:
+                    f.write(moved[0])
+            except FileExistsError:
+                pass
+            return False
+        finally:
+            os.remove(stale_file)
+
+    def release_refresh_lock(self):
+        """Release the refresh lock taken by this process"""
+        try:
+            with open(self.lock_file, "r") as f:
+                owner = f.read().split(" ")[0]
+            if owner == str(os.getpid()):
+                os.remove(self.lock_file)
+        except OSError as e:
+            logger.warning(f"Failed to release cookie refresh lock: {e}")
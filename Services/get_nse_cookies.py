@@ -1,6 +1,8 @@
 import os
 import json
 import time
+import hashlib
+import threading
 from datetime import datetime
 from typing import Dict, Optional
 
@@ -8,7 +10,10 @@ import requests
 import undetected_chromedriver as uc
 from Utils.logger import get_logger
 from Utils.config_reader import configure
-from Constant.general import NSE_GET_COOKIES_HEADERS, REQUIRED_NSE_COOKIES
+from Constant.general import NSE_GET_COOKIES_HEADERS, NSE_API_PATHS, REQUIRED_NSE_COOKIES
+from Services.nse_parsers import parse_all_indices
+from Services.cookie_store import SharedCookieStore
+from Utils.write_queue import write_queue
 
 # Prevent destructor re-quit errors on Windows
 uc.Chrome.__del__ = lambda self: None
@@ -20,7 +25,36 @@ class NSECookieService:
         self.cookies_url = configure.get('NSE', 'NSE_GET_COOKIES_URL')
         self.base_url = configure.get('NSE', 'BASE_URL')
         self.cookies_file = configure.get('NSE', 'COOKIES_FILE')
-        self.session = requests.Session()
+        self.cookie_expiry = configure.getint('COOKIES', 'EXPIRY', fallback=3600)
+        self.store = SharedCookieStore(self.cookies_file)
+        self.validation_ttl = configure.getint('COOKIES', 'VALIDATION_TTL', fallback=300)
+        # Harvest finishes as soon as these cookies are present, or after the timeout
+        self.min_required_cookies = [
+            name.strip() for name in configure.get('COOKIES', 'MIN_REQUIRED_COOKIES', fallback='').split(',')
+            if name.strip()
+        ] or REQUIRED_NSE_COOKIES
+        self.harvest_timeout = configure.getfloat('COOKIES', 'HARVEST_TIMEOUT', fallback=20)
+        self.harvest_poll_interval = configure.getfloat('COOKIES', 'HARVEST_POLL_INTERVAL', fallback=0.5)
+        # Keep one Chrome process alive across refreshes instead of launching a new one each time
+        self.reuse_browser = configure.getboolean('COOKIES', 'REUSE_BROWSER', fallback=False)
+        self._driver = None
+        self._driver_lock = threading.Lock()
+        # Try a plain requests.Session bootstrap first and fall back to Chrome
+        self.http_bootstrap = configure.getboolean('COOKIES', 'HTTP_BOOTSTRAP', fallback=True)
+        self.http_bootstrap_cookies = [
+            name.strip() for name in configure.get(
+                'COOKIES', 'HTTP_BOOTSTRAP_COOKIES', fallback='nsit,nseappid,AKA_A2,ak_bmsc'
+            ).split(',')
+            if name.strip()
+        ]
+        self.tier_stats = {
+            "http": {"attempts": 0, "successes": 0},
+            "browser": {"attempts": 0, "successes": 0}
+        }
+        self._stats_lock = threading.Lock()
+        # Jar fingerprint -> (is_valid, checked_at)
+        self._validations: Dict[str, tuple] = {}
+        self._validation_lock = threading.Lock()
 
     def get_driver(self):
         logger.info("Launching undetected Chrome...")
@@ -33,80 +67,240 @@ class NSECookieService:
         options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
         return uc.Chrome(options=options, use_subprocess=True)
 
-    def get_nse_cookies(self) -> Optional[Dict[str, str]]:
+    def _acquire_driver(self):
+        """Get a browser for a harvest, reusing the kept-alive one when enabled"""
+        if not self.reuse_browser:
+            return self.get_driver()
+        if self._driver is not None:
+            try:
+                self._driver.current_url  # Raises if the browser died
+                self._driver.delete_all_cookies()  # Force NSE to issue a fresh jar
+                return self._driver
+            except Exception as e:
+                logger.warning(f"Kept-alive browser unusable, relaunching: {e}")
+                self._quit_driver(self._driver)
+        self._driver = self.get_driver()
+        return self._driver
+
+    def _quit_driver(self, driver):
         try:
-            logger.info("Getting fresh NSE cookies...")
-            driver = self.get_driver()
-            driver.get(self.cookies_url)
-            time.sleep(10)  # Allow cookies to be set
-            cookies = driver.get_cookies()
             driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {e}")
+        if driver is self._driver:
+            self._driver = None
 
-            if not cookies:
-                logger.warning("No cookies received")
-                return None
+    def close_browser(self):
+        """Quit the kept-alive browser, if any"""
+        with self._driver_lock:
+            if self._driver is not None:
+                self._quit_driver(self._driver)
+                logger.info("Kept-alive browser closed")
 
-            filtered = {c['name']: c['value'] for c in cookies if c['name'] in REQUIRED_NSE_COOKIES}
-            missing = [name for name in REQUIRED_NSE_COOKIES if name not in filtered]
-            if missing:
-                logger.warning(f"Missing cookies: {missing}")
-            else:
-                logger.info("All required cookies collected")
+    def _wait_for_cookies(self, driver) -> list:
+        """Poll the browser until the required cookies are set or the harvest times out"""
+        deadline = time.monotonic() + self.harvest_timeout
+        while True:
+            cookies = driver.get_cookies()
+            names = {c['name'] for c in cookies}
+            if all(name in names for name in self.min_required_cookies):
+                return cookies
+            if time.monotonic() >= deadline:
+                logger.warning(f"Cookie harvest timed out after {self.harvest_timeout}s")
+                return cookies
+            time.sleep(self.harvest_poll_interval)
+
+    def _record_tier(self, tier: str, success: bool):
+        with self._stats_lock:
+            self.tier_stats[tier]["attempts"] += 1
+            if success:
+                self.tier_stats[tier]["successes"] += 1
 
-            self._save_cookies_to_file(filtered)
+    def get_tier_stats(self) -> Dict[str, Dict[str, int]]:
+        """How often each cookie bootstrap tier was tried and succeeded"""
+        with self._stats_lock:
+            return {tier: dict(stats) for tier, stats in self.tier_stats.items()}
+
+    def _bootstrap_with_http(self) -> Optional[Dict[str, str]]:
+        """Try to obtain a working jar with a plain session GET of the referer page"""
+        try:
+            session = requests.Session()
+            headers = dict(NSE_GET_COOKIES_HEADERS)
+            headers['Accept'] = 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+            session.get(self.cookies_url, headers=headers, timeout=10)
+
+            filtered = {name: value for name, value in session.cookies.items() if name in REQUIRED_NSE_COOKIES}
+            missing = [name for name in self.http_bootstrap_cookies if name not in filtered]
+            if missing:
+                logger.info(f"HTTP cookie bootstrap missing cookies: {missing}")
+                return None
+            if not self.validate_cookies(filtered):
+                logger.info("HTTP cookie bootstrap cookies rejected by NSE")
+                return None
             return filtered
         except Exception as e:
-            logger.error(f"Error in get_nse_cookies: {e}")
+            logger.warning(f"HTTP cookie bootstrap failed: {e}")
+            return None
+
+    def _harvest_with_browser(self) -> Optional[Dict[str, str]]:
+        """Obtain a jar with undetected Chrome"""
+        with self._driver_lock:
+            driver = None
+            try:
+                started = time.monotonic()
+                driver = self._acquire_driver()
+                driver.get(self.cookies_url)
+                cookies = self._wait_for_cookies(driver)
+                logger.info(f"Cookie harvest took {time.monotonic() - started:.1f}s")
+
+                if not cookies:
+                    logger.warning("No cookies received")
+                    return None
+
+                filtered = {c['name']: c['value'] for c in cookies if c['name'] in REQUIRED_NSE_COOKIES}
+                missing = [name for name in REQUIRED_NSE_COOKIES if name not in filtered]
+                if missing:
+                    logger.warning(f"Missing cookies: {missing}")
+                else:
+                    logger.info("All required cookies collected")
+                return filtered
+            except Exception as e:
+                logger.error(f"Error in get_nse_cookies: {e}")
+                if driver is not None and self.reuse_browser:
+                    self._quit_driver(driver)
+                return None
+            finally:
+                if driver is not None and not self.reuse_browser:
+                    self._quit_driver(driver)
+
+    def get_nse_cookies(self, save: bool = True) -> Optional[Dict[str, str]]:
+        logger.info("Getting fresh NSE cookies...")
+        cookies = None
+        if self.http_bootstrap:
+            cookies = self._bootstrap_with_http()
+            self._record_tier("http", cookies is not None)
+            if cookies:
+                logger.info("Cookies obtained over plain HTTP")
+
+        if not cookies:
+            # Chrome costs hundreds of MB, only launch it when plain HTTP was not enough
+            cookies = self._harvest_with_browser()
+            self._record_tier("browser", bool(cookies))
+
+        if not cookies:
             return None
+        if save:
+            self._save_cookies_to_file(cookies)
+        return cookies
 
-    def _save_cookies_to_file(self, cookies: Dict[str, str]):
+    def _save_cookies_to_file(self, cookies: Dict[str, str]) -> Optional[Dict]:
         try:
             data = {
                 "cookies": cookies,
                 "timestamp": datetime.now().isoformat(),
-                "expiry": time.time() + 3600  # 1-hour expiry
+                "expiry": time.time() + self.cookie_expiry
             }
-            with open(self.cookies_file, "w") as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Cookies saved to {self.cookies_file}")
+            self.store.write(data)
+            logger.info(f"Cookies saved to {self.store.cookies_file}")
+            return data
         except Exception as e:
             logger.error(f"Failed to save cookies: {e}")
-
-    def load_cookies_from_file(self) -> Optional[Dict[str, str]]:
-        if not os.path.exists(self.cookies_file):
-            logger.info("Cookie file not found")
             return None
+
+    def save_cookies(self, cookies: Dict[str, str]) -> Optional[Dict]:
+        """Publish a jar to every worker through the shared store"""
+        return self._save_cookies_to_file(cookies)
+
+    def load_cookie_record(self) -> Optional[Dict]:
+        """Load the stored cookie record (cookies, timestamp, expiry) if it has not expired"""
         try:
-            with open(self.cookies_file, "r") as f:
-                data = json.load(f)
+            data = self.store.read()
+            if data is None:
+                logger.info("Cookie file not found")
+                return None
             if time.time() > data.get("expiry", 0):
                 logger.info("Stored cookies expired")
                 return None
-            cookies = data.get("cookies")
-            if cookies:
-                logger.info("Loaded cookies from file")
-                return cookies
+            if data.get("cookies"):
+                return data
             return None
         except Exception as e:
             logger.error(f"Error loading cookies: {e}")
             return None
 
+    def load_cookies_from_file(self) -> Optional[Dict[str, str]]:
+        record = self.load_cookie_record()
+        if record:
+            logger.info("Loaded cookies from file")
+            return record["cookies"]
+        return None
+
+    @staticmethod
+    def _fingerprint(cookies: Dict[str, str]) -> str:
+        return hashlib.sha256(json.dumps(cookies, sort_keys=True).encode()).hexdigest()
+
+    def _cached_validation(self, cookies: Dict[str, str]) -> Optional[bool]:
+        with self._validation_lock:
+            cached = self._validations.get(self._fingerprint(cookies))
+        if cached and time.time() - cached[1] < self.validation_ttl:
+            return cached[0]
+        return None
+
+    def _remember_validation(self, cookies: Dict[str, str], is_valid: bool):
+        with self._validation_lock:
+            now = time.time()
+            # Drop stale entries so old jars do not accumulate
+            self._validations = {
+                key: value for key, value in self._validations.items()
+                if now - value[1] < self.validation_ttl
+            }
+            self._validations[self._fingerprint(cookies)] = (is_valid, now)
+
+    def mark_valid(self, cookies: Dict[str, str]):
+        """Record that NSE just accepted these cookies, e.g. on a successful data fetch"""
+        if cookies:
+            self._remember_validation(cookies, True)
+
+    def _store_all_indices(self, raw_data: Dict):
+        """Keep the allIndices payload fetched for validation in the all_indexes table"""
+        try:
+            write_queue.enqueue(parse_all_indices(raw_data, "all_indices"), "all_indexes")
+        except Exception as e:
+            logger.error(f"Failed to store allIndices payload: {e}")
+
     def validate_cookies(self, cookies: Dict[str, str]) -> bool:
+        cached = self._cached_validation(cookies)
+        if cached is not None:
+            logger.info(f"Cookies validation cached: {cached}")
+            return cached
         try:
-            test_url = f"{self.base_url}/api/allIndices"
-            resp = self.session.get(test_url, headers=NSE_GET_COOKIES_HEADERS, cookies=cookies, timeout=10)
+            test_url = f"{self.base_url}{NSE_API_PATHS['all_indices']}"
+            # A fresh session sends only the jar under test; a shared one would merge in
+            # cookies set by earlier responses and could pass an incomplete jar
+            with requests.Session() as session:
+                resp = session.get(test_url, headers=NSE_GET_COOKIES_HEADERS, cookies=cookies, timeout=10)
             if resp.status_code == 200:
+                try:
+                    raw_data = resp.json()
+                except ValueError:
+                    # NSE answers its bot challenge page with a 200 too
+                    logger.warning("Cookie validation failed: response is not JSON")
+                    self._remember_validation(cookies, False)
+                    return False
                 logger.info("Cookies validation successful")
+                self._remember_validation(cookies, True)
+                self._store_all_indices(raw_data)
                 return True
             logger.warning(f"Cookie validation failed: status {resp.status_code}")
+            self._remember_validation(cookies, False)
             return False
         except Exception as e:
             logger.error(f"Error validating cookies: {e}")
             return False
 
-    def refresh_cookies(self) -> Optional[Dict[str, str]]:
+    def refresh_cookies(self, save: bool = True) -> Optional[Dict[str, str]]:
         logger.info("Refreshing cookies...")
-        return self.get_nse_cookies()
+        return self.get_nse_cookies(save=save)
 
 cookie_service = NSECookieService()
 
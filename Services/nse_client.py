@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+from Services.cookie_manager import cookie_manager
+from Constant.http import HTTP_STATUS
+
+logger = get_logger(__name__)
+
+class NSEHttpClient:
+    """Shared async HTTP client with a pooled, keep-alive connection to NSE"""
+
+    def __init__(self):
+        self.timeout = configure.getfloat('SCRAPING', 'REQUEST_TIMEOUT', fallback=30)
+        self.max_connections = configure.getint('SCRAPING', 'MAX_CONNECTIONS', fallback=20)
+        self.max_keepalive_connections = configure.getint('SCRAPING', 'MAX_KEEPALIVE_CONNECTIONS', fallback=10)
+        self.keepalive_expiry = configure.getfloat('SCRAPING', 'KEEPALIVE_EXPIRY', fallback=60)
+        self.max_retries = configure.getint('SCRAPING', 'MAX_RETRIES', fallback=3)
+        self.cookie_wait = configure.getfloat('COOKIES', 'REFRESH_WAIT', fallback=60)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        """Create the pooled client (called once at application startup)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                follow_redirects=True
+            )
+            logger.info("NSE HTTP client started")
+
+    async def close(self):
+        """Close the pooled client and release its connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("NSE HTTP client closed")
+
+    @staticmethod
+    def _is_auth_failure(response: httpx.Response) -> bool:
+        """NSE answers stale cookies with 401/403 or an HTML challenge page instead of JSON"""
+        if response.status_code in (HTTP_STATUS.UNAUTHORIZED, HTTP_STATUS.FORBIDDEN):
+            return True
+        if response.status_code == HTTP_STATUS.OK:
+            content_type = response.headers.get("content-type", "")
+            return "text/html" in content_type or response.content.lstrip()[:1] == b"<"
+        return False
+
+    async def get_payload(
+        self,
+        url: str,
+        headers: Dict = None,
+        timeout: float = None,
+        known_hash: str = None
+    ) -> Optional[Tuple[Optional[Dict], str]]:
+        """
+        GET a JSON document from NSE together with the SHA-256 of its raw body
+
+        Requests carry the cookie manager's current jar. When NSE rejects the jar it
+        is invalidated and the request retried on the refreshed jar, up to
+        [SCRAPING] MAX_RETRIES times, all waiting within one [COOKIES] REFRESH_WAIT.
+
+        timeout bounds each HTTP attempt on its own; waiting for a refreshed jar has
+        its own REFRESH_WAIT budget, so callers must not wrap the whole call in the
+        attempt timeout. An attempt that runs out of time raises asyncio.TimeoutError.
+
+        Returns None on any other failure. When the body hashes to known_hash the JSON
+        is not decoded and (None, hash) is returned.
+        """
+        try:
+            if self._client is None:
+                await self.start()
+
+            # One refresh wait covers every retry, so a request never waits MAX_RETRIES refreshes
+            deadline = time.monotonic() + self.cookie_wait
+            for attempt in range(self.max_retries + 1):
+                cookies = cookie_manager.get_cookies()
+                request_headers = dict(headers or {})
+                if cookies:
+                    # Sent explicitly so the shared client never mixes cookie jars between callers
+                    request_headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+                attempt_timeout = timeout if timeout is not None else self.timeout
+                # httpx times each connect/read separately; wait_for bounds the whole attempt
+                response = await asyncio.wait_for(
+                    self._client.get(url, headers=request_headers, timeout=attempt_timeout),
+                    timeout=attempt_timeout
+                )
+
+                if self._is_auth_failure(response):
+                    if attempt == self.max_retries:
+                        logger.error(f"NSE rejected cookies after {attempt + 1} attempts: {url}")
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.error(f"NSE rejected cookies, no refresh within {self.cookie_wait:.0f}s: {url}")
+                        return None
+                    logger.warning(f"NSE rejected cookies (status {response.status_code}), refreshing and retrying")
+                    # Concurrent failures on the same jar trigger a single refresh
+                    cookie_manager.invalidate(cookies)
+                    await asyncio.to_thread(cookie_manager.wait_for_cookies, remaining)
+                    continue
+
+                if response.status_code == 200:
+                    cookie_manager.mark_valid(cookies)
+                    payload_hash = hashlib.sha256(response.content).hexdigest()
+                    if known_hash is not None and payload_hash == known_hash:
+                        return None, payload_hash
+                    return response.json(), payload_hash
+                else:
+                    logger.error(f"Request failed with status code: {response.status_code}")
+                    return None
+
+        except asyncio.TimeoutError:
+            logger.error(f"Request timed out: {url}")
+            raise
+        except Exception as e:
+            logger.error(f"Request failed: {str(e)}")
+            return None
+
+    async def get_json(
+        self,
+        url: str,
+        headers: Dict = None,
+        timeout: float = None
+    ) -> Optional[Dict]:
+        """GET a JSON document from NSE, returning None on any failure"""
+        try:
+            payload = await self.get_payload(url, headers=headers, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        return payload[0] if payload else None
+
+nse_client = NSEHttpClient()
+
+def get_nse_client() -> NSEHttpClient:
+    """Get the shared NSE HTTP client"""
+    return nse_client
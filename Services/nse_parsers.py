@@ -0,0 +1,208 @@
+from datetime import datetime
+from operator import itemgetter, methodcaller
+from typing import Any, Dict, List
+
+import numpy as np
+
+from Utils.logger import get_logger
+from Utils.datasets import DATASETS
+from Utils.records import RECORD_TYPES, Record
+
+logger = get_logger(__name__)
+
+def _to_float(value) -> float:
+    """One NSE value as a float: "1,234.50" -> 1234.5; None, "-" and other text -> NaN"""
+    if type(value) is str:
+        try:
+            return float(value.replace(',', ''))
+        except ValueError:
+            return np.nan
+    return np.nan if value is None else float(value)
+
+def _numeric(values: list) -> np.ndarray:
+    """Coerce a column to float64: "1,234.50" -> 1234.5, None, "-" and other text -> NaN"""
+    try:
+        # Numbers and None, the usual payload, convert in one call
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.fromiter(map(_to_float, values), dtype=float, count=len(values))
+
+def _python_numbers(values: np.ndarray, integer: bool = False) -> list:
+    """Native Python numbers with None for NaN, as sqlite3 and the JSON responses expect"""
+    missing = np.isnan(values)
+    if not missing.any():
+        return (values.astype(np.int64) if integer else values).tolist()
+    if integer:
+        values = np.where(missing, 0, values).astype(np.int64)
+    column = values.astype(object)
+    column[missing] = None
+    return column.tolist()
+
+# Python types a stored column can keep as decoded, with no conversion
+NUMBER_TYPES = {
+    'REAL': {float, int, type(None)},
+    'INTEGER': {int, type(None)}
+}
+
+# Text NSE puts in numeric fields for "no value"
+NUMERIC_PLACEHOLDERS = {'-', ''}
+
+def _coerce_numeric_text(records: List[Dict]) -> List[Dict]:
+    """
+    Convert text columns that NSE formats as numbers ("1,234.50", "-") to numbers, in place
+
+    For payloads without a registry schema: a column is converted when every text value
+    in it is a number or a placeholder, and becomes int when every value is integral.
+    Columns without text are not touched.
+    """
+    for key in set().union(*records):
+        column = list(map(methodcaller('get', key), records))
+        types = set(map(type, column))
+        if str not in types or not types <= {str, float, int, type(None)}:
+            continue
+        # Symbols, dates and names fail on their first value; skip them before converting the column
+        sample = next((value for value in column if type(value) is str and value not in NUMERIC_PLACEHOLDERS), None)
+        if sample is not None and np.isnan(_to_float(sample)):
+            continue
+        numbers = _numeric(column)
+        missing = np.isnan(numbers)
+        if any(column[index] is not None and column[index] not in NUMERIC_PLACEHOLDERS for index in np.flatnonzero(missing)):
+            continue
+        integer = bool(np.all(numbers[~missing] == np.floor(numbers[~missing])))
+        for record, value in zip(records, _python_numbers(numbers, integer=integer)):
+            if key in record:
+                record[key] = value
+    return records
+
+def _price_range(numbers: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Intraday spread (high - low) and the spread as a % of the previous close"""
+    spread = numbers['high_price'] - numbers['low_price']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        range_percent = spread / numbers['prev_price'] * 100
+    range_percent[~np.isfinite(range_percent)] = np.nan
+    return {'spread': np.round(spread, 2), 'range_percent': np.round(range_percent, 2)}
+
+class _NumericColumns(dict):
+    """float64 arrays of a record batch's columns, converted the first time a derived column reads one"""
+
+    def __init__(self, values: Dict[str, list]):
+        super().__init__()
+        self.values = values
+
+    def __missing__(self, column: str) -> np.ndarray:
+        self[column] = _numeric(self.values[column])
+        return self[column]
+
+# Columns computed from the coerced numbers: table -> function of the numeric columns
+DERIVED_COLUMNS = {
+    'top_gainers': _price_range,
+    'top_loosers': _price_range
+}
+
+def normalize_records(table_name: str, records: List[Dict], fields: Dict[str, list] = None) -> List[Record]:
+    """
+    Project NSE records onto a dataset's registry columns in one columnar pass
+
+    Numeric columns are coerced as whole arrays rather than per record; fields supplies
+    columns the records do not carry, one value per record. Returns the dataset's
+    slotted record type.
+    """
+    if not records:
+        return []
+    spec = DATASETS[table_name]['columns']
+    sources = [source for _, _, source in spec if source is not None]
+    try:
+        # One C-level lookup per record when every record carries every key, the usual NSE payload
+        raw_columns = dict(zip(sources, zip(*map(itemgetter(*sources), records))))
+    except KeyError:
+        raw_columns = {source: list(map(methodcaller('get', source), records)) for source in sources}
+
+    values = dict(fields or {})
+    numbers = _NumericColumns(values)
+    for column, column_type, source in spec:
+        if source is None:
+            continue
+        raw = raw_columns[source]
+        if column_type in NUMBER_TYPES and not set(map(type, raw)) <= NUMBER_TYPES[column_type]:
+            numbers[column] = _numeric(raw)
+            values[column] = _python_numbers(numbers[column], integer=column_type == 'INTEGER')
+        else:
+            # Text, or numbers already of the stored type: keep the decoded values
+            values[column] = raw
+    if table_name in DERIVED_COLUMNS:
+        for column, derived in DERIVED_COLUMNS[table_name](numbers).items():
+            values[column] = _python_numbers(derived)
+
+    missing = [None] * len(records)
+    return list(map(RECORD_TYPES[table_name], *(values.get(column, missing) for column, _, _ in spec)))
+
+def parse_gainers_loosers(raw_data: Dict, data_type: str) -> Dict:
+    """Process and clean gainers/loosers data"""
+    try:
+        processed_data = {
+            "timestamp": datetime.now().isoformat(),
+            "data_type": data_type,
+            "legends": raw_data.get("legends", []),
+            "data": []
+        }
+
+        # Every category (NIFTY, BANKNIFTY, etc.) is normalized in one columnar pass
+        stocks, categories = [], []
+        for category, category_data in raw_data.items():
+            if category == "legends":
+                continue
+
+            if isinstance(category_data, dict) and "data" in category_data:
+                stocks.extend(category_data["data"])
+                categories.extend([category] * len(category_data["data"]))
+        processed_data["data"] = normalize_records("top_gainers", stocks, {"category": categories})
+
+        return processed_data
+
+    except Exception as e:
+        logger.error(f"Error processing {data_type} data: {str(e)}")
+        return {"timestamp": datetime.now().isoformat(), "data_type": data_type, "data": []}
+
+def _extract_records(raw_data: Any) -> List[Dict]:
+    """Find the record list in an NSE payload, tagging grouped records with their category"""
+    if isinstance(raw_data, list):
+        return [record for record in raw_data if isinstance(record, dict)]
+
+    if not isinstance(raw_data, dict):
+        return []
+
+    if isinstance(raw_data.get("data"), list):
+        return _extract_records(raw_data["data"])
+
+    # Grouped payloads look like {"NIFTY": {"data": [...]}, "BANKNIFTY": {"data": [...]}}
+    records = []
+    for category, category_data in raw_data.items():
+        if isinstance(category_data, dict) and isinstance(category_data.get("data"), list):
+            for record in _extract_records(category_data["data"]):
+                records.append({"category": category, **record})
+    return records
+
+def parse_records(raw_data: Any, data_type: str) -> Dict:
+    """Process a generic NSE list payload into the standard processed shape"""
+    try:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "data_type": data_type,
+            "data": _coerce_numeric_text(_extract_records(raw_data))
+        }
+    except Exception as e:
+        logger.error(f"Error processing {data_type} data: {str(e)}")
+        return {"timestamp": datetime.now().isoformat(), "data_type": data_type, "data": []}
+
+def parse_all_indices(raw_data: Dict, data_type: str) -> Dict:
+    """Process the allIndices payload into all_indexes records"""
+    try:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "data_type": data_type,
+            "data": normalize_records("all_indexes", raw_data.get("data", []))
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing {data_type} data: {str(e)}")
+        return {"timestamp": datetime.now().isoformat(), "data_type": data_type, "data": []}
@@ -0,0 +1,101 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+from Utils.db import SQLITE_SYMBOL_COLUMNS
+from Utils.write_queue import write_queue
+
+logger = get_logger(__name__)
+
+class RetentionEngine:
+    """
+    Weekly retention for snapshot tables
+
+    Raw snapshots older than a dataset's RAW_DAYS are rolled up into per-symbol
+    intraday OHLC rows and deleted, then the freed pages are vacuumed. Runs on the
+    snapshot writer's connection so it never races queued writes.
+    """
+
+    def __init__(self, db_manager_factory=None):
+        # Defaults to the write queue's manager, whose write lock serialises retention with snapshot writes
+        self.db_manager_factory = db_manager_factory or (lambda: write_queue.db_manager)
+        self.raw_days = configure.getint('RETENTION', 'RAW_DAYS', fallback=7)
+        self.vacuum_pages = configure.getint('RETENTION', 'VACUUM_PAGES', fallback=0)
+        self.cleanup_day = configure.getint('CRON_JOBS', 'WEEKLY_CLEANUP_DAY', fallback=6)
+        self.cleanup_time = configure.get('CRON_JOBS', 'WEEKLY_CLEANUP_TIME', fallback='02:00')
+        self._scheduler: Optional[BackgroundScheduler] = None
+        self._run_lock = threading.Lock()
+        self._last_run: Optional[Dict] = None
+
+    def raw_days_for(self, table_name: str) -> int:
+        """Days of raw snapshots kept for table_name"""
+        return configure.getint('RETENTION', f'{table_name.upper()}_RAW_DAYS', fallback=self.raw_days)
+
+    def cutoff_for(self, table_name: str, now: datetime = None) -> Optional[str]:
+        """Start of the oldest day still kept raw, None when the table keeps everything"""
+        raw_days = self.raw_days_for(table_name)
+        if raw_days <= 0:
+            return None
+        # Cut on a day boundary so each rolled-up day is complete
+        day = (now or datetime.now()).date() - timedelta(days=raw_days)
+        return datetime.combine(day, datetime.min.time()).isoformat()
+
+    def run(self, now: datetime = None) -> Dict:
+        """Apply every dataset's policy, then compact the database"""
+        with self._run_lock:
+            db_manager = self.db_manager_factory()
+            summary = {"started_at": datetime.now().isoformat(), "datasets": {}, "errors": []}
+            for table_name in SQLITE_SYMBOL_COLUMNS:
+                cutoff = self.cutoff_for(table_name, now)
+                if cutoff is None:
+                    continue
+                try:
+                    summary["datasets"][table_name] = {"cutoff": cutoff, **db_manager.apply_retention(table_name, cutoff)}
+                except Exception as e:
+                    summary["errors"].append(f"{table_name}: {e}")
+            try:
+                db_manager.compact(self.vacuum_pages)
+            except Exception as e:
+                summary["errors"].append(f"compact: {e}")
+            summary["finished_at"] = datetime.now().isoformat()
+            self._last_run = summary
+            logger.info(f"Retention run finished: {summary['datasets']}")
+            return summary
+
+    def start(self):
+        """Schedule the weekly run from WEEKLY_CLEANUP_DAY / WEEKLY_CLEANUP_TIME"""
+        if self._scheduler is not None:
+            return
+        hour, minute = (int(part) for part in self.cleanup_time.split(':'))
+        self._scheduler = BackgroundScheduler(daemon=True)
+        # APScheduler counts days like the config: 0=Monday, 6=Sunday
+        self._scheduler.add_job(
+            self.run,
+            CronTrigger(day_of_week=self.cleanup_day, hour=hour, minute=minute),
+            id="weekly-retention",
+            coalesce=True,
+            max_instances=1
+        )
+        self._scheduler.start()
+        logger.info(f"Retention scheduled weekly on day {self.cleanup_day} at {self.cleanup_time}")
+
+    def stop(self):
+        """Stop the scheduler, letting a run in progress finish"""
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=True)
+            self._scheduler = None
+
+    def status(self) -> Dict:
+        """Next scheduled run and the last run's summary"""
+        job = self._scheduler.get_job("weekly-retention") if self._scheduler is not None else None
+        return {
+            "next_run": job.next_run_time.isoformat() if job and job.next_run_time else None,
+            "last_run": self._last_run
+        }
+
+retention_engine = RetentionEngine()
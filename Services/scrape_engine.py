@@ -0,0 +1,208 @@
+import asyncio
+import time
+from typing import Dict, List
+from urllib.parse import urlencode
+
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+from Utils.cookie_headers import load_nse_headers
+from Services.nse_client import get_nse_client
+from Services.nse_parsers import parse_all_indices, parse_gainers_loosers, parse_records
+from Utils.payload_hash import payload_hashes
+from Constant.general import NSE_API_PATHS
+
+logger = get_logger(__name__)
+
+# Datasets the engine can fetch: API path key, query params, parser, referer page,
+# optional DB table and optional per-endpoint timeout override (seconds)
+SCRAPE_DATASETS = {
+    "gainers": {
+        "path": "gainers_loosers",
+        "params": {"index": "gainers"},
+        "parser": parse_gainers_loosers,
+        "referer": "/market-data/top-gainers-losers",
+        "table": "top_gainers"
+    },
+    "loosers": {
+        "path": "gainers_loosers",
+        "params": {"index": "loosers"},
+        "parser": parse_gainers_loosers,
+        "referer": "/market-data/top-gainers-losers",
+        "table": "top_loosers"
+    },
+    "all_indices": {
+        "path": "all_indices",
+        "parser": parse_all_indices,
+        "referer": "/market-data/live-market-indices",
+        "table": "all_indexes"
+    },
+    "equity_master": {
+        "path": "equity_master",
+        "parser": parse_records,
+        "referer": "/market-data/live-equity-market",
+        "timeout": 30
+    },
+    "equity_indices": {
+        "path": "equity_indices",
+        "params": {"index": "NIFTY 50"},
+        "parser": parse_records,
+        "referer": "/market-data/live-equity-market"
+    },
+    "most_active_securities": {
+        "path": "most_active_securities",
+        "params": {"index": "volume"},
+        "parser": parse_records,
+        "referer": "/market-data/most-active-equities"
+    },
+    "price_band_hitter": {
+        "path": "price_band_hitter",
+        "parser": parse_records,
+        "referer": "/market-data/upper-band-hitters"
+    },
+    "52week_high": {
+        "path": "52week_high",
+        "parser": parse_records,
+        "referer": "/market-data/52-week-high-equity-market"
+    },
+    "52week_low": {
+        "path": "52week_low",
+        "parser": parse_records,
+        "referer": "/market-data/52-week-low-equity-market"
+    },
+    "bulk_deals": {
+        "path": "bulk_deals",
+        "parser": parse_records,
+        "referer": "/market-data/large-deals"
+    },
+    "advance_decline": {
+        "path": "advance_decline",
+        "parser": parse_records,
+        "referer": "/market-data/advance"
+    },
+    "equity_derivatives": {
+        "path": "equity_derivatives",
+        "params": {"index": "nse50_fut"},
+        "parser": parse_records,
+        "referer": "/market-data/equity-derivatives-watch",
+        "timeout": 30
+    },
+    "derivatives_equity": {
+        "path": "derivatives_equity",
+        "params": {"index": "contracts"},
+        "parser": parse_records,
+        "referer": "/market-data/most-active-contracts"
+    },
+    "most_active_underlying": {
+        "path": "most_active_underlying",
+        "parser": parse_records,
+        "referer": "/market-data/most-active-underlying"
+    },
+    "oi_spurts": {
+        "path": "oi_spurts",
+        "parser": parse_records,
+        "referer": "/market-data/oi-spurts"
+    },
+    "special_preopen": {
+        "path": "special_preopen",
+        "parser": parse_records,
+        "referer": "/market-data/special-pre-open-session"
+    },
+    "new_listing": {
+        "path": "new_listing",
+        "parser": parse_records,
+        "referer": "/market-data/new-stock-exchange-listings-today"
+    }
+}
+
+class NSEScrapeEngine:
+    """Fetch any subset of NSE datasets concurrently and parse each payload"""
+
+    def __init__(self):
+        self.base_url = configure.get('NSE', 'BASE_URL')
+        self.max_concurrency = configure.getint('SCRAPING', 'MAX_CONCURRENCY', fallback=17)
+        self.endpoint_timeout = configure.getfloat('SCRAPING', 'ENDPOINT_TIMEOUT', fallback=15)
+
+    def available_datasets(self) -> List[str]:
+        """Names of all datasets the engine knows how to fetch"""
+        return list(SCRAPE_DATASETS.keys())
+
+    def stored_datasets(self) -> Dict[str, str]:
+        """Datasets persisted by a sweep, mapped to their table"""
+        return {name: spec["table"] for name, spec in SCRAPE_DATASETS.items() if spec.get("table")}
+
+    def build_url(self, dataset: str) -> str:
+        """Build the full NSE API URL for a dataset"""
+        spec = SCRAPE_DATASETS[dataset]
+        url = f"{self.base_url}{NSE_API_PATHS[spec['path']]}"
+        if spec.get("params"):
+            url = f"{url}?{urlencode(spec['params'])}"
+        return url
+
+    async def fetch_dataset(
+        self,
+        dataset: str,
+        semaphore: asyncio.Semaphore
+    ) -> Dict:
+        """Fetch and parse one dataset, never raising"""
+        spec = SCRAPE_DATASETS[dataset]
+        timeout = spec.get("timeout", self.endpoint_timeout)
+        headers = load_nse_headers(f"{self.base_url}{spec['referer']}")
+        started = time.perf_counter()
+        result = {
+            "dataset": dataset,
+            "success": False,
+            "not_modified": False,
+            "payload_hash": None,
+            "data": None,
+            "error": None
+        }
+
+        try:
+            async with semaphore:
+                # The client times each attempt; a cookie refresh between attempts has its own budget
+                payload = await get_nse_client().get_payload(
+                    self.build_url(dataset),
+                    headers=headers,
+                    timeout=timeout,
+                    known_hash=payload_hashes.get(dataset)
+                )
+            if payload is None:
+                result["error"] = "No data received from NSE"
+            else:
+                raw_data, result["payload_hash"] = payload
+                result["success"] = True
+                if raw_data is None:
+                    # Unchanged since the last stored payload, skip parsing
+                    result["not_modified"] = True
+                else:
+                    result["data"] = spec["parser"](raw_data, dataset)
+        except asyncio.TimeoutError:
+            result["error"] = f"Timed out after {timeout}s"
+        except Exception as e:
+            result["error"] = str(e)
+
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if not result["success"]:
+            logger.error(f"Failed to fetch {dataset}: {result['error']}")
+        return result
+
+    async def sweep(self, datasets: List[str] = None) -> Dict[str, Dict]:
+        """Fetch the chosen datasets (all by default) in one bounded-concurrency cycle"""
+        datasets = datasets or self.available_datasets()
+        unknown = [name for name in datasets if name not in SCRAPE_DATASETS]
+        if unknown:
+            raise ValueError(f"Unknown datasets: {unknown}")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.fetch_dataset(name, semaphore) for name in datasets)
+        )
+        logger.info(
+            f"Sweep of {len(datasets)} datasets finished in "
+            f"{(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return {result["dataset"]: result for result in results}
+
+scrape_engine = NSEScrapeEngine()
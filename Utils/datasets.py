@@ -0,0 +1,117 @@
+from typing import List
+
+# Columns shared by the gainers and loosers tables: (column, SQLite type, key in the NSE record).
+# Columns without a record key are filled by the parser: category from the payload group,
+# spread and range_percent derived from the prices.
+GAINERS_LOOSERS_COLUMNS = [
+    ('category', 'TEXT', None),
+    ('symbol', 'TEXT', 'symbol'),
+    ('series', 'TEXT', 'series'),
+    ('open_price', 'REAL', 'open_price'),
+    ('high_price', 'REAL', 'high_price'),
+    ('low_price', 'REAL', 'low_price'),
+    ('ltp', 'REAL', 'ltp'),
+    ('prev_price', 'REAL', 'prev_price'),
+    ('net_price', 'REAL', 'net_price'),
+    ('per_change', 'REAL', 'perChange'),
+    ('trade_quantity', 'INTEGER', 'trade_quantity'),
+    ('turnover', 'REAL', 'turnover'),
+    ('market_type', 'TEXT', 'market_type'),
+    ('ca_ex_dt', 'TEXT', 'ca_ex_dt'),
+    ('ca_purpose', 'TEXT', 'ca_purpose'),
+    ('spread', 'REAL', None),
+    ('range_percent', 'REAL', None)
+]
+
+# Stored NSE datasets, declared once; table DDL, inserts, reads and record normalization are built from them
+#   columns   (column, SQLite type, NSE record key) in storage order
+#   symbol    column indexed with snapshot_id for per-symbol reads
+#   key       columns identifying a record within one snapshot (delta storage)
+#   interned  low-cardinality text columns stored as dictionary ids
+#   rollup    (price, volume) columns rolled up into intraday_ohlc by retention
+#   record    name of the slotted record type; datasets with the same name share it (Utils/records.py)
+DATASETS = {
+    'top_gainers': {
+        'columns': GAINERS_LOOSERS_COLUMNS,
+        'symbol': 'symbol',
+        'key': ('category', 'symbol', 'series'),
+        'interned': ('category', 'symbol', 'series', 'market_type'),
+        'rollup': ('ltp', 'trade_quantity'),
+        'record': 'Quote'
+    },
+    'top_loosers': {
+        'columns': GAINERS_LOOSERS_COLUMNS,
+        'symbol': 'symbol',
+        'key': ('category', 'symbol', 'series'),
+        'interned': ('category', 'symbol', 'series', 'market_type'),
+        'rollup': ('ltp', 'trade_quantity'),
+        'record': 'Quote'
+    },
+    # No scraper feeds these two yet; records are expected keyed by column name
+    'new_listings': {
+        'columns': [
+            ('symbol', 'TEXT', 'symbol'),
+            ('company_name', 'TEXT', 'company_name'),
+            ('series', 'TEXT', 'series'),
+            ('listing_date', 'TEXT', 'listing_date'),
+            ('face_value', 'REAL', 'face_value'),
+            ('issue_price', 'REAL', 'issue_price'),
+            ('listing_price', 'REAL', 'listing_price'),
+            ('listing_gains', 'REAL', 'listing_gains'),
+            ('listing_gains_percent', 'REAL', 'listing_gains_percent'),
+            ('current_price', 'REAL', 'current_price'),
+            ('current_gains', 'REAL', 'current_gains'),
+            ('current_gains_percent', 'REAL', 'current_gains_percent'),
+            ('market_cap', 'REAL', 'market_cap'),
+            ('category', 'TEXT', 'category')
+        ],
+        'symbol': 'symbol',
+        'key': ('symbol', 'series'),
+        'record': 'NewListing'
+    },
+    'ipo_data': {
+        'columns': [
+            ('company_name', 'TEXT', 'company_name'),
+            ('symbol', 'TEXT', 'symbol'),
+            ('series', 'TEXT', 'series'),
+            ('issue_start_date', 'TEXT', 'issue_start_date'),
+            ('issue_end_date', 'TEXT', 'issue_end_date'),
+            ('listing_date', 'TEXT', 'listing_date'),
+            ('issue_price', 'REAL', 'issue_price'),
+            ('issue_size', 'REAL', 'issue_size'),
+            ('lot_size', 'INTEGER', 'lot_size'),
+            ('issue_type', 'TEXT', 'issue_type'),
+            ('category', 'TEXT', 'category'),
+            ('grade', 'TEXT', 'grade'),
+            ('status', 'TEXT', 'status')
+        ],
+        'symbol': 'symbol',
+        'key': ('symbol', 'series'),
+        'record': 'IpoIssue'
+    },
+    'all_indexes': {
+        'columns': [
+            ('index_name', 'TEXT', 'index'),
+            ('index_symbol', 'TEXT', 'indexSymbol'),
+            ('last_price', 'REAL', 'last'),
+            ('variation', 'REAL', 'variation'),
+            ('percent_change', 'REAL', 'percentChange'),
+            ('open_price', 'REAL', 'open'),
+            ('high', 'REAL', 'high'),
+            ('low', 'REAL', 'low'),
+            ('previous_close', 'REAL', 'previousClose'),
+            ('year_high', 'REAL', 'yearHigh'),
+            ('year_low', 'REAL', 'yearLow'),
+            ('pe', 'REAL', 'pe'),
+            ('pb', 'REAL', 'pb'),
+            ('div_yield', 'REAL', 'dy')
+        ],
+        'symbol': 'index_symbol',
+        'key': ('index_name',),
+        'rollup': ('last_price', None),
+        'record': 'IndexQuote'
+    }
+}
+
+def dataset_columns(table_name: str) -> List[str]:
+    return [column for column, _, _ in DATASETS[table_name]['columns']]
@@ -1,17 +1,341 @@
+import json
 import sqlite3
+import threading
+from itertools import repeat
+from pathlib import Path
 import pymongo
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from Utils.logger import get_logger
 from Utils.config_reader import configure
-from Constant.general import DB_SQLITE, DB_MONGODB
+from Utils.storage import SnapshotStorage
+from Utils.datasets import DATASETS, dataset_columns
+from Utils.snapshot_delta import SNAPSHOT_KEY_COLUMNS, SnapshotState, apply_delta, diff_records, row_key
+from Utils.value_dictionary import SQLITE_DICTIONARY_TABLE, ValueDictionary
+from Utils.records import ROW_TYPES, Record, record_columns
+from Constant.general import DB_SQLITE, DB_MONGODB, DB_MEMORY
 
 logger = get_logger(__name__)
 
-class DatabaseManager:
-    def __init__(self):
-        self.db_type = configure.get('DB', 'TYPE', fallback=DB_SQLITE).lower()
+# Record keys stored by each SQLite row table, after snapshot_id
+SQLITE_INSERT_COLUMNS = {table_name: dataset_columns(table_name) for table_name in DATASETS}
+
+# Low-cardinality text columns stored as dictionary ids, in a <column>_id column
+SQLITE_INTERNED_COLUMNS = {
+    table_name: spec['interned'] for table_name, spec in DATASETS.items() if spec.get('interned')
+}
+
+def _stored_column(table_name: str, column: str) -> str:
+    return f'{column}_id' if column in SQLITE_INTERNED_COLUMNS.get(table_name, ()) else column
+
+def _decoded_column(table_name: str, column: str, alias: str) -> str:
+    """
+    SQL expression reading a record key back from the row table aliased as alias
+
+    Interned columns read the dictionary row joined in by _dictionary_joins.
+    """
+    if column in SQLITE_INTERNED_COLUMNS.get(table_name, ()):
+        return f'{alias}_{column}.value'
+    return f'{alias}.{column}'
+
+def _dictionary_joins(table_name: str, columns: List[str], alias: str) -> str:
+    """LEFT JOINs of the dictionary rows that _decoded_column reads for columns"""
+    return ' '.join(
+        f'LEFT JOIN dictionary AS {alias}_{column} ON {alias}_{column}.id = {alias}.{column}_id'
+        for column in columns if column in SQLITE_INTERNED_COLUMNS.get(table_name, ())
+    )
+
+# Insert statements are built once: table -> (sql, record keys)
+SQLITE_INSERTS = {
+    table_name: (
+        f"INSERT INTO {table_name} (snapshot_id, {', '.join(_stored_column(table_name, column) for column in columns)}) "
+        f"VALUES ({', '.join('?' * (len(columns) + 1))})",
+        columns
+    )
+    for table_name, columns in SQLITE_INSERT_COLUMNS.items()
+}
+
+# Read projection of every record key, for queries that address the row table by its own name,
+# and the dictionary joins those queries need after FROM <table>
+SQLITE_SELECT_COLUMNS = {
+    table_name: ', '.join(f'{_decoded_column(table_name, column, table_name)} AS {column}' for column in columns)
+    for table_name, columns in SQLITE_INSERT_COLUMNS.items()
+}
+SQLITE_DICTIONARY_JOINS = {
+    table_name: _dictionary_joins(table_name, columns, table_name)
+    for table_name, columns in SQLITE_INSERT_COLUMNS.items()
+}
+
+# Symbol column of each SQLite row table, indexed with snapshot_id for per-symbol reads
+SQLITE_SYMBOL_COLUMNS = {table_name: spec['symbol'] for table_name, spec in DATASETS.items()}
+
+def _create_table_sql(table_name: str) -> str:
+    columns = [
+        f'{column}_id INTEGER REFERENCES dictionary(id)'
+        if column in SQLITE_INTERNED_COLUMNS.get(table_name, ()) else f'{column} {column_type}'
+        for column, column_type, _ in DATASETS[table_name]['columns']
+    ]
+    return f'''
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+            removed INTEGER NOT NULL DEFAULT 0,
+            {', '.join(columns)}
+        )
+    '''
+
+# Row table DDL and its indexes: rows per snapshot, and per symbol across snapshots
+SQLITE_CREATE_TABLES = {
+    table_name: [
+        _create_table_sql(table_name),
+        f'CREATE INDEX IF NOT EXISTS idx_{table_name}_snapshot ON {table_name} (snapshot_id)',
+        f'CREATE INDEX IF NOT EXISTS idx_{table_name}_{symbol_column}_snapshot ON {table_name} ({symbol_column}, snapshot_id)'
+    ]
+    for table_name, symbol_column in (
+        (table_name, _stored_column(table_name, spec['symbol'])) for table_name, spec in DATASETS.items()
+    )
+}
+
+SQLITE_SNAPSHOTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dataset TEXT NOT NULL,
+        data_type TEXT,
+        fetched_at TEXT NOT NULL,
+        payload_hash TEXT,
+        row_count INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        parent_id INTEGER REFERENCES snapshots(id),
+        row_order TEXT
+    )
+'''
+SQLITE_SNAPSHOTS_INDEX = 'CREATE INDEX IF NOT EXISTS idx_snapshots_dataset_fetched_at ON snapshots (dataset, fetched_at)'
+
+# Columns rolled up into intraday_ohlc once raw snapshots age out: table -> (price, volume)
+SQLITE_ROLLUP_COLUMNS = {table_name: spec['rollup'] for table_name, spec in DATASETS.items() if spec.get('rollup')}
+
+# Snapshot document fields returned to readers: migration bookkeeping stays internal
+MONGODB_SNAPSHOT_PROJECTION = {'_id': 0, 'legacy_id': 0}
+
+# Merges a day's bar into an existing intraday_ohlc row when retention runs again over the same day
+SQLITE_OHLC_MERGE = '''
+    ON CONFLICT (dataset, symbol, day) DO UPDATE SET
+        open = CASE WHEN excluded.first_at < first_at THEN excluded.open ELSE open END,
+        close = CASE WHEN excluded.last_at > last_at THEN excluded.close ELSE close END,
+        high = MAX(high, excluded.high),
+        low = MIN(low, excluded.low),
+        volume = MAX(volume, excluded.volume),
+        samples = samples + excluded.samples,
+        first_at = MIN(first_at, excluded.first_at),
+        last_at = MAX(last_at, excluded.last_at)
+'''
+
+def _daily_bars(table_name: str, rows) -> Dict[Tuple[str, str], Dict]:
+    """OHLC bars per (symbol, day) from (fetched_at, record) pairs, oldest snapshot first"""
+    price_column, volume_column = SQLITE_ROLLUP_COLUMNS[table_name]
+    symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+    bars: Dict[Tuple[str, str], Dict] = {}
+    for fetched_at, record in rows:
+        symbol = record.get(symbol_column)
+        if symbol is None:
+            continue
+        price = record.get(price_column)
+        volume = record.get(volume_column) if volume_column else None
+        bar = bars.setdefault((symbol, fetched_at[:10]), {
+            'open': price, 'high': None, 'low': None, 'volume': None, 'samples': 0, 'first_at': fetched_at
+        })
+        if price is not None:
+            bar['high'] = price if bar['high'] is None else max(bar['high'], price)
+            bar['low'] = price if bar['low'] is None else min(bar['low'], price)
+        if volume is not None:
+            bar['volume'] = volume if bar['volume'] is None else max(bar['volume'], volume)
+        bar['close'], bar['last_at'] = price, fetched_at
+        bar['samples'] += 1
+    return bars
+
+def _merge_bars(existing: Dict, bar: Dict) -> Dict:
+    """A stored bar merged with a newer rollup of the same day, as SQLITE_OHLC_MERGE does"""
+    def bound(pick, *values):
+        values = [value for value in values if value is not None]
+        return pick(values) if values else None
+    return {
+        'open': bar['open'] if bar['first_at'] < existing['first_at'] else existing['open'],
+        'close': bar['close'] if bar['last_at'] > existing['last_at'] else existing['close'],
+        'high': bound(max, existing['high'], bar['high']),
+        'low': bound(min, existing['low'], bar['low']),
+        'volume': bound(max, existing['volume'], bar['volume']),
+        'samples': existing['samples'] + bar['samples'],
+        'first_at': min(existing['first_at'], bar['first_at']),
+        'last_at': max(existing['last_at'], bar['last_at'])
+    }
+
+# SQLite connection tuning, overridable from [DB]
+SQLITE_PRAGMA_DEFAULTS = {
+    'JOURNAL_MODE': 'WAL',
+    'SYNCHRONOUS': 'NORMAL',
+    'CACHE_SIZE': '-20000',
+    'MMAP_SIZE': '268435456',
+    'TEMP_STORE': 'MEMORY',
+    'BUSY_TIMEOUT': '5000'
+}
+
+def _table_exists(cursor: sqlite3.Cursor, table_name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+    return cursor.fetchone() is not None
+
+def _add_time_and_symbol_indexes(cursor: sqlite3.Cursor):
+    """Schema v1: index created_at and (symbol, created_at) on every table"""
+    for table_name, symbol_column in SQLITE_SYMBOL_COLUMNS.items():
+        if not _table_exists(cursor, table_name):
+            continue
+        # Reads compare created_at as text, so normalise anything not in CURRENT_TIMESTAMP form
+        cursor.execute(f'''
+            UPDATE {table_name} SET created_at = datetime(created_at)
+            WHERE datetime(created_at) IS NOT NULL AND created_at != datetime(created_at)
+        ''')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table_name}_created_at ON {table_name} (created_at)')
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS idx_{table_name}_{symbol_column}_created_at '
+            f'ON {table_name} ({symbol_column}, created_at)'
+        )
+
+def _split_rows_into_snapshots(cursor: sqlite3.Cursor):
+    """Schema v2: move per-row timestamp/data_type into snapshots, keyed by snapshot_id"""
+    cursor.execute(SQLITE_SNAPSHOTS_TABLE)
+    cursor.execute(SQLITE_SNAPSHOTS_INDEX)
+    for table_name in SQLITE_SYMBOL_COLUMNS:
+        if not _table_exists(cursor, table_name):
+            continue
+        cursor.execute(f'PRAGMA table_info({table_name})')
+        columns = [
+            (row[1], row[2]) for row in cursor.fetchall()
+            if row[1] not in ('id', 'timestamp', 'data_type', 'created_at')
+        ]
+        names = ', '.join(name for name, _ in columns)
+        legacy = f'{table_name}_legacy'
+
+        cursor.execute(f'ALTER TABLE {table_name} RENAME TO {legacy}')
+        cursor.execute(f'''
+            CREATE TABLE {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+                {', '.join(f'{name} {column_type}' for name, column_type in columns)}
+            )
+        ''')
+        # Every row of one legacy scrape carries the same timestamp, which identifies the snapshot
+        cursor.execute(f'''
+            INSERT INTO snapshots (dataset, data_type, fetched_at, row_count, created_at)
+            SELECT ?, data_type, timestamp, COUNT(*), MIN(created_at) FROM {legacy}
+            GROUP BY timestamp, data_type
+            ORDER BY MIN(id)
+        ''', (table_name,))
+        cursor.execute(f'''
+            INSERT INTO {table_name} (snapshot_id, {names})
+            SELECT snapshots.id, {', '.join(f'{legacy}.{name}' for name, _ in columns)}
+            FROM {legacy} JOIN snapshots
+                ON snapshots.dataset = ? AND snapshots.fetched_at = {legacy}.timestamp
+                AND snapshots.data_type IS {legacy}.data_type
+            ORDER BY {legacy}.id
+        ''', (table_name,))
+        cursor.execute(f'DROP TABLE {legacy}')
+
+def _add_column(cursor: sqlite3.Cursor, table_name: str, column: str, definition: str):
+    cursor.execute(f'PRAGMA table_info({table_name})')
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {table_name} ADD COLUMN {column} {definition}')
+
+def _add_delta_columns(cursor: sqlite3.Cursor):
+    """Schema v3: delta snapshots point at their parent; rows can be removal markers"""
+    _add_column(cursor, 'snapshots', 'parent_id', 'INTEGER REFERENCES snapshots(id)')
+    _add_column(cursor, 'snapshots', 'row_order', 'TEXT')
+    for table_name in SQLITE_SYMBOL_COLUMNS:
+        if _table_exists(cursor, table_name):
+            _add_column(cursor, table_name, 'removed', 'INTEGER NOT NULL DEFAULT 0')
+
+def _intern_text_columns(cursor: sqlite3.Cursor):
+    """Schema v4: replace SQLITE_INTERNED_COLUMNS text with ids into the dictionary table"""
+    cursor.execute(SQLITE_DICTIONARY_TABLE)
+    for table_name, interned in SQLITE_INTERNED_COLUMNS.items():
+        if not _table_exists(cursor, table_name):
+            continue
+        cursor.execute(f'PRAGMA table_info({table_name})')
+        columns = [
+            (row[1], row[2]) for row in cursor.fetchall()
+            if row[1] not in ('id', 'snapshot_id', 'removed')
+        ]
+        legacy = f'{table_name}_legacy'
+
+        for column in interned:
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO dictionary (value)
+                SELECT DISTINCT {column} FROM {table_name} WHERE {column} IS NOT NULL ORDER BY {column}
+            ''')
+        cursor.execute(f'ALTER TABLE {table_name} RENAME TO {legacy}')
+        cursor.execute(f'''
+            CREATE TABLE {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+                removed INTEGER NOT NULL DEFAULT 0,
+                {', '.join(
+                    f'{name}_id INTEGER REFERENCES dictionary(id)' if name in interned else f'{name} {column_type}'
+                    for name, column_type in columns
+                )}
+            )
+        ''')
+        # Row ids are kept: delta snapshots and history points refer to them
+        cursor.execute(f'''
+            INSERT INTO {table_name} (id, snapshot_id, removed, {', '.join(_stored_column(table_name, name) for name, _ in columns)})
+            SELECT id, snapshot_id, removed, {', '.join(
+                f'(SELECT id FROM dictionary WHERE value = {legacy}.{name})' if name in interned else name
+                for name, _ in columns
+            )}
+            FROM {legacy}
+            ORDER BY id
+        ''')
+        cursor.execute(f'DROP TABLE {legacy}')
+
+def _add_registry_columns(cursor: sqlite3.Cursor):
+    """Schema v5: add the DATASETS columns an existing row table lacks (spread, range_percent on gainers/loosers)"""
+    for table_name, spec in DATASETS.items():
+        if not _table_exists(cursor, table_name):
+            continue
+        for column, column_type, _ in spec['columns']:
+            if column in SQLITE_INTERNED_COLUMNS.get(table_name, ()):
+                _add_column(cursor, table_name, f'{column}_id', 'INTEGER REFERENCES dictionary(id)')
+            else:
+                _add_column(cursor, table_name, column, column_type)
+
+# Applied in order; PRAGMA user_version records how many have run.
+# New databases run them against no tables, then _create_sqlite_tables builds the current schema.
+SQLITE_MIGRATIONS = [
+    _add_time_and_symbol_indexes,
+    _split_rows_into_snapshots,
+    _add_delta_columns,
+    _intern_text_columns,
+    _add_registry_columns,
+]
+
+class DatabaseManager(SnapshotStorage):
+    def __init__(self, db_path: str = None):
+        db_type = configure.get('DB', 'TYPE', fallback=DB_SQLITE).lower()
+        # get_storage() serves TYPE = memory itself; a DatabaseManager built directly under it is SQLite
+        self.db_type = DB_SQLITE if db_type == DB_MEMORY else db_type
+        self.db_path = db_path or configure.get('DB', 'DATABASE_PATH', fallback='nse_data.db')
         self.db_connection = None
+        self._write_lock = threading.Lock()
+        # Read-only connections, one per reading thread, separate from the writer connection
+        self._readers = threading.local()
+        self._reader_connections: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        # full: every snapshot stores all rows; delta: periodic full bases, otherwise only changed rows
+        self.storage_mode = configure.get('DB', 'STORAGE_MODE', fallback='full').lower()
+        self.delta_base_interval = configure.getint('DB', 'DELTA_BASE_INTERVAL', fallback=60)
+        if self.storage_mode == 'delta' and self.db_type != DB_SQLITE:
+            logger.warning(f"STORAGE_MODE = delta is only supported on SQLite, {self.db_type} stores full snapshots")
+        # Latest stored snapshot per table, as the writer last left it
+        self._delta_states: Dict[str, SnapshotState] = {}
+        # Interned text values, loaded once the schema is in place
+        self.value_dictionary = ValueDictionary()
         self.mongo_client = None
         self.mongo_db = None
         self._initialize_database()
@@ -31,14 +355,55 @@ class DatabaseManager:
     
     def _initialize_sqlite(self):
         try:
-            db_path = configure.get('DB', 'DATABASE_PATH', fallback='nse_data.db')
-            self.db_connection = sqlite3.connect(db_path, check_same_thread=False)
+            self.db_connection = sqlite3.connect(self.db_path, check_same_thread=False)
             self.db_connection.row_factory = sqlite3.Row
+            self._configure_sqlite_connection(self.db_connection)
+            self._migrate_sqlite()
             self._create_sqlite_tables()
+            self.value_dictionary.load(self.db_connection)
         except Exception as e:
             logger.error(f"Failed to initialize SQLite database: {str(e)}")
             raise
     
+    def _configure_sqlite_connection(self, connection: sqlite3.Connection, read_only: bool = False):
+        """Apply journal mode and cache pragmas from [DB]"""
+        pragmas = {
+            name: configure.get('DB', name, fallback=default)
+            for name, default in SQLITE_PRAGMA_DEFAULTS.items()
+        }
+        if not read_only:
+            # The journal mode is a property of the file, set once by the writer
+            # Only takes effect on a new file; retention converts existing files with one full VACUUM
+            connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            journal_mode = connection.execute(f"PRAGMA journal_mode = {pragmas['JOURNAL_MODE']}").fetchone()[0]
+            connection.execute(f"PRAGMA synchronous = {pragmas['SYNCHRONOUS']}")
+            logger.info(f"SQLite journal mode: {journal_mode}")
+        connection.execute(f"PRAGMA cache_size = {int(pragmas['CACHE_SIZE'])}")
+        connection.execute(f"PRAGMA mmap_size = {int(pragmas['MMAP_SIZE'])}")
+        connection.execute(f"PRAGMA temp_store = {pragmas['TEMP_STORE']}")
+        connection.execute(f"PRAGMA busy_timeout = {int(pragmas['BUSY_TIMEOUT'])}")
+
+    def _read_connection(self) -> sqlite3.Connection:
+        """This thread's read-only connection, opened on first use"""
+        connection = getattr(self._readers, 'connection', None)
+        if connection is not None:
+            return connection
+        if self.db_path == ':memory:':
+            # A private in-memory database is only reachable through the writer connection
+            return self.db_connection
+        # mode=ro rejects writes at the SQLite level; under WAL readers never block the writer
+        connection = sqlite3.connect(
+            f"{Path(self.db_path).resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False
+        )
+        connection.row_factory = sqlite3.Row
+        self._configure_sqlite_connection(connection, read_only=True)
+        self._readers.connection = connection
+        with self._readers_lock:
+            self._reader_connections.append(connection)
+        return connection
+
     def _initialize_mongodb(self):
         try:
             mongo_url = configure.get('MONGODB', 'URL')
@@ -46,243 +411,469 @@ class DatabaseManager:
             self.mongo_client = pymongo.MongoClient(mongo_url)
             self.mongo_db = self.mongo_client[db_name]
             self.mongo_client.admin.command('ping')  # Test connection
+            self._create_mongodb_indexes()
+            self._migrate_mongodb()
         except Exception as e:
             logger.error(f"Failed to initialize MongoDB database: {str(e)}")
             raise
+
+    def _create_mongodb_indexes(self):
+        """Mirror the SQLite indexes: latest snapshot per dataset, rows per snapshot and per symbol"""
+        snapshots = self.mongo_db['snapshots']
+        snapshots.create_index([('snapshot_id', pymongo.ASCENDING)], unique=True)
+        snapshots.create_index([
+            ('dataset', pymongo.ASCENDING), ('fetched_at', pymongo.DESCENDING), ('snapshot_id', pymongo.DESCENDING)
+        ])
+        for collection_name, symbol_column in SQLITE_SYMBOL_COLUMNS.items():
+            collection = self.mongo_db[collection_name]
+            collection.create_index([('snapshot_id', pymongo.ASCENDING), ('id', pymongo.ASCENDING)])
+            collection.create_index([(symbol_column, pymongo.ASCENDING), ('snapshot_id', pymongo.DESCENDING)])
+        self.mongo_db['intraday_ohlc'].create_index([
+            ('dataset', pymongo.ASCENDING), ('symbol', pymongo.ASCENDING), ('day', pymongo.ASCENDING)
+        ], unique=True)
+
+    def _migrate_mongodb(self):
+        """
+        Split legacy one-document-per-snapshot entries (embedded data arrays) into row documents
+
+        Resumable: rows and the snapshot are upserted on the legacy document's _id (plus the
+        row index) and the legacy document is deleted last, so a run interrupted in between
+        is finished by the next start without duplicating anything.
+        """
+        for collection_name in SQLITE_SYMBOL_COLUMNS:
+            collection = self.mongo_db[collection_name]
+            for legacy in collection.find({'data': {'$exists': True}}).sort('created_at', pymongo.ASCENDING):
+                migrated = self.mongo_db['snapshots'].find_one({'dataset': collection_name, 'legacy_id': legacy['_id']})
+                if migrated is None:
+                    self._migrate_mongodb_snapshot(collection_name, legacy)
+                collection.delete_one({'_id': legacy['_id']})
+                logger.info(f"Migrated legacy {collection_name} snapshot {legacy['_id']} to row documents")
+
+    def _migrate_mongodb_snapshot(self, collection_name: str, legacy: Dict):
+        records = legacy.get('data') or []
+        if not records:
+            return
+        columns = SQLITE_INSERT_COLUMNS[collection_name]
+        created_at = legacy.get('created_at')
+        if isinstance(created_at, datetime):
+            created_at = created_at.strftime('%Y-%m-%d %H:%M:%S')
+        snapshot_id = self._next_mongodb_ids('snapshots')
+        first_id = self._next_mongodb_ids(collection_name, len(records))
+        self.mongo_db[collection_name].bulk_write([
+            pymongo.ReplaceOne(
+                {'legacy_id': legacy['_id'], 'legacy_row': offset},
+                {
+                    'legacy_id': legacy['_id'], 'legacy_row': offset,
+                    'id': first_id + offset, 'snapshot_id': snapshot_id,
+                    **{column: record.get(column) for column in columns}
+                },
+                upsert=True
+            )
+            for offset, record in enumerate(records)
+        ], ordered=False)
+        # The snapshot document goes in last, so readers never find a snapshot without its rows
+        self.mongo_db['snapshots'].replace_one(
+            {'dataset': collection_name, 'legacy_id': legacy['_id']},
+            {
+                'snapshot_id': snapshot_id,
+                'dataset': collection_name,
+                'legacy_id': legacy['_id'],
+                'data_type': legacy.get('data_type'),
+                # Legacy documents without a timestamp were stamped when they were stored
+                'fetched_at': legacy.get('timestamp') or created_at,
+                'payload_hash': legacy.get('payload_hash'),
+                'row_count': len(records),
+                'created_at': created_at or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            },
+            upsert=True
+        )
+
+    def _next_mongodb_ids(self, sequence: str, count: int = 1) -> int:
+        """Reserve count consecutive integer ids from a counter; returns the first"""
+        counter = self.mongo_db['counters'].find_one_and_update(
+            {'_id': sequence},
+            {'$inc': {'seq': count}},
+            upsert=True,
+            return_document=pymongo.ReturnDocument.AFTER
+        )
+        return counter['seq'] - count + 1
     
     def _create_sqlite_tables(self):
         try:
             cursor = self.db_connection.cursor()
-            # Top gainers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS top_gainers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    data_type TEXT NOT NULL,
-                    category TEXT,
-                    symbol TEXT,
-                    series TEXT,
-                    open_price REAL,
-                    high_price REAL,
-                    low_price REAL,
-                    ltp REAL,
-                    prev_price REAL,
-                    net_price REAL,
-                    per_change REAL,
-                    trade_quantity INTEGER,
-                    turnover REAL,
-                    market_type TEXT,
-                    ca_ex_dt TEXT,
-                    ca_purpose TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            # Top loosers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS top_loosers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    data_type TEXT NOT NULL,
-                    category TEXT,
-                    symbol TEXT,
-                    series TEXT,
-                    open_price REAL,
-                    high_price REAL,
-                    low_price REAL,
-                    ltp REAL,
-                    prev_price REAL,
-                    net_price REAL,
-                    per_change REAL,
-                    trade_quantity INTEGER,
-                    turnover REAL,
-                    market_type TEXT,
-                    ca_ex_dt TEXT,
-                    ca_purpose TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            # New listings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS new_listings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    data_type TEXT NOT NULL,
-                    symbol TEXT,
-                    company_name TEXT,
-                    series TEXT,
-                    listing_date TEXT,
-                    face_value REAL,
-                    issue_price REAL,
-                    listing_price REAL,
-                    listing_gains REAL,
-                    listing_gains_percent REAL,
-                    current_price REAL,
-                    current_gains REAL,
-                    current_gains_percent REAL,
-                    market_cap REAL,
-                    category TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            # IPO data table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ipo_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    data_type TEXT NOT NULL,
-                    company_name TEXT,
-                    symbol TEXT,
-                    series TEXT,
-                    issue_start_date TEXT,
-                    issue_end_date TEXT,
-                    listing_date TEXT,
-                    issue_price REAL,
-                    issue_size REAL,
-                    lot_size INTEGER,
-                    issue_type TEXT,
-                    category TEXT,
-                    grade TEXT,
-                    status TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            # All indexes table
+            # One row per stored scrape; row tables reference it by snapshot_id
+            cursor.execute(SQLITE_SNAPSHOTS_TABLE)
+            cursor.execute(SQLITE_SNAPSHOTS_INDEX)
+            # Distinct text values that row tables reference by id (SQLITE_INTERNED_COLUMNS)
+            cursor.execute(SQLITE_DICTIONARY_TABLE)
+            # Per-symbol daily rollups of raw snapshots removed by retention
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS all_indexes (
+                CREATE TABLE IF NOT EXISTS intraday_ohlc (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    data_type TEXT NOT NULL,
-                    index_name TEXT,
-                    index_symbol TEXT,
-                    last_price REAL,
-                    variation REAL,
-                    percent_change REAL,
-                    open_price REAL,
+                    dataset TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    open REAL,
                     high REAL,
                     low REAL,
-                    previous_close REAL,
-                    year_high REAL,
-                    year_low REAL,
-                    pe REAL,
-                    pb REAL,
-                    div_yield REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    close REAL,
+                    volume REAL,
+                    samples INTEGER NOT NULL,
+                    first_at TEXT NOT NULL,
+                    last_at TEXT NOT NULL,
+                    UNIQUE (dataset, symbol, day)
                 )
             ''')
+            for statements in SQLITE_CREATE_TABLES.values():
+                for statement in statements:
+                    cursor.execute(statement)
             self.db_connection.commit()
             logger.info("SQLite tables created successfully")
         except Exception as e:
             logger.error(f"Failed to create SQLite tables: {str(e)}")
             raise
     
-    def save_data(self, data: Dict, table_name: str):
+    def _migrate_sqlite(self):
+        """Bring an existing database file up to SQLITE_MIGRATIONS, tracked in PRAGMA user_version"""
+        try:
+            version = self.db_connection.execute('PRAGMA user_version').fetchone()[0]
+            for target, migration in enumerate(SQLITE_MIGRATIONS[version:], start=version + 1):
+                with self._write_lock:
+                    cursor = self.db_connection.cursor()
+                    cursor.execute('BEGIN IMMEDIATE')
+                    try:
+                        # Another process or manager may have migrated the file since the read above
+                        if cursor.execute('PRAGMA user_version').fetchone()[0] >= target:
+                            self.db_connection.rollback()
+                            continue
+                        migration(cursor)
+                        # user_version cannot be bound as a parameter
+                        cursor.execute(f'PRAGMA user_version = {target}')
+                        self.db_connection.commit()
+                    except Exception:
+                        self.db_connection.rollback()
+                        raise
+                logger.info(f"SQLite schema migrated to version {target}")
+        except Exception as e:
+            logger.error(f"Failed to migrate SQLite database: {str(e)}")
+            raise
+
+    def save_data(self, data: Dict, table_name: str, payload_hash: str = None):
         try:
             if self.db_type == DB_SQLITE:
-                self._save_to_sqlite(data, table_name)
+                self._save_to_sqlite(data, table_name, payload_hash)
             elif self.db_type == DB_MONGODB:
-                self._save_to_mongodb(data, table_name)
+                self._save_to_mongodb(data, table_name, payload_hash)
             logger.info(f"Data saved to {table_name} table")
         except Exception as e:
             logger.error(f"Failed to save data to {table_name}: {str(e)}")
             raise
     
-    def _save_to_sqlite(self, data: Dict, table_name: str):
+    def save_batch(self, snapshots: List[Tuple[Dict, str, Optional[str]]]):
+        """Save several (data, table_name, payload_hash) snapshots, in one transaction on SQLite"""
         try:
-            cursor = self.db_connection.cursor()
-            for record in data.get('data', []):
-                if table_name in ['top_gainers', 'top_loosers']:
-                    cursor.execute(f'''
-                        INSERT INTO {table_name} (
-                            timestamp, data_type, category, symbol, series,
-                            open_price, high_price, low_price, ltp, prev_price,
-                            net_price, per_change, trade_quantity, turnover,
-                            market_type, ca_ex_dt, ca_purpose
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        data.get('timestamp'), data.get('data_type'),
-                        record.get('category'), record.get('symbol'),
-                        record.get('series'), record.get('open_price'),
-                        record.get('high_price'), record.get('low_price'),
-                        record.get('ltp'), record.get('prev_price'),
-                        record.get('net_price'), record.get('per_change'),
-                        record.get('trade_quantity'), record.get('turnover'),
-                        record.get('market_type'), record.get('ca_ex_dt'),
-                        record.get('ca_purpose')
-                    ))
-                elif table_name == 'new_listings':
-                    cursor.execute('''
-                        INSERT INTO new_listings (
-                            timestamp, data_type, symbol, company_name, series,
-                            listing_date, face_value, issue_price, listing_price,
-                            listing_gains, listing_gains_percent, current_price,
-                            current_gains, current_gains_percent, market_cap, category
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        data.get('timestamp'), data.get('data_type'),
-                        record.get('symbol'), record.get('company_name'),
-                        record.get('series'), record.get('listing_date'),
-                        record.get('face_value'), record.get('issue_price'),
-                        record.get('listing_price'), record.get('listing_gains'),
-                        record.get('listing_gains_percent'), record.get('current_price'),
-                        record.get('current_gains'), record.get('current_gains_percent'),
-                        record.get('market_cap'), record.get('category')
-                    ))
-                elif table_name == 'ipo_data':
-                    cursor.execute('''
-                        INSERT INTO ipo_data (
-                            timestamp, data_type, company_name, symbol, series,
-                            issue_start_date, issue_end_date, listing_date,
-                            issue_price, issue_size, lot_size, issue_type,
-                            category, grade, status
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        data.get('timestamp'), data.get('data_type'),
-                        record.get('company_name'), record.get('symbol'),
-                        record.get('series'), record.get('issue_start_date'),
-                        record.get('issue_end_date'), record.get('listing_date'),
-                        record.get('issue_price'), record.get('issue_size'),
-                        record.get('lot_size'), record.get('issue_type'),
-                        record.get('category'), record.get('grade'),
-                        record.get('status')
-                    ))
-                elif table_name == 'all_indexes':
-                    cursor.execute('''
-                        INSERT INTO all_indexes (
-                            timestamp, data_type, index_name, index_symbol,
-                            last_price, variation, percent_change, open_price,
-                            high, low, previous_close, year_high, year_low,
-                            pe, pb, div_yield
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        data.get('timestamp'), data.get('data_type'),
-                        record.get('index_name'), record.get('index_symbol'),
-                        record.get('last_price'), record.get('variation'),
-                        record.get('percent_change'), record.get('open'),
-                        record.get('high'), record.get('low'),
-                        record.get('previous_close'), record.get('year_high'),
-                        record.get('year_low'), record.get('pe'),
-                        record.get('pb'), record.get('div_yield')
-                    ))
-            self.db_connection.commit()
+            if self.db_type == DB_SQLITE:
+                self._save_batch_to_sqlite(snapshots)
+            elif self.db_type == DB_MONGODB:
+                for data, table_name, payload_hash in snapshots:
+                    self._save_to_mongodb(data, table_name, payload_hash)
+            logger.info(f"Saved a batch of {len(snapshots)} snapshots")
+        except Exception as e:
+            logger.error(f"Failed to save batch of {len(snapshots)} snapshots: {str(e)}")
+            raise
+
+    def _insert_snapshot(self, cursor: sqlite3.Cursor, data: Dict, table_name: str, payload_hash: str = None):
+        """Insert one snapshot row and its records inside the caller's transaction"""
+        insert_sql, columns = SQLITE_INSERTS[table_name]
+        records = data.get('data', [])
+        if not records:
+            return
+        key_columns = SNAPSHOT_KEY_COLUMNS.get(table_name)
+        delta_mode = self.storage_mode == 'delta' and key_columns is not None
+
+        diff, previous = None, None
+        if delta_mode:
+            previous = self._latest_delta_state(cursor, table_name)
+            if previous is not None and previous.chain_length + 1 < self.delta_base_interval:
+                diff = diff_records(previous, records, columns, key_columns)
+
+        upserts, removed, order = diff if diff is not None else (records, [], None)
+        cursor.execute(
+            "INSERT INTO snapshots (dataset, data_type, fetched_at, payload_hash, row_count, parent_id, row_order) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                table_name, data.get('data_type'), data.get('timestamp'), payload_hash, len(records),
+                previous.snapshot_id if diff is not None else None,
+                json.dumps(order) if order is not None else None
+            )
+        )
+        snapshot_id = cursor.lastrowid
+        cursor.executemany(insert_sql, self._row_values(cursor, table_name, snapshot_id, upserts))
+        if removed:
+            interned = SQLITE_INTERNED_COLUMNS.get(table_name, ())
+            cursor.executemany(
+                f"INSERT INTO {table_name} (snapshot_id, removed, "
+                f"{', '.join(_stored_column(table_name, column) for column in key_columns)}) "
+                f"VALUES ({', '.join('?' * (len(key_columns) + 2))})",
+                [
+                    (snapshot_id, 1, *[
+                        self.value_dictionary.encode(cursor, value) if column in interned else value
+                        for column, value in zip(key_columns, key)
+                    ])
+                    for key in removed
+                ]
+            )
+
+        if delta_mode:
+            keys = [row_key(record, key_columns) for record in records]
+            if diff is not None:
+                self._delta_states[table_name] = apply_delta(previous, snapshot_id, upserts, removed, order, key_columns)
+            elif len(set(keys)) == len(keys):
+                self._delta_states[table_name] = SnapshotState(snapshot_id, dict(zip(keys, records)), keys)
+            else:
+                # Repeated keys: the next snapshot has nothing to diff against
+                self._delta_states.pop(table_name, None)
+
+    def _row_values(self, cursor: sqlite3.Cursor, table_name: str, snapshot_id: int, records: List[Dict]) -> List[tuple]:
+        """Parameters of SQLITE_INSERTS[table_name] for records, built column by column; interned columns as ids"""
+        interned = SQLITE_INTERNED_COLUMNS.get(table_name, ())
+        columns = SQLITE_INSERT_COLUMNS[table_name]
+        values = [
+            self.value_dictionary.encode_all(cursor, column_values) if column in interned else column_values
+            for column, column_values in zip(columns, record_columns(records, columns))
+        ]
+        return list(zip(repeat(snapshot_id, len(records)), *values))
+
+    def _latest_delta_state(self, cursor: sqlite3.Cursor, table_name: str) -> Optional[SnapshotState]:
+        """The table's newest stored snapshot, from the writer cache when nothing else wrote since"""
+        cursor.execute("SELECT MAX(id) FROM snapshots WHERE dataset = ?", (table_name,))
+        latest_id = cursor.fetchone()[0]
+        if latest_id is None:
+            return None
+        cached = self._delta_states.get(table_name)
+        if cached is not None and cached.snapshot_id == latest_id:
+            return cached
+        state = self._rebuild_snapshots(self.db_connection, table_name, [latest_id])[latest_id]
+        if len(set(state.order)) != len(state.order):
+            # A full snapshot with repeated keys cannot be diffed against
+            return None
+        return state
+
+    def _save_to_sqlite(self, data: Dict, table_name: str, payload_hash: str = None):
+        try:
+            self._save_batch_to_sqlite([(data, table_name, payload_hash)])
         except Exception as e:
             logger.error(f"Failed to save data to SQLite: {str(e)}")
             raise
+
+    def _save_batch_to_sqlite(self, snapshots: List[Tuple[Dict, str, Optional[str]]]):
+        if not any(data.get('data') for data, _, _ in snapshots):
+            return
+        # Each snapshot row and all of its records commit together, so readers never see half a snapshot
+        with self._write_lock:
+            cursor = self.db_connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                for data, table_name, payload_hash in snapshots:
+                    self._insert_snapshot(cursor, data, table_name, payload_hash)
+                self.db_connection.commit()
+            except Exception:
+                self.db_connection.rollback()
+                # The caches may describe snapshots and values that were just rolled back
+                self._delta_states.clear()
+                self.value_dictionary.load(self.db_connection)
+                raise
     
-    def _save_to_mongodb(self, data: Dict, collection_name: str):
+    def _save_to_mongodb(self, data: Dict, collection_name: str, payload_hash: str = None):
         try:
-            collection = self.mongo_db[collection_name]
-            document = {
-                'timestamp': data.get('timestamp'),
+            records = data.get('data', [])
+            if not records:
+                return
+            columns = SQLITE_INSERT_COLUMNS[collection_name]
+            snapshot_id = self._next_mongodb_ids('snapshots')
+            first_id = self._next_mongodb_ids(collection_name, len(records))
+            # Same row shape as SQLite: integer id, snapshot_id and the table's columns
+            self.mongo_db[collection_name].insert_many(
+                [
+                    {'id': first_id + offset, 'snapshot_id': snapshot_id, **{column: record.get(column) for column in columns}}
+                    for offset, record in enumerate(records)
+                ],
+                ordered=False
+            )
+            # The snapshot document goes in last, so readers never find a snapshot without its rows
+            self.mongo_db['snapshots'].insert_one({
+                'snapshot_id': snapshot_id,
+                'dataset': collection_name,
                 'data_type': data.get('data_type'),
-                'data': data.get('data', []),
-                'created_at': datetime.now().isoformat()
-            }
-            collection.insert_one(document)
+                'fetched_at': data.get('timestamp'),
+                'payload_hash': payload_hash,
+                'row_count': len(records),
+                # Matches SQLite CURRENT_TIMESTAMP
+                'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            })
         except Exception as e:
             logger.error(f"Failed to save data to MongoDB: {str(e)}")
             raise
     
+    def apply_retention(self, table_name: str, cutoff: str) -> Dict:
+        """Roll up and delete raw snapshots of table_name fetched before cutoff (ISO timestamp)"""
+        try:
+            if self.db_type == DB_SQLITE:
+                return self._apply_sqlite_retention(table_name, cutoff)
+            elif self.db_type == DB_MONGODB:
+                return self._apply_mongodb_retention(table_name, cutoff)
+        except Exception as e:
+            logger.error(f"Failed to apply retention to {table_name}: {str(e)}")
+            raise
+
+    def _apply_sqlite_retention(self, table_name: str, cutoff: str) -> Dict:
+        symbol_column = _stored_column(table_name, SQLITE_SYMBOL_COLUMNS[table_name])
+        symbol = _decoded_column(table_name, SQLITE_SYMBOL_COLUMNS[table_name], 'rows')
+        expired = "SELECT id FROM snapshots WHERE dataset = ? AND fetched_at < ?"
+        with self._write_lock:
+            cursor = self.db_connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                rollups = 0
+                has_deltas = cursor.execute(
+                    "SELECT 1 FROM snapshots WHERE dataset = ? AND fetched_at < ? AND parent_id IS NOT NULL LIMIT 1",
+                    (table_name, cutoff)
+                ).fetchone() is not None
+                if table_name in SQLITE_ROLLUP_COLUMNS and has_deltas:
+                    rollups = self._roll_up_rebuilt_snapshots(cursor, table_name, cutoff)
+                elif table_name in SQLITE_ROLLUP_COLUMNS:
+                    price_column, volume_column = SQLITE_ROLLUP_COLUMNS[table_name]
+                    # open/close come from the first/last snapshot of each symbol's day
+                    cursor.execute(f'''
+                        INSERT INTO intraday_ohlc (dataset, symbol, day, open, high, low, close, volume, samples, first_at, last_at)
+                        SELECT ?, symbol, day, MAX(open), MAX(price), MIN(price), MAX(close), MAX(volume),
+                               COUNT(*), MIN(fetched_at), MAX(fetched_at)
+                        FROM (
+                            SELECT {symbol} AS symbol, substr(snapshots.fetched_at, 1, 10) AS day,
+                                   rows.{price_column} AS price, {f'rows.{volume_column}' if volume_column else 'NULL'} AS volume,
+                                   snapshots.fetched_at,
+                                   FIRST_VALUE(rows.{price_column}) OVER day_window AS open,
+                                   LAST_VALUE(rows.{price_column}) OVER day_window AS close
+                            FROM {table_name} AS rows JOIN snapshots ON snapshots.id = rows.snapshot_id
+                            {_dictionary_joins(table_name, [SQLITE_SYMBOL_COLUMNS[table_name]], 'rows')}
+                            WHERE snapshots.dataset = ? AND snapshots.fetched_at < ? AND rows.{symbol_column} IS NOT NULL
+                                AND rows.removed = 0
+                            WINDOW day_window AS (
+                                PARTITION BY rows.{symbol_column}, substr(snapshots.fetched_at, 1, 10)
+                                ORDER BY snapshots.fetched_at, rows.id
+                                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                            )
+                        )
+                        GROUP BY symbol, day
+                        {SQLITE_OHLC_MERGE}
+                    ''', (table_name, table_name, cutoff))
+                    rollups = cursor.rowcount
+                self._rebase_orphaned_deltas(cursor, table_name, cutoff)
+                cursor.execute(f"DELETE FROM {table_name} WHERE snapshot_id IN ({expired})", (table_name, cutoff))
+                rows = cursor.rowcount
+                cursor.execute(f"DELETE FROM snapshots WHERE id IN ({expired})", (table_name, cutoff))
+                snapshots = cursor.rowcount
+                self.db_connection.commit()
+            except Exception:
+                self.db_connection.rollback()
+                raise
+        return {"snapshots": snapshots, "rows": rows, "rollups": rollups}
+
+    def _apply_mongodb_retention(self, table_name: str, cutoff: str) -> Dict:
+        expired = [
+            {'id': snapshot.pop('snapshot_id'), **snapshot}
+            for snapshot in self.mongo_db['snapshots'].find(
+                {'dataset': table_name, 'fetched_at': {'$lt': cutoff}}, MONGODB_SNAPSHOT_PROJECTION
+            ).sort([('fetched_at', pymongo.ASCENDING), ('snapshot_id', pymongo.ASCENDING)])
+        ]
+        if not expired:
+            return {"snapshots": 0, "rows": 0, "rollups": 0}
+
+        rollups = 0
+        if table_name in SQLITE_ROLLUP_COLUMNS:
+            rows = self._get_mongodb_snapshot_rows(table_name, expired)
+            bars = _daily_bars(table_name, ((row['timestamp'], row) for row in rows))
+            collection = self.mongo_db['intraday_ohlc']
+            for (symbol, day), bar in bars.items():
+                key = {'dataset': table_name, 'symbol': symbol, 'day': day}
+                existing = collection.find_one(key, {'_id': 0})
+                if existing:
+                    bar = _merge_bars(existing, bar)
+                collection.replace_one(key, {**key, **bar}, upsert=True)
+            rollups = len(bars)
+
+        # Snapshot documents go first, so readers never find a snapshot without its rows
+        snapshot_ids = [snapshot['id'] for snapshot in expired]
+        self.mongo_db['snapshots'].delete_many({'snapshot_id': {'$in': snapshot_ids}})
+        rows = self.mongo_db[table_name].delete_many({'snapshot_id': {'$in': snapshot_ids}}).deleted_count
+        return {"snapshots": len(expired), "rows": rows, "rollups": rollups}
+
+    def _roll_up_rebuilt_snapshots(self, cursor: sqlite3.Cursor, table_name: str, cutoff: str) -> int:
+        """
+        Roll up snapshots fetched before cutoff from their rebuilt records
+
+        Delta snapshots store only the rows that changed, so the SQL rollup would count an
+        unchanged symbol once instead of once per snapshot; rebuilding gives the same bars
+        as full storage.
+        """
+        expired = cursor.execute(
+            "SELECT id, fetched_at FROM snapshots WHERE dataset = ? AND fetched_at < ? ORDER BY fetched_at, id",
+            (table_name, cutoff)
+        ).fetchall()
+        states = self._rebuild_snapshots(self.db_connection, table_name, [snapshot_id for snapshot_id, _ in expired])
+        bars = _daily_bars(table_name, (
+            (fetched_at, record) for snapshot_id, fetched_at in expired for record in states[snapshot_id].records()
+        ))
+        cursor.executemany(f'''
+            INSERT INTO intraday_ohlc (dataset, symbol, day, open, high, low, close, volume, samples, first_at, last_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            {SQLITE_OHLC_MERGE}
+        ''', [
+            (
+                table_name, symbol, day, bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'],
+                bar['samples'], bar['first_at'], bar['last_at']
+            )
+            for (symbol, day), bar in bars.items()
+        ])
+        return len(bars)
+
+    def _rebase_orphaned_deltas(self, cursor: sqlite3.Cursor, table_name: str, cutoff: str):
+        """Rewrite kept delta snapshots whose parent is about to expire as full snapshots"""
+        cursor.execute('''
+            SELECT kept.id FROM snapshots AS kept JOIN snapshots AS parent ON parent.id = kept.parent_id
+            WHERE kept.dataset = ? AND kept.fetched_at >= ? AND parent.fetched_at < ?
+            ORDER BY kept.id
+        ''', (table_name, cutoff, cutoff))
+        orphaned = [row[0] for row in cursor.fetchall()]
+        if not orphaned:
+            return
+        insert_sql, _ = SQLITE_INSERTS[table_name]
+        states = self._rebuild_snapshots(self.db_connection, table_name, orphaned)
+        for snapshot_id in orphaned:
+            cursor.execute(f"DELETE FROM {table_name} WHERE snapshot_id = ?", (snapshot_id,))
+            cursor.executemany(insert_sql, self._row_values(cursor, table_name, snapshot_id, states[snapshot_id].records()))
+            cursor.execute("UPDATE snapshots SET parent_id = NULL, row_order = NULL WHERE id = ?", (snapshot_id,))
+        self._delta_states.pop(table_name, None)
+
+    def compact(self, pages: int = 0):
+        """Return free pages to the filesystem with an incremental vacuum (pages=0 frees all)"""
+        try:
+            if self.db_type != DB_SQLITE:
+                return
+            with self._write_lock:
+                if self.db_connection.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                    # Files created before incremental auto_vacuum need one full VACUUM to switch
+                    logger.info("Converting SQLite database to incremental auto_vacuum")
+                    self.db_connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                    self.db_connection.execute('VACUUM')
+                else:
+                    self.db_connection.execute(f'PRAGMA incremental_vacuum({int(pages)})').fetchall()
+        except Exception as e:
+            logger.error(f"Failed to compact SQLite database: {str(e)}")
+            raise
+
     def get_latest_data(self, table_name: str, limit: int = 50) -> List[Dict]:
+        """Rows of the newest whole snapshots that fit in limit; the latest snapshot is always returned complete"""
         try:
             if self.db_type == DB_SQLITE:
                 return self._get_from_sqlite(table_name, limit)
@@ -291,35 +882,388 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Failed to get data from {table_name}: {str(e)}")
             raise
-    
+
+    def get_latest_snapshot(self, table_name: str) -> Optional[Dict]:
+        """The newest snapshot of a table with its metadata, None when nothing is stored"""
+        try:
+            if self.db_type == DB_SQLITE:
+                return self._get_latest_snapshot_from_sqlite(table_name)
+            elif self.db_type == DB_MONGODB:
+                return self._get_latest_snapshot_from_mongodb(table_name)
+        except Exception as e:
+            logger.error(f"Failed to get latest snapshot from {table_name}: {str(e)}")
+            raise
+
+    def get_symbol_history(
+        self,
+        table_name: str,
+        symbols: List[str],
+        start: str,
+        end: str,
+        fields: List[str]
+    ) -> Dict[str, List]:
+        """
+        Time series of fields for symbols over [start, end], as column arrays
+
+        Returns {"symbol": [...], "timestamp": [...], <field>: [...]} ordered by time,
+        one point per symbol per snapshot.
+        """
+        try:
+            unknown = [field for field in fields if field not in SQLITE_INSERT_COLUMNS[table_name]]
+            if unknown:
+                raise ValueError(f"Unknown {table_name} fields: {', '.join(unknown)}")
+            if self.db_type == DB_SQLITE:
+                rows = self._get_symbol_history_from_sqlite(table_name, symbols, start, end, fields)
+            elif self.db_type == DB_MONGODB:
+                rows = self._get_symbol_history_from_mongodb(table_name, symbols, start, end, fields)
+            columns = ['symbol', 'timestamp', *fields]
+            return {column: [row[index] for row in rows] for index, column in enumerate(columns)}
+        except Exception as e:
+            logger.error(f"Failed to get symbol history from {table_name}: {str(e)}")
+            raise
+
+    def _get_symbol_history_from_sqlite(
+        self, table_name: str, symbols: List[str], start: str, end: str, fields: List[str]
+    ) -> List[tuple]:
+        connection = self._read_connection()
+        snapshots = connection.execute(
+            "SELECT id, fetched_at, parent_id FROM snapshots WHERE dataset = ? AND fetched_at >= ? AND fetched_at <= ?"
+            " ORDER BY fetched_at, id",
+            (table_name, start, end)
+        ).fetchall()
+        if any(parent_id is not None for _, _, parent_id in snapshots):
+            return self._get_symbol_history_from_rebuilt(connection, table_name, snapshots, symbols, fields)
+        symbol_column = _stored_column(table_name, SQLITE_SYMBOL_COLUMNS[table_name])
+        symbol = _decoded_column(table_name, SQLITE_SYMBOL_COLUMNS[table_name], 'rows')
+        if symbol_column != SQLITE_SYMBOL_COLUMNS[table_name]:
+            # Interned symbols are filtered by id; a symbol never stored has no history
+            symbols = list(self.value_dictionary.lookup(connection, symbols).values())
+            if not symbols:
+                return []
+        if not snapshots:
+            return []
+        # Snapshot ids grow with time, so the window becomes an id range that the
+        # (symbol, snapshot_id) index answers with one range scan per symbol
+        first_id = min(snapshot_id for snapshot_id, _, _ in snapshots)
+        last_id = max(snapshot_id for snapshot_id, _, _ in snapshots)
+        # Grouped payloads list a symbol once per category; keep its first row per snapshot
+        return [tuple(row)[:-1] for row in connection.execute(f'''
+            SELECT {symbol}, snapshots.fetched_at,
+                   {', '.join(_decoded_column(table_name, field, 'rows') for field in fields)}, MIN(rows.id)
+            FROM {table_name} AS rows JOIN snapshots ON snapshots.id = rows.snapshot_id
+            {_dictionary_joins(table_name, [SQLITE_SYMBOL_COLUMNS[table_name], *fields], 'rows')}
+            WHERE rows.{symbol_column} IN ({', '.join('?' * len(symbols))})
+                AND rows.snapshot_id BETWEEN ? AND ?
+                AND rows.removed = 0
+                AND snapshots.fetched_at >= ? AND snapshots.fetched_at <= ?
+            GROUP BY rows.snapshot_id, rows.{symbol_column}
+            ORDER BY snapshots.fetched_at, rows.snapshot_id, {symbol}
+        ''', (*symbols, first_id, last_id, start, end))]
+
+    def _get_symbol_history_from_rebuilt(
+        self, connection: sqlite3.Connection, table_name: str, snapshots: List[tuple], symbols: List[str],
+        fields: List[str]
+    ) -> List[tuple]:
+        """
+        History read from rebuilt snapshots, which delta snapshots need: they store only the rows that changed
+
+        Only the requested symbols' rows are rebuilt.
+        """
+        symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+        wanted = set(symbols)
+        states = self._rebuild_snapshots(
+            connection, table_name, [snapshot_id for snapshot_id, _, _ in snapshots], symbols
+        )
+        rows = []
+        for snapshot_id, fetched_at, _ in snapshots:
+            points = {}
+            for record in states[snapshot_id].records():
+                if record[symbol_column] in wanted and record[symbol_column] not in points:
+                    points[record[symbol_column]] = (
+                        record[symbol_column], fetched_at, *[record[field] for field in fields]
+                    )
+            rows.extend(points[symbol] for symbol in sorted(points))
+        return rows
+
+    def _get_symbol_history_from_mongodb(
+        self, table_name: str, symbols: List[str], start: str, end: str, fields: List[str]
+    ) -> List[tuple]:
+        symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+        fetched_at = {
+            snapshot['snapshot_id']: snapshot['fetched_at']
+            for snapshot in self.mongo_db['snapshots'].find(
+                {'dataset': table_name, 'fetched_at': {'$gte': start, '$lte': end}},
+                {'_id': 0, 'snapshot_id': 1, 'fetched_at': 1}
+            )
+        }
+        if not fetched_at:
+            return []
+        documents = self.mongo_db[table_name].find(
+            {symbol_column: {'$in': symbols}, 'snapshot_id': {'$gte': min(fetched_at), '$lte': max(fetched_at)}},
+            {'_id': 0, 'snapshot_id': 1, symbol_column: 1, **{field: 1 for field in fields}}
+        ).sort([(symbol_column, pymongo.ASCENDING), ('snapshot_id', pymongo.ASCENDING), ('id', pymongo.ASCENDING)])
+        points = {}
+        for document in documents:
+            key = (document['snapshot_id'], document[symbol_column])
+            if document['snapshot_id'] in fetched_at and key not in points:
+                points[key] = (
+                    document[symbol_column], fetched_at[document['snapshot_id']],
+                    *[document.get(field) for field in fields]
+                )
+        return [points[key] for key in sorted(points, key=lambda key: (fetched_at[key[0]], key[0], key[1]))]
+
+    def get_snapshots_between(self, table_name: str, start: str, end: str) -> List[Dict]:
+        """Rows of every snapshot fetched in [start, end), oldest snapshot first"""
+        try:
+            if self.db_type == DB_SQLITE:
+                cursor = self._read_connection().cursor()
+                cursor.execute(
+                    "SELECT id FROM snapshots WHERE dataset = ? AND fetched_at >= ? AND fetched_at < ? "
+                    "ORDER BY fetched_at, id",
+                    (table_name, start, end)
+                )
+                snapshot_ids = [row[0] for row in cursor.fetchall()]
+                rows = self._get_snapshot_rows(table_name, snapshot_ids) if snapshot_ids else []
+            elif self.db_type == DB_MONGODB:
+                snapshots = self.mongo_db['snapshots'].find(
+                    {'dataset': table_name, 'fetched_at': {'$gte': start, '$lt': end}},
+                    MONGODB_SNAPSHOT_PROJECTION
+                ).sort([('fetched_at', pymongo.DESCENDING), ('snapshot_id', pymongo.DESCENDING)])
+                snapshots = [{'id': snapshot.pop('snapshot_id'), **snapshot} for snapshot in snapshots]
+                rows = self._get_mongodb_snapshot_rows(table_name, snapshots) if snapshots else []
+            # Both row readers return newest first; archives read better oldest first.
+            # The sort is stable, so records keep their payload order within a snapshot
+            rows.sort(key=lambda row: (row['timestamp'], row['snapshot_id']))
+            return rows
+        except Exception as e:
+            logger.error(f"Failed to get snapshots between {start} and {end} from {table_name}: {str(e)}")
+            raise
+
+    def get_snapshot_bounds(self, table_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """fetched_at of the oldest and newest stored snapshot of a table"""
+        try:
+            if self.db_type == DB_SQLITE:
+                row = self._read_connection().execute(
+                    "SELECT MIN(fetched_at), MAX(fetched_at) FROM snapshots WHERE dataset = ?", (table_name,)
+                ).fetchone()
+                return row[0], row[1]
+            elif self.db_type == DB_MONGODB:
+                snapshots = self.mongo_db['snapshots']
+                oldest = snapshots.find_one({'dataset': table_name}, sort=[('fetched_at', pymongo.ASCENDING)])
+                newest = snapshots.find_one({'dataset': table_name}, sort=[('fetched_at', pymongo.DESCENDING)])
+                return (oldest or {}).get('fetched_at'), (newest or {}).get('fetched_at')
+        except Exception as e:
+            logger.error(f"Failed to get snapshot bounds of {table_name}: {str(e)}")
+            raise
+
+    def _latest_snapshots(self, table_name: str, limit: int) -> List[sqlite3.Row]:
+        """Newest snapshot rows for a table, read through idx_snapshots_dataset_fetched_at"""
+        cursor = self._read_connection().cursor()
+        cursor.execute('''
+            SELECT id, dataset, data_type, fetched_at, payload_hash, row_count, created_at FROM snapshots
+            WHERE dataset = ?
+            ORDER BY fetched_at DESC, id DESC
+            LIMIT ?
+        ''', (table_name, limit))
+        return cursor.fetchall()
+
+    def _get_snapshot_rows(self, table_name: str, snapshot_ids: List[int]) -> List[Record]:
+        """Records of the given snapshots, newest snapshot first, tagged with their snapshot fields"""
+        connection = self._read_connection()
+        columns = SQLITE_INSERT_COLUMNS[table_name]
+        row_type = ROW_TYPES[table_name]
+        placeholders = ', '.join('?' * len(snapshot_ids))
+        snapshots = connection.execute(f'''
+            SELECT id, fetched_at, data_type, created_at, parent_id FROM snapshots
+            WHERE id IN ({placeholders})
+            ORDER BY fetched_at DESC, id DESC
+        ''', snapshot_ids).fetchall()
+
+        if all(snapshot['parent_id'] is None for snapshot in snapshots):
+            # Full snapshots hold every record themselves
+            cursor = connection.execute(f'''
+                SELECT {table_name}.id, {table_name}.snapshot_id, {SQLITE_SELECT_COLUMNS[table_name]},
+                       snapshots.fetched_at AS timestamp, snapshots.data_type, snapshots.created_at
+                FROM {table_name} JOIN snapshots ON snapshots.id = {table_name}.snapshot_id
+                {SQLITE_DICTIONARY_JOINS[table_name]}
+                WHERE {table_name}.snapshot_id IN ({placeholders})
+                ORDER BY snapshots.fetched_at DESC, {table_name}.snapshot_id DESC, {table_name}.id
+            ''', snapshot_ids)
+            # The projection is in ROW_TYPES field order
+            return [row_type(*row) for row in cursor.fetchall()]
+
+        states = self._rebuild_snapshots(connection, table_name, [snapshot['id'] for snapshot in snapshots])
+        rows = []
+        for snapshot in snapshots:
+            for record in states[snapshot['id']].records():
+                rows.append(row_type(
+                    record['id'],
+                    snapshot['id'],
+                    *[record.get(column) for column in columns],
+                    snapshot['fetched_at'],
+                    snapshot['data_type'],
+                    snapshot['created_at']
+                ))
+        return rows
+
+    def _rebuild_snapshots(
+        self, connection: sqlite3.Connection, table_name: str, snapshot_ids: List[int], symbols: List[str] = None
+    ) -> Dict[int, SnapshotState]:
+        """
+        Rebuild snapshots by replaying their delta chains from the nearest full base
+
+        With symbols, only those symbols' rows are read and rebuilt, which needs the
+        symbol to be part of the row key; otherwise every row is.
+        """
+        key_columns = SNAPSHOT_KEY_COLUMNS.get(table_name, ('id',))
+        symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+        symbol_filter, symbol_params = '', []
+        if symbols is not None and symbol_column in key_columns:
+            symbol_params = symbols
+            if _stored_column(table_name, symbol_column) != symbol_column:
+                symbol_params = list(self.value_dictionary.lookup(connection, symbols).values())
+            symbol_filter = (
+                f"AND {table_name}.{_stored_column(table_name, symbol_column)} IN ({', '.join('?' * len(symbol_params))})"
+            )
+            wanted, symbol_index = set(symbols), key_columns.index(symbol_column)
+        chain = connection.execute(f'''
+            WITH RECURSIVE chain(id) AS (
+                SELECT id FROM snapshots WHERE id IN ({', '.join('?' * len(snapshot_ids))})
+                UNION
+                SELECT snapshots.parent_id FROM snapshots JOIN chain ON snapshots.id = chain.id
+                WHERE snapshots.parent_id IS NOT NULL
+            )
+            SELECT snapshots.id, snapshots.parent_id, snapshots.row_order
+            FROM snapshots JOIN chain ON snapshots.id = chain.id
+            ORDER BY snapshots.id
+        ''', snapshot_ids).fetchall()
+
+        stored: Dict[int, List[Dict]] = {snapshot[0]: [] for snapshot in chain}
+        cursor = connection.execute(f'''
+            SELECT {table_name}.id, {table_name}.snapshot_id, {table_name}.removed, {SQLITE_SELECT_COLUMNS[table_name]}
+            FROM {table_name} {SQLITE_DICTIONARY_JOINS[table_name]}
+            WHERE {table_name}.snapshot_id IN ({', '.join('?' * len(stored))}) {symbol_filter}
+            ORDER BY {table_name}.snapshot_id, {table_name}.id
+        ''', [*stored, *symbol_params])
+        for row in cursor.fetchall():
+            stored[row['snapshot_id']].append(dict(row))
+
+        # Parents always have lower ids than their deltas
+        states: Dict[int, SnapshotState] = {}
+        for snapshot_id, parent_id, row_order in chain:
+            rows = stored[snapshot_id]
+            if parent_id is None:
+                keys = [row_key(row, key_columns) for row in rows]
+                states[snapshot_id] = SnapshotState(snapshot_id, dict(zip(keys, rows)), keys, stored_records=rows)
+            else:
+                order = json.loads(row_order) if row_order else None
+                if order is not None and symbol_filter:
+                    order = [key for key in order if key[symbol_index] in wanted]
+                states[snapshot_id] = apply_delta(
+                    states[parent_id],
+                    snapshot_id,
+                    [row for row in rows if not row['removed']],
+                    [row_key(row, key_columns) for row in rows if row['removed']],
+                    order,
+                    key_columns
+                )
+        return states
 
     def _get_from_sqlite(self, table_name: str, limit: int) -> List[Dict]:
         try:
-            cursor = self.db_connection.cursor()
-            cursor.execute(f'''
-                SELECT * FROM {table_name} 
-                ORDER BY datetime(created_at) DESC 
-                LIMIT ?
-            ''', (limit,))
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            snapshot_ids, row_count = [], 0
+            for snapshot in self._latest_snapshots(table_name, limit):
+                if snapshot_ids and row_count + snapshot['row_count'] > limit:
+                    break
+                snapshot_ids.append(snapshot['id'])
+                row_count += snapshot['row_count']
+            if not snapshot_ids:
+                return []
+            return self._get_snapshot_rows(table_name, snapshot_ids)
         except Exception as e:
             logger.error(f"Failed to get data from SQLite: {str(e)}")
             raise
 
+    def _get_latest_snapshot_from_sqlite(self, table_name: str) -> Optional[Dict]:
+        try:
+            snapshots = self._latest_snapshots(table_name, 1)
+            if not snapshots:
+                return None
+            snapshot = dict(snapshots[0])
+            snapshot['data'] = self._get_snapshot_rows(table_name, [snapshot['id']])
+            return snapshot
+        except Exception as e:
+            logger.error(f"Failed to get latest snapshot from SQLite: {str(e)}")
+            raise
+
+    def _latest_mongodb_snapshots(self, collection_name: str, limit: int) -> List[Dict]:
+        """Newest snapshot documents, shaped like the SQLite snapshots rows"""
+        snapshots = self.mongo_db['snapshots'].find(
+            {'dataset': collection_name},
+            MONGODB_SNAPSHOT_PROJECTION
+        ).sort([('fetched_at', pymongo.DESCENDING), ('snapshot_id', pymongo.DESCENDING)]).limit(limit)
+        return [{'id': snapshot.pop('snapshot_id'), **snapshot} for snapshot in snapshots]
+
+    def _get_mongodb_snapshot_rows(self, collection_name: str, snapshots: List[Dict]) -> List[Record]:
+        """Row documents of the given snapshots in the SQLite result order and shape"""
+        columns = SQLITE_INSERT_COLUMNS[collection_name]
+        by_snapshot = {snapshot['id']: [] for snapshot in snapshots}
+        documents = self.mongo_db[collection_name].find(
+            {'snapshot_id': {'$in': list(by_snapshot)}},
+            {'_id': 0, 'id': 1, 'snapshot_id': 1, **{column: 1 for column in columns}}
+        ).sort([('snapshot_id', pymongo.ASCENDING), ('id', pymongo.ASCENDING)])
+        for document in documents:
+            by_snapshot[document['snapshot_id']].append(document)
+
+        row_type = ROW_TYPES[collection_name]
+        rows = []
+        for snapshot in snapshots:
+            for document in by_snapshot[snapshot['id']]:
+                rows.append(row_type(
+                    document['id'],
+                    document['snapshot_id'],
+                    *[document.get(column) for column in columns],
+                    snapshot['fetched_at'],
+                    snapshot['data_type'],
+                    snapshot['created_at']
+                ))
+        return rows
 
     def _get_from_mongodb(self, collection_name: str, limit: int) -> List[Dict]:
         try:
-            collection = self.mongo_db[collection_name]
-            documents = collection.find().sort('created_at', -1).limit(limit)
-            return list(documents)
+            snapshots, row_count = [], 0
+            for snapshot in self._latest_mongodb_snapshots(collection_name, limit):
+                if snapshots and row_count + snapshot['row_count'] > limit:
+                    break
+                snapshots.append(snapshot)
+                row_count += snapshot['row_count']
+            if not snapshots:
+                return []
+            return self._get_mongodb_snapshot_rows(collection_name, snapshots)
         except Exception as e:
             logger.error(f"Failed to get data from MongoDB: {str(e)}")
             raise
-    
+
+    def _get_latest_snapshot_from_mongodb(self, collection_name: str) -> Optional[Dict]:
+        try:
+            snapshots = self._latest_mongodb_snapshots(collection_name, 1)
+            if not snapshots:
+                return None
+            snapshot = snapshots[0]
+            snapshot['data'] = self._get_mongodb_snapshot_rows(collection_name, [snapshot])
+            return snapshot
+        except Exception as e:
+            logger.error(f"Failed to get latest snapshot from MongoDB: {str(e)}")
+            raise
+
     def close_connection(self):
         try:
             if self.db_type == DB_SQLITE and self.db_connection:
+                with self._readers_lock:
+                    for connection in self._reader_connections:
+                        connection.close()
+                    self._reader_connections.clear()
+                self._readers = threading.local()
                 self.db_connection.close()
             elif self.db_type == DB_MONGODB and self.mongo_client:
                 self.mongo_client.close()
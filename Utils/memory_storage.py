@@ -0,0 +1,208 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+from Utils.storage import SnapshotStorage
+from Utils.records import ROW_TYPES, Record, record_columns
+from Utils.db import SQLITE_INSERT_COLUMNS, SQLITE_SYMBOL_COLUMNS, SQLITE_ROLLUP_COLUMNS
+
+logger = get_logger(__name__)
+
+class _MemoryTable:
+    """One dataset: row fields as parallel column arrays, snapshots as row ranges into them"""
+
+    def __init__(self, table_name: str, columns: List[str]):
+        self.row_type = ROW_TYPES[table_name]
+        self.columns: Dict[str, list] = {column: [] for column in ('id', 'snapshot_id', *columns)}
+        self.snapshots: Dict[int, Dict] = {}
+        # (fetched_at, snapshot id) ascending; order[-1] points at the latest snapshot
+        self.order: List[Tuple[str, int]] = []
+        self.next_row_id = 1
+
+    def rows(self, snapshot: Dict) -> List[Record]:
+        """Records of one snapshot in payload order, shaped like the SQLite rows"""
+        start, end = snapshot['start'], snapshot['end']
+        return [
+            self.row_type(*values, snapshot['fetched_at'], snapshot['data_type'], snapshot['created_at'])
+            for values in zip(*(column[start:end] for column in self.columns.values()))
+        ]
+
+class MemoryStorage(SnapshotStorage):
+    """Process-local storage for tests and benchmarks, selected with [DB] TYPE = memory"""
+
+    def __init__(self):
+        self.tables = {table_name: _MemoryTable(table_name, columns) for table_name, columns in SQLITE_INSERT_COLUMNS.items()}
+        # Per-symbol daily rollups of snapshots removed by retention: (dataset, symbol, day) -> bar
+        self.intraday_ohlc: Dict[Tuple[str, str, str], Dict] = {}
+        self._next_snapshot_id = 1
+        self._lock = threading.RLock()
+        if configure.get('DB', 'STORAGE_MODE', fallback='full').lower() == 'delta':
+            logger.warning("STORAGE_MODE = delta is only supported on SQLite, memory storage keeps full snapshots")
+
+    def save_data(self, data: Dict, table_name: str, payload_hash: str = None):
+        try:
+            records = data.get('data', [])
+            if not records:
+                return
+            with self._lock:
+                table = self.tables[table_name]
+                snapshot_id = self._next_snapshot_id
+                self._next_snapshot_id += 1
+                start = len(table.columns['id'])
+                table.columns['id'].extend(range(table.next_row_id, table.next_row_id + len(records)))
+                table.columns['snapshot_id'].extend([snapshot_id] * len(records))
+                columns = SQLITE_INSERT_COLUMNS[table_name]
+                for column, values in zip(columns, record_columns(records, columns)):
+                    table.columns[column].extend(values)
+                table.next_row_id += len(records)
+
+                table.snapshots[snapshot_id] = {
+                    'id': snapshot_id,
+                    'dataset': table_name,
+                    'data_type': data.get('data_type'),
+                    'fetched_at': data.get('timestamp'),
+                    'payload_hash': payload_hash,
+                    'row_count': len(records),
+                    # Matches SQLite CURRENT_TIMESTAMP
+                    'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                    'start': start,
+                    'end': start + len(records)
+                }
+                insort(table.order, (data.get('timestamp'), snapshot_id))
+        except Exception as e:
+            logger.error(f"Failed to save data to {table_name}: {str(e)}")
+            raise
+
+    def get_latest_data(self, table_name: str, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            table = self.tables[table_name]
+            rows, row_count = [], 0
+            for _, snapshot_id in reversed(table.order):
+                snapshot = table.snapshots[snapshot_id]
+                if rows and row_count + snapshot['row_count'] > limit:
+                    break
+                rows.extend(table.rows(snapshot))
+                row_count += snapshot['row_count']
+            return rows
+
+    def get_latest_snapshot(self, table_name: str) -> Optional[Dict]:
+        with self._lock:
+            table = self.tables[table_name]
+            if not table.order:
+                return None
+            snapshot = table.snapshots[table.order[-1][1]]
+            return {
+                **{key: value for key, value in snapshot.items() if key not in ('start', 'end')},
+                'data': table.rows(snapshot)
+            }
+
+    def get_symbol_history(
+        self,
+        table_name: str,
+        symbols: List[str],
+        start: str,
+        end: str,
+        fields: List[str]
+    ) -> Dict[str, List]:
+        unknown = [field for field in fields if field not in SQLITE_INSERT_COLUMNS[table_name]]
+        if unknown:
+            raise ValueError(f"Unknown {table_name} fields: {', '.join(unknown)}")
+        wanted = set(symbols)
+        symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+        history = {column: [] for column in ['symbol', 'timestamp', *fields]}
+        with self._lock:
+            table = self.tables[table_name]
+            window = table.order[bisect_left(table.order, (start,)):bisect_right(table.order, (end, float('inf')))]
+            for fetched_at, snapshot_id in window:
+                snapshot = table.snapshots[snapshot_id]
+                # First row of each symbol in the snapshot, like the SQLite MIN(id) grouping
+                points = {}
+                for index in range(snapshot['start'], snapshot['end']):
+                    symbol = table.columns[symbol_column][index]
+                    if symbol in wanted and symbol not in points:
+                        points[symbol] = index
+                for symbol in sorted(points):
+                    history['symbol'].append(symbol)
+                    history['timestamp'].append(fetched_at)
+                    for field in fields:
+                        history[field].append(table.columns[field][points[symbol]])
+        return history
+
+    def get_snapshots_between(self, table_name: str, start: str, end: str) -> List[Dict]:
+        with self._lock:
+            table = self.tables[table_name]
+            rows = []
+            for _, snapshot_id in table.order[bisect_left(table.order, (start,)):bisect_left(table.order, (end,))]:
+                rows.extend(table.rows(table.snapshots[snapshot_id]))
+            return rows
+
+    def get_snapshot_bounds(self, table_name: str) -> Tuple[Optional[str], Optional[str]]:
+        with self._lock:
+            order = self.tables[table_name].order
+            if not order:
+                return None, None
+            return order[0][0], order[-1][0]
+
+    def apply_retention(self, table_name: str, cutoff: str) -> Dict:
+        with self._lock:
+            table = self.tables[table_name]
+            split = bisect_left(table.order, (cutoff,))
+            expired = [table.snapshots[snapshot_id] for _, snapshot_id in table.order[:split]]
+            if not expired:
+                return {"snapshots": 0, "rows": 0, "rollups": 0}
+
+            rollups = self._roll_up(table_name, table, expired) if table_name in SQLITE_ROLLUP_COLUMNS else 0
+
+            # Rebuild the column arrays from the surviving snapshots' ranges
+            kept = [table.snapshots[snapshot_id] for _, snapshot_id in table.order[split:]]
+            columns = {name: [] for name in table.columns}
+            for snapshot in kept:
+                start = len(columns['id'])
+                for name, values in table.columns.items():
+                    columns[name].extend(values[snapshot['start']:snapshot['end']])
+                snapshot['start'], snapshot['end'] = start, start + snapshot['row_count']
+            table.columns = columns
+            table.snapshots = {snapshot['id']: snapshot for snapshot in kept}
+            table.order = table.order[split:]
+            return {
+                "snapshots": len(expired),
+                "rows": sum(snapshot['row_count'] for snapshot in expired),
+                "rollups": rollups
+            }
+
+    def _roll_up(self, table_name: str, table: _MemoryTable, expired: List[Dict]) -> int:
+        """Merge the expired snapshots into intraday_ohlc bars; returns how many bars were written"""
+        price_column, volume_column = SQLITE_ROLLUP_COLUMNS[table_name]
+        symbol_column = SQLITE_SYMBOL_COLUMNS[table_name]
+        touched = set()
+        # expired is oldest first and rows keep payload order, so the first price seen opens the bar
+        for snapshot in expired:
+            for index in range(snapshot['start'], snapshot['end']):
+                symbol = table.columns[symbol_column][index]
+                if symbol is None:
+                    continue
+                key = (table_name, symbol, snapshot['fetched_at'][:10])
+                price = table.columns[price_column][index]
+                volume = table.columns[volume_column][index] if volume_column else None
+                bar = self.intraday_ohlc.setdefault(key, {
+                    'open': price, 'high': None, 'low': None, 'close': None, 'volume': None,
+                    'samples': 0, 'first_at': snapshot['fetched_at'], 'last_at': snapshot['fetched_at']
+                })
+                if price is not None:
+                    bar['high'] = price if bar['high'] is None else max(bar['high'], price)
+                    bar['low'] = price if bar['low'] is None else min(bar['low'], price)
+                if volume is not None:
+                    bar['volume'] = volume if bar['volume'] is None else max(bar['volume'], volume)
+                if snapshot['fetched_at'] < bar['first_at']:
+                    bar['open'], bar['first_at'] = price, snapshot['fetched_at']
+                if snapshot['fetched_at'] >= bar['last_at']:
+                    bar['close'], bar['last_at'] = price, snapshot['fetched_at']
+                bar['samples'] += 1
+                touched.add(key)
+        return len(touched)
+
+    def close_connection(self):
+        # Nothing to release; the data stays for the other users of the shared store
+        pass
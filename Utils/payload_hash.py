@@ -0,0 +1,44 @@
+import threading
+from typing import Dict, Optional
+from Utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PayloadHashTracker:
+    """Remember the last stored payload hash of each dataset to skip unchanged responses"""
+
+    def __init__(self):
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def remember(self, dataset: str, payload_hash: str):
+        """Record payload_hash as the last stored payload for dataset"""
+        with self._lock:
+            self._hashes[dataset] = payload_hash
+
+    def get(self, dataset: str) -> Optional[str]:
+        """Get the last stored payload hash for dataset"""
+        with self._lock:
+            return self._hashes.get(dataset)
+
+    def seed(self, storage, tables: Dict[str, str]):
+        """Remember each dataset's newest stored payload hash, so a restart does not store it again"""
+        for dataset, table_name in tables.items():
+            try:
+                snapshot = storage.get_latest_snapshot(table_name)
+            except Exception as e:
+                logger.error(f"Failed to read the last payload hash of {dataset}: {e}")
+                continue
+            if snapshot and snapshot.get('payload_hash'):
+                self.remember(dataset, snapshot['payload_hash'])
+
+    def forget(self, dataset: str = None):
+        """Forget one dataset's hash, or all of them"""
+        with self._lock:
+            if dataset is None:
+                self._hashes.clear()
+            else:
+                self._hashes.pop(dataset, None)
+
+# Shared by every scraper so any path that stored a payload suppresses the same payload elsewhere
+payload_hashes = PayloadHashTracker()
@@ -0,0 +1,71 @@
+import dataclasses
+from collections.abc import Mapping
+from operator import attrgetter, methodcaller
+from typing import Dict, List, Tuple, Type
+from Utils.datasets import DATASETS
+
+# Snapshot fields every stored row carries around its dataset columns
+ROW_ID_FIELDS = ('id', 'snapshot_id')
+ROW_SNAPSHOT_FIELDS = ('timestamp', 'data_type', 'created_at')
+
+class Record(Mapping):
+    """
+    Base of the slotted record types: stored like a tuple, read like a dict
+
+    Instances hold one slot per field and no __dict__, so a snapshot's rows cost a
+    fraction of the equivalent dicts. record['ltp'], record.get('ltp') and dict(record)
+    work as before, and orjson serializes them directly as dataclasses.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.__dataclass_fields__ else default
+
+    def __iter__(self):
+        return iter(self.__dataclass_fields__)
+
+    def __len__(self) -> int:
+        return len(self.__dataclass_fields__)
+
+def record_type(name: str, fields: Tuple[str, ...]) -> Type[Record]:
+    """A slotted Record subclass with the given fields, all positional"""
+    shadowed = [field for field in fields if hasattr(Record, field)]
+    if shadowed:
+        raise ValueError(f"{name} fields shadow Record methods: {', '.join(shadowed)}")
+    return dataclasses.make_dataclass(
+        name, fields, bases=(Record,), namespace={'__slots__': tuple(fields)}, eq=False
+    )
+
+def record_columns(records: List[Mapping], columns: List[str]) -> List[list]:
+    """records as one list per column; slotted records of one type are read in C, without a .get() call per value"""
+    record_types = set(map(type, records))
+    if len(record_types) == 1:
+        record_type = record_types.pop()
+        if issubclass(record_type, Record) and set(columns) <= set(record_type.__slots__):
+            return [list(map(attrgetter(column), records)) for column in columns]
+    return [list(map(methodcaller('get', column), records)) for column in columns]
+
+def _record_types(name_suffix: str, leading: Tuple[str, ...], trailing: Tuple[str, ...]) -> Dict[str, Type[Record]]:
+    types, by_name = {}, {}
+    for table_name, spec in DATASETS.items():
+        name = f"{spec['record']}{name_suffix}"
+        fields = (*leading, *(column for column, _, _ in spec['columns']), *trailing)
+        if name not in by_name:
+            by_name[name] = record_type(name, fields)
+        elif by_name[name].__slots__ != fields:
+            raise ValueError(f"Datasets sharing record type {name} must have the same columns")
+        types[table_name] = by_name[name]
+    return types
+
+# Processed records, as the parsers produce them: the dataset columns in registry order
+RECORD_TYPES = _record_types('', (), ())
+
+# Stored rows, as the backends read them: id, snapshot_id, the dataset columns, snapshot fields
+ROW_TYPES = _record_types('Row', ROW_ID_FIELDS, ROW_SNAPSHOT_FIELDS)
+
+Quote = RECORD_TYPES['top_gainers']
@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional
 from datetime import datetime
+from fastapi.responses import ORJSONResponse
 from Constant.http import HTTP_STATUS, HTTP_MESSAGES, RESPONSE_TYPES
 
 def create_response(
@@ -58,6 +59,15 @@ def create_response(
     
     return response
 
+def json_response(content: Any) -> ORJSONResponse:
+    """
+    Render a response body with orjson instead of FastAPI's jsonable_encoder
+
+    Slotted records (Utils/records.py) are written straight from their slots,
+    without being copied into a dict per row first.
+    """
+    return ORJSONResponse(content=content)
+
 def success_response(
     data: Any = None,
     message: str = HTTP_MESSAGES.SUCCESS,
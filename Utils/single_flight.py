@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from Utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class SingleFlight:
+    """Collapse concurrent identical async calls into one in-flight call"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run func under key, or join the call already running under key
+
+        Args:
+            key: Identity of the call; callers with the same key share one result
+            func: Coroutine function to run when no call is in flight
+
+        Returns:
+            The result of the single in-flight call
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining in-flight call for {key}")
+
+        # Shield so one waiter disconnecting does not cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def in_flight(self, key: str) -> bool:
+        """Whether a call is currently running under key"""
+        return key in self._in_flight
@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Tuple
+
+from Utils.datasets import DATASETS
+
+# Columns identifying a record within one snapshot, for tables that support delta storage
+SNAPSHOT_KEY_COLUMNS = {table_name: spec['key'] for table_name, spec in DATASETS.items() if spec.get('key')}
+
+class SnapshotState:
+    """A rebuilt snapshot: records by key in payload order, plus how many deltas it sits on"""
+
+    def __init__(
+        self,
+        snapshot_id: int,
+        rows: Dict[tuple, Dict],
+        order: List[tuple],
+        chain_length: int = 0,
+        stored_records: List[Dict] = None
+    ):
+        self.snapshot_id = snapshot_id
+        self.rows = rows
+        self.order = order
+        self.chain_length = chain_length
+        # A full snapshot keeps its records as stored, which may repeat a key
+        self.stored_records = stored_records
+
+    def records(self) -> List[Dict]:
+        if self.stored_records is not None:
+            return self.stored_records
+        return [self.rows[key] for key in self.order]
+
+def row_key(record: Dict, key_columns: Tuple[str, ...]) -> tuple:
+    return tuple(record.get(column) for column in key_columns)
+
+def implied_order(previous_order: List[tuple], removed: set, inserted: List[tuple]) -> List[tuple]:
+    """Order a delta implies when it stores none: surviving keys in place, new keys appended"""
+    return [key for key in previous_order if key not in removed] + inserted
+
+def diff_records(
+    previous: SnapshotState,
+    records: List[Dict],
+    columns: List[str],
+    key_columns: Tuple[str, ...]
+) -> Optional[Tuple[List[Dict], List[tuple], Optional[List[tuple]]]]:
+    """
+    Changes from previous to records: (changed or new records, removed keys, order)
+
+    order is None when implied_order() reproduces the payload order. Returns None
+    when records repeat a key, since such a snapshot can only be stored in full.
+    """
+    keys = [row_key(record, key_columns) for record in records]
+    current = set(keys)
+    if len(current) != len(keys):
+        return None
+
+    upserts, inserted = [], []
+    for key, record in zip(keys, records):
+        old = previous.rows.get(key)
+        if old is None:
+            inserted.append(key)
+            upserts.append(record)
+        elif any(old.get(column) != record.get(column) for column in columns):
+            upserts.append(record)
+    removed = [key for key in previous.order if key not in current]
+    order = None if implied_order(previous.order, set(removed), inserted) == keys else keys
+    return upserts, removed, order
+
+def apply_delta(
+    previous: SnapshotState,
+    snapshot_id: int,
+    upserts: List[Dict],
+    removed: List[tuple],
+    order: Optional[List[tuple]],
+    key_columns: Tuple[str, ...]
+) -> SnapshotState:
+    """Rebuild the snapshot a delta describes on top of its parent"""
+    rows = dict(previous.rows)
+    removed_keys = set(removed)
+    for key in removed_keys:
+        rows.pop(key, None)
+    inserted = []
+    for record in upserts:
+        key = row_key(record, key_columns)
+        if key not in rows:
+            inserted.append(key)
+        rows[key] = record
+    if order is None:
+        order = implied_order(previous.order, removed_keys, inserted)
+    return SnapshotState(snapshot_id, rows, [tuple(key) for key in order], previous.chain_length + 1)
@@ -0,0 +1,72 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from Utils.config_reader import configure
+from Constant.general import DB_MEMORY
+
+class SnapshotStorage(ABC):
+    """Snapshot persistence shared by the controllers, write queue, retention and archive"""
+
+    @abstractmethod
+    def save_data(self, data: Dict, table_name: str, payload_hash: str = None):
+        """Store one processed snapshot"""
+
+    def save_batch(self, snapshots: List[Tuple[Dict, str, Optional[str]]]):
+        """Save several (data, table_name, payload_hash) snapshots"""
+        for data, table_name, payload_hash in snapshots:
+            self.save_data(data, table_name, payload_hash)
+
+    @abstractmethod
+    def get_latest_data(self, table_name: str, limit: int = 50) -> List[Dict]:
+        """Rows of the newest whole snapshots that fit in limit; the latest snapshot is always returned complete"""
+
+    @abstractmethod
+    def get_latest_snapshot(self, table_name: str) -> Optional[Dict]:
+        """The newest snapshot of a table with its metadata, None when nothing is stored"""
+
+    @abstractmethod
+    def get_symbol_history(
+        self,
+        table_name: str,
+        symbols: List[str],
+        start: str,
+        end: str,
+        fields: List[str]
+    ) -> Dict[str, List]:
+        """Time series of fields for symbols over [start, end], as column arrays"""
+
+    @abstractmethod
+    def get_snapshots_between(self, table_name: str, start: str, end: str) -> List[Dict]:
+        """Rows of every snapshot fetched in [start, end), oldest snapshot first"""
+
+    @abstractmethod
+    def get_snapshot_bounds(self, table_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """fetched_at of the oldest and newest stored snapshot of a table"""
+
+    @abstractmethod
+    def apply_retention(self, table_name: str, cutoff: str) -> Dict:
+        """Roll up and delete raw snapshots of table_name fetched before cutoff (ISO timestamp)"""
+
+    def compact(self, pages: int = 0):
+        """Return freed space to the operating system, where the backend can"""
+
+    @abstractmethod
+    def close_connection(self):
+        """Release the backend's connections"""
+
+_memory_storage = None
+_memory_storage_lock = threading.Lock()
+
+def get_storage(db_path: str = None) -> SnapshotStorage:
+    """Storage backend selected by [DB] TYPE"""
+    if configure.get('DB', 'TYPE', fallback='').lower() != DB_MEMORY:
+        from Utils.db import DatabaseManager
+        return DatabaseManager(db_path)
+
+    # Every caller in the process has to see the same in-memory data
+    global _memory_storage
+    with _memory_storage_lock:
+        if _memory_storage is None:
+            from Utils.memory_storage import MemoryStorage
+            _memory_storage = MemoryStorage()
+        return _memory_storage
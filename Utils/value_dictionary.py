@@ -0,0 +1,51 @@
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+SQLITE_DICTIONARY_TABLE = '''
+    CREATE TABLE IF NOT EXISTS dictionary (
+        id INTEGER PRIMARY KEY,
+        value TEXT NOT NULL UNIQUE
+    )
+'''
+
+class ValueDictionary:
+    """In-memory cache of the dictionary table: repeated text values interned as integer ids"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def load(self, connection: sqlite3.Connection):
+        """Replace the cache with every stored value"""
+        self._ids = {value: value_id for value_id, value in connection.execute("SELECT id, value FROM dictionary")}
+
+    def encode(self, cursor: sqlite3.Cursor, value) -> Optional[int]:
+        """Id of value, adding it inside the caller's write transaction when it is new"""
+        if value is None:
+            return None
+        value = str(value)
+        value_id = self._ids.get(value)
+        if value_id is None:
+            # Another writer may have added it since the cache was loaded
+            cursor.execute("INSERT OR IGNORE INTO dictionary (value) VALUES (?)", (value,))
+            cursor.execute("SELECT id FROM dictionary WHERE value = ?", (value,))
+            value_id = cursor.fetchone()[0]
+            self._ids[value] = value_id
+        return value_id
+
+    def encode_all(self, cursor: sqlite3.Cursor, values: List) -> List[Optional[int]]:
+        """Ids of a whole column, each distinct value encoded once"""
+        ids = {value: self.encode(cursor, value) for value in dict.fromkeys(values)}
+        return list(map(ids.__getitem__, values))
+
+    def lookup(self, connection: sqlite3.Connection, values: Iterable) -> Dict[str, int]:
+        """Ids of the stored values among values; values never stored are left out"""
+        values = [str(value) for value in values if value is not None]
+        found = {value: self._ids[value] for value in values if value in self._ids}
+        missing = [value for value in values if value not in found]
+        if missing:
+            cursor = connection.execute(
+                f"SELECT value, id FROM dictionary WHERE value IN ({', '.join('?' * len(missing))})",
+                missing
+            )
+            found.update({value: value_id for value, value_id in cursor.fetchall()})
+        return found
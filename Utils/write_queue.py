@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Utils.logger import get_logger
+from Utils.config_reader import configure
+
+logger = get_logger(__name__)
+
+# (processed data, table name, payload hash, called after the snapshot is committed)
+QueuedSnapshot = Tuple[Dict, str, Optional[str], Optional[Callable[[], None]]]
+
+class SnapshotWriteQueue:
+    """
+    Write-behind persistence for processed snapshots
+
+    Scrapers enqueue and return immediately; one writer thread drains the queue and
+    commits whatever is waiting, across datasets, in a single transaction.
+    """
+
+    def __init__(self, db_manager_factory: Callable = None):
+        self.db_manager_factory = db_manager_factory
+        self.batch_size = configure.getint('DB', 'WRITE_BATCH_SIZE', fallback=50)
+        self.flush_timeout = configure.getfloat('DB', 'WRITE_FLUSH_TIMEOUT', fallback=30)
+        self._queue: "queue.Queue[QueuedSnapshot]" = queue.Queue(
+            maxsize=configure.getint('DB', 'WRITE_QUEUE_SIZE', fallback=1000)
+        )
+        self._db_manager = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "last_commit_ms": None,
+            "max_commit_ms": 0.0,
+            "total_commit_ms": 0.0
+        }
+
+    @property
+    def db_manager(self):
+        """The writer's storage backend, created on first use"""
+        with self._lock:
+            if self._db_manager is None:
+                if self.db_manager_factory is None:
+                    from Utils.storage import get_storage
+                    self.db_manager_factory = get_storage
+                self._db_manager = self.db_manager_factory()
+            return self._db_manager
+
+    def start(self):
+        """Start the writer thread (called once at application startup)"""
+        # Open the writer connection before the thread needs it
+        self.db_manager
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+            self._thread.start()
+        logger.info("Snapshot writer started")
+
+    def stop(self):
+        """Flush queued snapshots, then stop the writer thread"""
+        if not self.flush(self.flush_timeout):
+            logger.error(f"Snapshot writer stopped with {self._queue.qsize()} snapshots unwritten")
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_timeout)
+            self._thread = None
+        logger.info("Snapshot writer stopped")
+
+    def enqueue(
+        self,
+        data: Dict,
+        table_name: str,
+        payload_hash: str = None,
+        on_saved: Callable[[], None] = None
+    ) -> bool:
+        """
+        Queue a snapshot for the writer; False when the queue is full and it was dropped
+
+        Called from async request handlers, so it never waits for room or starts the
+        writer: that happens once, in the application lifespan.
+        """
+        try:
+            self._queue.put_nowait((data, table_name, payload_hash, on_saved))
+        except queue.Full:
+            with self._lock:
+                self._metrics["dropped"] += 1
+            logger.error(f"Snapshot write queue full, dropped {table_name} snapshot")
+            return False
+        with self._lock:
+            self._metrics["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every queued snapshot has been committed (or failed)"""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: self._queue.unfinished_tasks == 0, timeout)
+
+    def status(self) -> Dict:
+        """Queue depth and commit latency for health reporting"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        total_commit_ms = metrics.pop("total_commit_ms")
+        metrics["avg_commit_ms"] = round(total_commit_ms / metrics["batches"], 2) if metrics["batches"] else None
+        metrics["depth"] = self._queue.qsize()
+        metrics["capacity"] = self._queue.maxsize
+        metrics["running"] = self._thread is not None and self._thread.is_alive()
+        return metrics
+
+    def _next_batch(self) -> List[QueuedSnapshot]:
+        """Wait for one snapshot, then take whatever else is already queued up to batch_size"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[QueuedSnapshot]):
+        started = time.perf_counter()
+        try:
+            self._db_manager.save_batch([(data, table_name, payload_hash) for data, table_name, payload_hash, _ in batch])
+            saved, failed = batch, []
+        except Exception as e:
+            # One bad snapshot must not cost the rest of the batch
+            logger.error(f"Batch write failed, retrying {len(batch)} snapshots one by one: {e}")
+            saved, failed = [], []
+            for item in batch:
+                try:
+                    self._db_manager.save_data(item[0], item[1], item[2])
+                    saved.append(item)
+                except Exception:
+                    failed.append(item)
+        commit_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self._metrics["written"] += len(saved)
+            self._metrics["failed"] += len(failed)
+            self._metrics["batches"] += 1
+            self._metrics["last_commit_ms"] = round(commit_ms, 2)
+            self._metrics["max_commit_ms"] = round(max(self._metrics["max_commit_ms"], commit_ms), 2)
+            self._metrics["total_commit_ms"] += commit_ms
+
+        for _, table_name, _, on_saved in saved:
+            if on_saved is not None:
+                try:
+                    on_saved()
+                except Exception as e:
+                    logger.error(f"Post-save callback for {table_name} failed: {e}")
+
+    def _run(self):
+        # Keep draining after stop() until the queue is empty
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+# Shared by every controller so all snapshot writes go through one writer thread and connection
+write_queue = SnapshotWriteQueue()
@@ -0,0 +1,92 @@
+"""
+Snapshot write benchmark for the SQLite backend
+
+Compares the old row-by-row insert path with the batched DatabaseManager.save_data
+path on a throwaway database.
+
+Usage:
+    python benchmarks/db_write_benchmark.py --snapshots 200 --rows 250
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager, SQLITE_INSERTS
+
+def make_snapshot(rows: int, data_type: str = "gainers") -> dict:
+    """Build a processed gainers/loosers snapshot with synthetic rows"""
+    categories = ["NIFTY", "BANKNIFTY", "NIFTYNEXT50", "SecGtr20", "SecLwr20", "FOSec", "allSec"]
+    data = []
+    for i in range(rows):
+        price = round(random.uniform(50, 5000), 2)
+        data.append({
+            "category": categories[i % len(categories)],
+            "symbol": f"SYM{i:04d}",
+            "series": "EQ",
+            "open_price": price,
+            "high_price": price * 1.02,
+            "low_price": price * 0.98,
+            "ltp": price * 1.01,
+            "prev_price": price * 0.99,
+            "net_price": 1.0,
+            "per_change": round(random.uniform(-10, 10), 2),
+            "trade_quantity": random.randint(1000, 10_000_000),
+            "turnover": random.uniform(1e3, 1e6),
+            "market_type": "N",
+            "ca_ex_dt": None,
+            "ca_purpose": None
+        })
+    return {"timestamp": datetime.now().isoformat(), "data_type": data_type, "data": data}
+
+def row_by_row_save(db_manager: DatabaseManager, data: dict, table_name: str):
+    """The pre-batching write path: one execute per row, then commit"""
+    insert_sql, _ = SQLITE_INSERTS[table_name]
+    cursor = db_manager.db_connection.cursor()
+    cursor.execute(
+        "INSERT INTO snapshots (dataset, data_type, fetched_at, row_count) VALUES (?, ?, ?, ?)",
+        (table_name, data["data_type"], data["timestamp"], len(data["data"]))
+    )
+    snapshot_id = cursor.lastrowid
+    for record in data.get("data", []):
+        # Same parameters as the batched path, interned columns encoded as dictionary ids
+        cursor.execute(insert_sql, db_manager._row_values(cursor, table_name, snapshot_id, [record])[0])
+    db_manager.db_connection.commit()
+
+def run(label: str, save, snapshots: list, db_manager: DatabaseManager):
+    started = time.perf_counter()
+    for snapshot in snapshots:
+        save(snapshot)
+    elapsed = time.perf_counter() - started
+    rows = sum(len(snapshot["data"]) for snapshot in snapshots)
+    print(
+        f"{label:<12} {elapsed * 1000:9.1f} ms  "
+        f"{elapsed * 1000 / len(snapshots):7.2f} ms/snapshot  {rows / elapsed:10.0f} rows/s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=250, help="rows per snapshot")
+    args = parser.parse_args()
+
+    snapshots = [make_snapshot(args.rows) for _ in range(args.snapshots)]
+    print(f"{args.snapshots} snapshots x {args.rows} rows")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = DatabaseManager(db_path=os.path.join(tmp_dir, "bench_row.db"))
+        run("row-by-row", lambda s: row_by_row_save(db_manager, s, "top_gainers"), snapshots, db_manager)
+        db_manager.close_connection()
+
+        db_manager = DatabaseManager(db_path=os.path.join(tmp_dir, "bench_batch.db"))
+        run("batched", lambda s: db_manager.save_data(s, "top_gainers"), snapshots, db_manager)
+        db_manager.close_connection()
+
+if __name__ == "__main__":
+    main()
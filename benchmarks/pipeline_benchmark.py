@@ -0,0 +1,91 @@
+"""
+Scrape -> process -> read pipeline benchmark
+
+Feeds synthetic NSE gainers payloads through parse_gainers_loosers, stores each
+snapshot and reads the latest rows back, once per storage backend. The memory
+backend shows the cost of parsing and row shaping without disk noise.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --snapshots 200 --rows 250 --backend memory
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+from Utils.memory_storage import MemoryStorage
+from Utils.storage import SnapshotStorage
+from Services.nse_parsers import parse_gainers_loosers
+
+CATEGORIES = ["NIFTY", "BANKNIFTY", "NIFTYNEXT50", "SecGtr20", "SecLwr20", "FOSec", "allSec"]
+
+def make_payload(rows: int) -> dict:
+    """A raw live-analysis-variations payload, rows spread over the categories"""
+    payload = {"legends": [[category, category] for category in CATEGORIES]}
+    for category in CATEGORIES:
+        payload[category] = {"data": []}
+    for i in range(rows):
+        price = round(random.uniform(50, 5000), 2)
+        payload[CATEGORIES[i % len(CATEGORIES)]]["data"].append({
+            "symbol": f"SYM{i:04d}",
+            "series": "EQ",
+            "open_price": price,
+            "high_price": price * 1.02,
+            "low_price": price * 0.98,
+            "ltp": price * 1.01,
+            "prev_price": price * 0.99,
+            "net_price": 1.0,
+            "perChange": round(random.uniform(-10, 10), 2),
+            "trade_quantity": random.randint(1000, 10_000_000),
+            "turnover": random.uniform(1e3, 1e6),
+            "market_type": "N",
+            "ca_ex_dt": None,
+            "ca_purpose": None
+        })
+    return payload
+
+def run(label: str, storage: SnapshotStorage, payloads: list, read_limit: int):
+    parse_ms = save_ms = read_ms = 0.0
+    for payload in payloads:
+        started = time.perf_counter()
+        processed = parse_gainers_loosers(payload, "gainers")
+        parsed = time.perf_counter()
+        storage.save_data(processed, "top_gainers")
+        saved = time.perf_counter()
+        storage.get_latest_data("top_gainers", read_limit)
+        read = time.perf_counter()
+        parse_ms += (parsed - started) * 1000
+        save_ms += (saved - parsed) * 1000
+        read_ms += (read - saved) * 1000
+    total = parse_ms + save_ms + read_ms
+    print(
+        f"{label:<8} parse {parse_ms:8.1f} ms  save {save_ms:8.1f} ms  read {read_ms:8.1f} ms  "
+        f"{total / len(payloads):7.2f} ms/snapshot"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshots", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=250, help="rows per snapshot")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "both"], default="both")
+    args = parser.parse_args()
+
+    payloads = [make_payload(args.rows) for _ in range(args.snapshots)]
+    print(f"{args.snapshots} snapshots x {args.rows} rows")
+
+    if args.backend in ("memory", "both"):
+        run("memory", MemoryStorage(), payloads, args.rows)
+    if args.backend in ("sqlite", "both"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            storage = DatabaseManager(db_path=os.path.join(tmp_dir, "bench_pipeline.db"))
+            run("sqlite", storage, payloads, args.rows)
+            storage.close_connection()
+
+if __name__ == "__main__":
+    main()
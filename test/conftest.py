@@ -0,0 +1,25 @@
+import sys
+import os
+import shutil
+import tempfile
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Keep test runs off the committed database, cookie jar and Logs/.
+# Loggers and storage read their settings on first use, so this runs before any test module imports them.
+TEST_ROOT = tempfile.mkdtemp(prefix='nse_scraper_tests_')
+
+from Utils.logger import nse_logger
+nse_logger.log_dir = os.path.join(TEST_ROOT, 'logs')
+os.makedirs(nse_logger.log_dir)
+
+from Utils.config_reader import configure
+from Constant.general import DB_MEMORY
+
+configure.config['DB']['TYPE'] = DB_MEMORY
+configure.config['DB']['DATABASE_PATH'] = os.path.join(TEST_ROOT, 'nse_data.db')
+configure.config['NSE']['COOKIES_FILE'] = os.path.join(TEST_ROOT, 'nse_cookies.json')
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_ROOT, ignore_errors=True)
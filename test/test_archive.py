@@ -0,0 +1,51 @@
+import sys
+import os
+from datetime import date
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+from Services.archive import SnapshotArchive
+
+def _snapshot(timestamp: str, rows: list) -> dict:
+    return {"timestamp": timestamp, "data_type": "gainers", "data": rows}
+
+def test_days_are_archived_and_read_back_pruned(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    archive = SnapshotArchive(root=str(tmp_path / "archive"), db_manager_factory=lambda: db_manager)
+    try:
+        db_manager.save_data(_snapshot("2025-07-01T09:15:00", [
+            {"symbol": "RELIANCE", "ltp": 100.0, "trade_quantity": 10},
+            {"symbol": "TCS", "ltp": 10.0}
+        ]), "top_gainers")
+        # turnover is null on the first day and a float on the second
+        db_manager.save_data(_snapshot("2025-07-02T09:15:00", [
+            {"symbol": "RELIANCE", "ltp": 101.0, "trade_quantity": 20, "turnover": 5.5}
+        ]), "top_gainers")
+        db_manager.save_data(_snapshot("2025-07-03T09:15:00", [
+            {"symbol": "RELIANCE", "ltp": 102.0, "trade_quantity": 30}
+        ]), "top_gainers")
+
+        summary = archive.run(today=date(2025, 7, 3))
+        assert summary["datasets"]["top_gainers"] == {"2025-07-01": 2, "2025-07-02": 1, "2025-07-03": 1}
+        assert archive.archived_days("top_gainers") == [date(2025, 7, 1), date(2025, 7, 2), date(2025, 7, 3)]
+
+        frame = archive.read(
+            "top_gainers", date(2025, 7, 1), date(2025, 7, 2),
+            symbols=["RELIANCE"], columns=["timestamp", "symbol", "ltp", "turnover"]
+        )
+        assert list(frame.columns) == ["timestamp", "symbol", "ltp", "turnover"]
+        assert frame["ltp"].tolist() == [100.0, 101.0]
+        assert frame["turnover"].tolist()[1] == 5.5
+
+        # Later runs only rewrite from the newest archived day onwards
+        db_manager.save_data(_snapshot("2025-07-04T09:15:00", [{"symbol": "TCS", "ltp": 11.0}]), "top_gainers")
+        assert archive.run(today=date(2025, 7, 4))["datasets"]["top_gainers"] == {"2025-07-03": 1, "2025-07-04": 1}
+    finally:
+        db_manager.close_connection()
+
+if __name__ == "__main__":
+    print("Running tests for snapshot archive")
+    import pytest
+    pytest.main([__file__])
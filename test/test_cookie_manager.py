@@ -0,0 +1,252 @@
+import sys
+import os
+import time
+
+import requests
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Services.cookie_manager import NSECookieManager
+from Services.get_nse_cookies import NSECookieService
+from Services.cookie_store import SharedCookieStore
+
+class FakeCookieService:
+    cookie_expiry = 3600
+
+    def __init__(self, tmp_path, harvest_seconds: float = 0.3):
+        self.harvest_seconds = harvest_seconds
+        self.harvests = 0
+        self.store = SharedCookieStore(str(tmp_path / "nse_cookies.json"))
+
+    def load_cookie_record(self):
+        record = self.store.read()
+        return record if record and record["expiry"] > time.time() else None
+
+    def save_cookies(self, cookies):
+        record = {"cookies": cookies, "expiry": time.time() + self.cookie_expiry}
+        self.store.write(record)
+        return record
+
+    def refresh_cookies(self, save=True):
+        time.sleep(self.harvest_seconds)
+        self.harvests += 1
+        return {"nsit": f"jar-{self.harvests}"}
+
+    def validate_cookies(self, cookies):
+        return True
+
+    def mark_valid(self, cookies):
+        pass
+
+    def close_browser(self):
+        pass
+
+    def get_tier_stats(self):
+        return {}
+
+def test_reads_never_wait_for_the_harvest(tmp_path):
+    service = FakeCookieService(tmp_path)
+    manager = NSECookieManager(service=service)
+    try:
+        started = time.perf_counter()
+        assert manager.get_cookies() is None
+        assert time.perf_counter() - started < 0.1
+
+        deadline = time.time() + 5
+        while manager.get_cookies() is None and time.time() < deadline:
+            time.sleep(0.05)
+        assert manager.get_cookies() == {"nsit": "jar-1"}
+        assert manager.status()["has_cookies"]
+    finally:
+        manager.stop()
+
+def test_refreshes_ahead_of_expiry(tmp_path):
+    service = FakeCookieService(tmp_path, harvest_seconds=0)
+    service.cookie_expiry = 1
+    manager = NSECookieManager(service=service)
+    manager.refresh_margin = 0.8
+    try:
+        manager.start()
+        time.sleep(0.6)
+        # The 1s jar is replaced every ~0.2s, so it never lapses
+        assert service.harvests >= 2
+        assert manager.get_cookies() is not None
+    finally:
+        manager.stop()
+
+def test_concurrent_invalidations_trigger_one_refresh(tmp_path):
+    service = FakeCookieService(tmp_path, harvest_seconds=0.2)
+    manager = NSECookieManager(service=service)
+    try:
+        assert manager.wait_for_cookies(5) == {"nsit": "jar-1"}
+
+        # Ten requests fail on the same jar at once
+        stale = manager.get_cookies()
+        for _ in range(10):
+            manager.invalidate(stale)
+        assert manager.get_cookies() is None
+
+        assert manager.wait_for_cookies(5) == {"nsit": "jar-2"}
+        # A late failure on the old jar leaves the new one alone
+        manager.invalidate(stale)
+        assert manager.get_cookies() == {"nsit": "jar-2"}
+        assert service.harvests == 2
+    finally:
+        manager.stop()
+
+def test_workers_share_one_refresh(tmp_path):
+    # Two worker processes modelled as two managers over one shared store
+    first = FakeCookieService(tmp_path, harvest_seconds=0.3)
+    second = FakeCookieService(tmp_path, harvest_seconds=0.3)
+    workers = [NSECookieManager(service=first), NSECookieManager(service=second)]
+    try:
+        for worker in workers:
+            worker.start()
+        jars = [worker.wait_for_cookies(5) for worker in workers]
+        deadline = time.time() + 5
+        while None in jars and time.time() < deadline:
+            time.sleep(0.05)
+            jars = [worker.get_cookies() for worker in workers]
+
+        assert jars[0] == jars[1] is not None
+        assert first.harvests + second.harvests == 1
+    finally:
+        for worker in workers:
+            worker.stop()
+
+def test_store_replaces_jar_atomically(tmp_path):
+    store = SharedCookieStore(str(tmp_path / "nse_cookies.json"))
+    store.write({"cookies": {"nsit": "a"}})
+    store.write({"cookies": {"nsit": "b"}})
+    assert store.read() == {"cookies": {"nsit": "b"}}
+    assert os.listdir(tmp_path) == ["nse_cookies.json"]
+
+    assert store.try_acquire_refresh_lock()
+    assert not store.try_acquire_refresh_lock()
+    store.release_refresh_lock()
+    assert store.try_acquire_refresh_lock()
+    store.release_refresh_lock()
+
+def test_stale_lock_is_broken_only_if_unchanged(tmp_path):
+    store = SharedCookieStore(str(tmp_path / "nse_cookies.json"))
+    with open(store.lock_file, "w") as f:
+        f.write("1 0")
+    os.utime(store.lock_file, (0, 0))
+    seen = store._lock_state(store.lock_file)
+
+    # Another worker breaks the stale lock and takes it before this one does
+    os.remove(store.lock_file)
+    with open(store.lock_file, "w") as f:
+        f.write("2 1")
+    assert not store._break_stale_lock(seen)
+    with open(store.lock_file) as f:
+        assert f.read() == "2 1"
+
+    os.utime(store.lock_file, (0, 0))
+    assert store.try_acquire_refresh_lock()
+    store.release_refresh_lock()
+    assert os.listdir(tmp_path) == []
+
+class FakeDriver:
+    """Sets one more NSE cookie every poll"""
+
+    def __init__(self):
+        self.polls = 0
+        self.quits = 0
+        self.current_url = "about:blank"
+
+    def get(self, url):
+        self.current_url = url
+
+    def get_cookies(self):
+        self.polls += 1
+        return [{"name": name, "value": "v"} for name in ["nsit", "nseappid", "ak_bmsc"][:self.polls]]
+
+    def delete_all_cookies(self):
+        self.polls = 0
+
+    def quit(self):
+        self.quits += 1
+
+def _service_with(driver, tmp_path) -> NSECookieService:
+    service = NSECookieService()
+    service.store = SharedCookieStore(str(tmp_path / "nse_cookies.json"))
+    service.min_required_cookies = ["nsit", "nseappid"]
+    service.harvest_poll_interval = 0.01
+    service.get_driver = lambda: driver
+    service.http_bootstrap = False
+    return service
+
+def test_harvest_ends_once_required_cookies_are_set(tmp_path):
+    driver = FakeDriver()
+    service = _service_with(driver, tmp_path)
+
+    started = time.perf_counter()
+    cookies = service.get_nse_cookies()
+    assert time.perf_counter() - started < 1
+    assert cookies == {"nsit": "v", "nseappid": "v"}
+    assert driver.polls == 2
+    assert driver.quits == 1
+
+def test_reused_browser_survives_refreshes(tmp_path):
+    driver = FakeDriver()
+    service = _service_with(driver, tmp_path)
+    service.reuse_browser = True
+    launches = []
+    service.get_driver = lambda: launches.append(1) or driver
+
+    assert service.get_nse_cookies()
+    assert service.get_nse_cookies()
+    assert len(launches) == 1
+    assert driver.quits == 0
+    service.close_browser()
+    assert driver.quits == 1
+
+def test_http_tier_skips_the_browser(tmp_path, monkeypatch):
+    driver = FakeDriver()
+    service = _service_with(driver, tmp_path)
+    service.http_bootstrap = True
+    monkeypatch.setattr(service, "_bootstrap_with_http", lambda: {"nsit": "h", "nseappid": "h"})
+
+    assert service.get_nse_cookies() == {"nsit": "h", "nseappid": "h"}
+    assert driver.polls == 0
+
+    monkeypatch.setattr(service, "_bootstrap_with_http", lambda: None)
+    assert service.get_nse_cookies() == {"nsit": "v", "nseappid": "v"}
+    assert service.get_tier_stats() == {
+        "http": {"attempts": 2, "successes": 1},
+        "browser": {"attempts": 1, "successes": 1}
+    }
+
+class ChallengeResponse:
+    status_code = 200
+
+    def json(self):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+def test_validation_sends_only_the_jar_under_test(tmp_path, monkeypatch):
+    service = _service_with(FakeDriver(), tmp_path)
+    sent = []
+
+    def get(session, url, cookies=None, **kwargs):
+        sent.append({**session.cookies.get_dict(), **cookies})
+        session.cookies.set("bm_sv", "from-response")
+        return ChallengeResponse()
+
+    monkeypatch.setattr(requests.Session, "get", get)
+    service.validate_cookies({"nsit": "a"})
+    service.validate_cookies({"nseappid": "b"})
+    assert sent == [{"nsit": "a"}, {"nseappid": "b"}]
+
+def test_challenge_page_is_not_cached_as_valid(tmp_path, monkeypatch):
+    service = _service_with(FakeDriver(), tmp_path)
+    monkeypatch.setattr(requests.Session, "get", lambda *args, **kwargs: ChallengeResponse())
+
+    assert service.validate_cookies({"nsit": "x"}) is False
+    assert service.validate_cookies({"nsit": "x"}) is False
+
+if __name__ == "__main__":
+    print("Running tests for NSE cookie manager")
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,456 @@
+import sys
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils import db as db_module
+from Utils.db import DatabaseManager, SQLITE_MIGRATIONS
+from Constant.general import DB_MONGODB
+
+def _legacy_database(path: str):
+    """A pre-migration database: the original table without indexes or user_version"""
+    connection = sqlite3.connect(path)
+    connection.execute('''
+        CREATE TABLE top_gainers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            data_type TEXT NOT NULL,
+            category TEXT, symbol TEXT, series TEXT, open_price REAL, high_price REAL,
+            low_price REAL, ltp REAL, prev_price REAL, net_price REAL, per_change REAL,
+            trade_quantity INTEGER, turnover REAL, market_type TEXT, ca_ex_dt TEXT,
+            ca_purpose TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    connection.executemany(
+        "INSERT INTO top_gainers (timestamp, data_type, symbol, created_at) VALUES (?, ?, ?, ?)",
+        [
+            ("2025-07-11T20:06:55", "gainers", "OLD1", "2025-07-11 20:06:55"),
+            ("2025-07-11T20:06:55", "gainers", "OLD2", "2025-07-11 20:06:55"),
+            ("2025-07-11T20:20:31", "gainers", "NEW", "2025-07-11T20:20:31"),
+        ]
+    )
+    connection.commit()
+    connection.close()
+
+def _snapshot(rows: int, timestamp: str) -> dict:
+    return {
+        "timestamp": timestamp,
+        "data_type": "gainers",
+        "data": [{"symbol": f"SYM{i}", "ltp": float(i)} for i in range(rows)]
+    }
+
+def test_migration_splits_legacy_rows_into_snapshots(tmp_path):
+    path = str(tmp_path / "nse_data.db")
+    _legacy_database(path)
+
+    db_manager = DatabaseManager(db_path=path)
+    try:
+        connection = db_manager.db_connection
+        assert connection.execute('PRAGMA user_version').fetchone()[0] == len(SQLITE_MIGRATIONS)
+        snapshots = connection.execute(
+            "SELECT fetched_at, row_count FROM snapshots WHERE dataset = 'top_gainers' ORDER BY id"
+        ).fetchall()
+        assert [tuple(row) for row in snapshots] == [("2025-07-11T20:06:55", 2), ("2025-07-11T20:20:31", 1)]
+
+        latest = db_manager.get_latest_snapshot("top_gainers")
+        assert latest["row_count"] == 1
+        assert [row["symbol"] for row in latest["data"]] == ["NEW"]
+        assert latest["data"][0]["timestamp"] == "2025-07-11T20:20:31"
+        # Legacy created_at survives on the snapshot
+        assert latest["created_at"] == "2025-07-11 20:20:31"
+        assert [row["symbol"] for row in db_manager.get_latest_data("top_gainers", 3)] == ["NEW", "OLD1", "OLD2"]
+    finally:
+        db_manager.close_connection()
+
+def test_concurrent_managers_migrate_a_legacy_file_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "nse_data.db")
+    _legacy_database(path)
+
+    # Both managers read the schema version before either has migrated
+    barrier = threading.Barrier(2)
+    configure_connection = DatabaseManager._configure_sqlite_connection
+    def configure_together(self, connection, read_only=False):
+        configure_connection(self, connection, read_only)
+        if not read_only:
+            barrier.wait(5)
+    monkeypatch.setattr(DatabaseManager, "_configure_sqlite_connection", configure_together)
+    first_migration = SQLITE_MIGRATIONS[0]
+    def slow_migration(cursor):
+        time.sleep(0.2)
+        first_migration(cursor)
+    monkeypatch.setattr(db_module, "SQLITE_MIGRATIONS", [slow_migration, *SQLITE_MIGRATIONS[1:]])
+
+    managers, errors = [], []
+    def open_manager():
+        try:
+            managers.append(DatabaseManager(db_path=path))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=open_manager) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert errors == []
+        connection = managers[0].db_connection
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == len(SQLITE_MIGRATIONS)
+        assert connection.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 2
+        assert connection.execute("SELECT COUNT(*) FROM top_gainers").fetchone()[0] == 3
+    finally:
+        for manager in managers:
+            manager.close_connection()
+
+def test_latest_read_never_splits_a_snapshot(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        for minute in range(3):
+            db_manager.save_data(_snapshot(30, f"2025-07-11T20:0{minute}:00"), "top_gainers", payload_hash=str(minute))
+
+        rows = db_manager.get_latest_data("top_gainers", 50)
+        assert len(rows) == 30
+        assert {row["timestamp"] for row in rows} == {"2025-07-11T20:02:00"}
+        assert len(db_manager.get_latest_data("top_gainers", 60)) == 60
+        # A limit below one snapshot still returns that snapshot whole
+        assert len(db_manager.get_latest_data("top_gainers", 10)) == 30
+        assert db_manager.get_latest_snapshot("top_gainers")["payload_hash"] == "2"
+        assert db_manager.get_latest_snapshot("top_loosers") is None
+
+        plan = " ".join(
+            row[3] for row in db_manager.db_connection.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM snapshots WHERE dataset = 'top_gainers' "
+                "ORDER BY fetched_at DESC, id DESC LIMIT 1"
+            )
+        )
+        assert "idx_snapshots_dataset_fetched_at" in plan
+        assert "TEMP B-TREE" not in plan
+    finally:
+        db_manager.close_connection()
+
+def test_snapshot_and_rows_commit_in_one_transaction(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        statements = []
+        db_manager.db_connection.set_trace_callback(statements.append)
+        db_manager.save_data(_snapshot(3, "2025-07-11T20:00:00"), "top_gainers")
+        db_manager.db_connection.set_trace_callback(None)
+        assert statements[0] == "BEGIN IMMEDIATE" and statements[-1] == "COMMIT"
+        assert statements.count("COMMIT") == 1
+
+        # One bad snapshot rolls back the whole batch, dictionary values included
+        bad = {"timestamp": "2025-07-11T20:02:00", "data_type": "gainers", "data": [{"symbol": "BAD", "ltp": {"not": "a number"}}]}
+        with pytest.raises(sqlite3.Error):
+            db_manager.save_batch([
+                (_snapshot(4, "2025-07-11T20:01:00"), "top_gainers", "a"),
+                (_snapshot(2, "2025-07-11T20:01:00"), "top_loosers", "b"),
+                (bad, "top_gainers", "c")
+            ])
+        connection = db_manager.db_connection
+        assert connection.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 1
+        assert connection.execute("SELECT COUNT(*) FROM top_gainers").fetchone()[0] == 3
+        assert connection.execute("SELECT COUNT(*) FROM top_loosers").fetchone()[0] == 0
+        assert db_manager.value_dictionary.lookup(connection, ["SYM3", "BAD"]) == {}
+
+        # The writer recovers with caches that match the rolled-back file
+        db_manager.save_data(_snapshot(4, "2025-07-11T20:03:00"), "top_gainers")
+        assert [row["symbol"] for row in db_manager.get_latest_snapshot("top_gainers")["data"]] == \
+            ["SYM0", "SYM1", "SYM2", "SYM3"]
+    finally:
+        db_manager.close_connection()
+
+def test_connections_apply_the_configured_pragmas(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        writer = db_manager.db_connection
+        assert writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # 1 is NORMAL: under WAL only checkpoints sync
+        assert writer.execute("PRAGMA synchronous").fetchone()[0] == 1
+        for connection in (writer, db_manager._read_connection()):
+            assert connection.execute("PRAGMA cache_size").fetchone()[0] == -20000
+            # 2 is MEMORY
+            assert connection.execute("PRAGMA temp_store").fetchone()[0] == 2
+            assert connection.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    finally:
+        db_manager.close_connection()
+
+def test_reads_use_one_read_only_connection_per_thread(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        db_manager.save_data(_snapshot(5, "2025-07-11T20:00:00"), "top_gainers")
+        connections, results = [], []
+
+        def read():
+            connections.append(db_manager._read_connection())
+            results.append(len(db_manager.get_latest_data("top_gainers", 50)))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [5, 5, 5, 5]
+        assert len({id(connection) for connection in connections}) == 4
+        assert db_manager.db_connection not in connections
+
+        # Readers see the writer's later commits and cannot write themselves
+        db_manager.save_data(_snapshot(7, "2025-07-11T20:01:00"), "top_gainers")
+        assert len(db_manager.get_latest_data("top_gainers", 7)) == 7
+        with pytest.raises(sqlite3.OperationalError):
+            db_manager._read_connection().execute("DELETE FROM snapshots")
+    finally:
+        db_manager.close_connection()
+
+def test_text_columns_are_stored_as_dictionary_ids(tmp_path):
+    path = str(tmp_path / "nse_data.db")
+    db_manager = DatabaseManager(db_path=path)
+    try:
+        for minute in range(2):
+            db_manager.save_data(_snapshot(3, f"2025-07-11T20:0{minute}:00"), "top_gainers")
+        db_manager.save_data(_snapshot(2, "2025-07-11T20:02:00"), "top_loosers")
+
+        stored = db_manager.db_connection.execute("SELECT DISTINCT typeof(symbol_id) FROM top_gainers").fetchall()
+        assert [row[0] for row in stored] == ["integer"]
+        # Both tables and every snapshot share one entry per value
+        assert db_manager.db_connection.execute("SELECT COUNT(*) FROM dictionary").fetchone()[0] == 3
+
+        # Reads decode ids through joins, not a correlated subquery per row and column
+        statements = []
+        db_manager._read_connection().set_trace_callback(statements.append)
+        assert [row["symbol"] for row in db_manager.get_latest_data("top_loosers")] == ["SYM0", "SYM1"]
+        rows_query = next(statement for statement in statements if "FROM top_loosers" in statement)
+        plan = " ".join(row[3] for row in db_manager._read_connection().execute(f"EXPLAIN QUERY PLAN {rows_query}"))
+        assert "SUBQUERY" not in plan
+    finally:
+        db_manager.close_connection()
+
+    # A new manager starts with the stored values already cached
+    reopened = DatabaseManager(db_path=path)
+    try:
+        assert reopened.value_dictionary.lookup(reopened.db_connection, ["SYM2", "NONE"]) == {"SYM2": 3}
+    finally:
+        reopened.close_connection()
+
+def test_symbol_history_returns_column_arrays(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        for minute, price in enumerate([100.0, 101.5, 99.0]):
+            db_manager.save_data({
+                "timestamp": f"2025-07-11T09:1{5 + minute}:00",
+                "data_type": "gainers",
+                "data": [
+                    {"category": "NIFTY", "symbol": "RELIANCE", "ltp": price, "per_change": minute},
+                    {"category": "allSec", "symbol": "RELIANCE", "ltp": price, "per_change": minute},
+                    {"category": "NIFTY", "symbol": "TCS", "ltp": 10.0, "per_change": 0.1}
+                ]
+            }, "top_gainers")
+
+        history = db_manager.get_symbol_history(
+            "top_gainers", ["RELIANCE"], "2025-07-11T09:16:00", "2025-07-11T15:30:00", ["ltp", "per_change"]
+        )
+        # One point per snapshot even though RELIANCE is listed under two categories
+        assert history == {
+            "symbol": ["RELIANCE", "RELIANCE"],
+            "timestamp": ["2025-07-11T09:16:00", "2025-07-11T09:17:00"],
+            "ltp": [101.5, 99.0],
+            "per_change": [1.0, 2.0]
+        }
+        with pytest.raises(ValueError):
+            db_manager.get_symbol_history("top_gainers", ["RELIANCE"], "a", "b", ["password"])
+
+        plan = " ".join(row[3] for row in db_manager.db_connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM top_gainers WHERE symbol_id IN (1) AND snapshot_id BETWEEN 1 AND 3"
+        ))
+        assert "idx_top_gainers_symbol_id_snapshot" in plan
+    finally:
+        db_manager.close_connection()
+
+class FakeCursor(list):
+    def sort(self, keys, direction=1):
+        for key, direction in reversed(keys if isinstance(keys, list) else [(keys, direction)]):
+            super().sort(key=lambda document: document[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        return FakeCursor(self[:count])
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the queries DatabaseManager issues"""
+
+    def __init__(self):
+        self.documents = []
+
+    def _matches(self, document, query):
+        for key, condition in query.items():
+            if isinstance(condition, dict) and "$in" in condition:
+                if document.get(key) not in condition["$in"]:
+                    return False
+            elif isinstance(condition, dict) and "$exists" in condition:
+                if (key in document) != condition["$exists"]:
+                    return False
+            elif isinstance(condition, dict) and "$lt" in condition:
+                if not document.get(key) < condition["$lt"]:
+                    return False
+            elif document.get(key) != condition:
+                return False
+        return True
+
+    def find(self, query=None, projection=None):
+        found = FakeCursor()
+        for document in self.documents:
+            if self._matches(document, query or {}):
+                if projection and any(value == 1 for value in projection.values()):
+                    document = {key: document[key] for key in projection if projection[key] == 1 and key in document}
+                if projection:
+                    document = {key: value for key, value in document.items() if projection.get(key) != 0}
+                found.append(dict(document))
+        return found
+
+    def insert_one(self, document):
+        self.documents.append(dict(document))
+
+    def insert_many(self, documents, ordered=True):
+        assert not ordered
+        self.documents.extend(dict(document) for document in documents)
+
+    def find_one(self, query, projection=None):
+        found = self.find(query, projection)
+        return found[0] if found else None
+
+    def replace_one(self, query, document, upsert=False):
+        self.delete_one(query)
+        self.insert_one(document)
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self.replace_one(request._filter, request._doc, upsert=request._upsert)
+
+    def delete_one(self, query):
+        self.documents = [document for document in self.documents if not self._matches(document, query)]
+
+    def delete_many(self, query):
+        kept = [document for document in self.documents if not self._matches(document, query)]
+        deleted, self.documents = len(self.documents) - len(kept), kept
+        return type("DeleteResult", (), {"deleted_count": deleted})()
+
+    def find_one_and_update(self, query, update, upsert, return_document):
+        matches = [document for document in self.documents if self._matches(document, query)]
+        counter = matches[0] if matches else {**query, "seq": 0}
+        if not matches:
+            self.documents.append(counter)
+        counter["seq"] += update["$inc"]["seq"]
+        return counter
+
+class FakeMongoDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+def test_mongodb_rows_match_sqlite(tmp_path):
+    sqlite_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    mongo_manager = DatabaseManager.__new__(DatabaseManager)
+    mongo_manager.db_type = DB_MONGODB
+    mongo_manager.mongo_db = FakeMongoDatabase()
+    try:
+        for manager in (sqlite_manager, mongo_manager):
+            for minute, rows in enumerate([3, 4, 2]):
+                manager.save_data(_snapshot(rows, f"2025-07-11T20:0{minute}:00"), "top_gainers", payload_hash=str(minute))
+
+        def without_created_at(rows):
+            return [{key: value for key, value in row.items() if key != "created_at"} for row in rows]
+
+        for limit in (1, 6, 9):
+            assert without_created_at(mongo_manager.get_latest_data("top_gainers", limit)) == \
+                without_created_at(sqlite_manager.get_latest_data("top_gainers", limit))
+
+        mongo_latest = mongo_manager.get_latest_snapshot("top_gainers")
+        sqlite_latest = sqlite_manager.get_latest_snapshot("top_gainers")
+        assert mongo_latest.keys() == sqlite_latest.keys()
+        assert without_created_at(mongo_latest["data"]) == without_created_at(sqlite_latest["data"])
+        assert "_id" not in mongo_latest["data"][0]
+    finally:
+        sqlite_manager.close_connection()
+
+def test_mongodb_retention_matches_sqlite(tmp_path):
+    sqlite_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    mongo_manager = DatabaseManager.__new__(DatabaseManager)
+    mongo_manager.db_type = DB_MONGODB
+    mongo_manager.mongo_db = FakeMongoDatabase()
+    try:
+        for manager in (sqlite_manager, mongo_manager):
+            for day, rows in enumerate([3, 4, 2], start=1):
+                manager.save_data(_snapshot(rows, f"2025-07-0{day}T10:00:00"), "top_gainers")
+        # Two runs over the same day merge into one bar, as ON CONFLICT does in SQLite
+        for manager in (sqlite_manager, mongo_manager):
+            manager.save_data(_snapshot(1, "2025-07-02T15:00:00"), "top_gainers")
+            assert manager.apply_retention("top_gainers", "2025-07-02T12:00:00") == \
+                {"snapshots": 2, "rows": 7, "rollups": 7}
+            assert manager.apply_retention("top_gainers", "2025-07-03T00:00:00") == \
+                {"snapshots": 1, "rows": 1, "rollups": 1}
+
+        assert [row["timestamp"] for row in mongo_manager.get_latest_data("top_gainers", 10)] == ["2025-07-03T10:00:00"] * 2
+        columns = ["dataset", "symbol", "day", "open", "high", "low", "close", "volume", "samples", "first_at", "last_at"]
+        sqlite_bars = [
+            dict(zip(columns, row)) for row in sqlite_manager.db_connection.execute(
+                f"SELECT {', '.join(columns)} FROM intraday_ohlc ORDER BY symbol, day"
+            )
+        ]
+        mongo_bars = mongo_manager.mongo_db["intraday_ohlc"].find({}, {"_id": 0}).sort([("symbol", 1), ("day", 1)])
+        assert mongo_bars == sqlite_bars
+        assert mongo_bars[1]["day"] == "2025-07-02" and mongo_bars[1]["samples"] == 2
+        assert mongo_bars[1]["last_at"] == "2025-07-02T15:00:00"
+    finally:
+        sqlite_manager.close_connection()
+
+def test_mongodb_migrates_embedded_snapshots():
+    mongo_manager = DatabaseManager.__new__(DatabaseManager)
+    mongo_manager.db_type = DB_MONGODB
+    mongo_manager.mongo_db = FakeMongoDatabase()
+    mongo_manager.mongo_db["top_gainers"].insert_one(
+        {"_id": "legacy", "created_at": "2025-07-11T20:00:00", **_snapshot(2, "2025-07-11T20:00:00")}
+    )
+
+    mongo_manager._migrate_mongodb()
+    latest = mongo_manager.get_latest_snapshot("top_gainers")
+    assert latest["row_count"] == 2
+    assert [row["symbol"] for row in latest["data"]] == ["SYM0", "SYM1"]
+    assert not mongo_manager.mongo_db["top_gainers"].find({"data": {"$exists": True}})
+
+def test_interrupted_mongodb_migration_resumes_without_duplicates():
+    mongo_manager = DatabaseManager.__new__(DatabaseManager)
+    mongo_manager.db_type = DB_MONGODB
+    mongo_manager.mongo_db = FakeMongoDatabase()
+    rows = mongo_manager.mongo_db["top_gainers"]
+    # No timestamp: the legacy created_at stands in for fetched_at
+    rows.insert_one({"_id": "legacy", "created_at": "2025-07-11 20:00:00", "data_type": "gainers",
+                     "data": _snapshot(2, None)["data"]})
+
+    snapshots = mongo_manager.mongo_db["snapshots"]
+    for crash_point in (snapshots, rows):
+        # Crash once the rows are written, then once the snapshot is, before the legacy document goes
+        original = crash_point.replace_one if crash_point is snapshots else crash_point.delete_one
+        def crash(*args, **kwargs):
+            raise RuntimeError("interrupted")
+        setattr(crash_point, original.__name__, crash)
+        with pytest.raises(RuntimeError):
+            mongo_manager._migrate_mongodb()
+        setattr(crash_point, original.__name__, original)
+    mongo_manager._migrate_mongodb()
+
+    assert len(snapshots.documents) == 1
+    assert [row["symbol"] for row in rows.find({"symbol": {"$exists": True}})] == ["SYM0", "SYM1"]
+    latest = mongo_manager.get_latest_snapshot("top_gainers")
+    assert latest["fetched_at"] == latest["created_at"] == "2025-07-11 20:00:00"
+    assert "legacy_id" not in latest
+    assert [row["snapshot_id"] for row in latest["data"]] == [latest["id"]] * 2
+
+if __name__ == "__main__":
+    print("Running tests for database manager")
+    import pytest
+    pytest.main([__file__])
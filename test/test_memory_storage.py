@@ -0,0 +1,79 @@
+import sys
+import os
+
+import pytest
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+from Utils.memory_storage import MemoryStorage
+from Utils.storage import SnapshotStorage, get_storage
+from Utils.config_reader import configure
+from Constant.general import DB_MEMORY
+
+def _snapshot(timestamp: str, prices: dict) -> dict:
+    return {
+        "timestamp": timestamp,
+        "data_type": "gainers",
+        "data": [
+            {"category": "NIFTY", "symbol": symbol, "series": "EQ", "ltp": ltp, "trade_quantity": 10}
+            for symbol, ltp in prices.items()
+        ] + [{"category": "allSec", "symbol": "RELIANCE", "series": "EQ", "ltp": 0.0}]
+    }
+
+SNAPSHOTS = [
+    ("2025-07-01T09:15:00", {"RELIANCE": 100.0, "TCS": 10.0}),
+    ("2025-07-01T15:30:00", {"RELIANCE": 90.0, "TCS": 11.0}),
+    ("2025-07-10T09:15:00", {"RELIANCE": 101.0}),
+    ("2025-07-10T09:16:00", {"TCS": 12.0, "RELIANCE": 102.0}),
+]
+
+def _without_created_at(rows):
+    return [{key: value for key, value in row.items() if key != "created_at"} for row in rows]
+
+def test_memory_backend_matches_sqlite(tmp_path):
+    sqlite_storage = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    memory_storage = MemoryStorage()
+    try:
+        for storage in (sqlite_storage, memory_storage):
+            assert isinstance(storage, SnapshotStorage)
+            for timestamp, prices in SNAPSHOTS:
+                storage.save_data(_snapshot(timestamp, prices), "top_gainers", payload_hash=timestamp)
+
+        for limit in (1, 3, 6, 100):
+            assert _without_created_at(memory_storage.get_latest_data("top_gainers", limit)) == \
+                _without_created_at(sqlite_storage.get_latest_data("top_gainers", limit))
+        latest = memory_storage.get_latest_snapshot("top_gainers")
+        expected = sqlite_storage.get_latest_snapshot("top_gainers")
+        assert latest.keys() == expected.keys()
+        assert _without_created_at(latest["data"]) == _without_created_at(expected["data"])
+        assert memory_storage.get_latest_snapshot("top_loosers") is None
+
+        for storage in (sqlite_storage, memory_storage):
+            assert storage.get_snapshot_bounds("top_gainers") == ("2025-07-01T09:15:00", "2025-07-10T09:16:00")
+        assert memory_storage.get_symbol_history("top_gainers", ["RELIANCE", "TCS"], "2025-07-01", "2025-07-11", ["ltp"]) == \
+            sqlite_storage.get_symbol_history("top_gainers", ["RELIANCE", "TCS"], "2025-07-01", "2025-07-11", ["ltp"])
+        with pytest.raises(ValueError):
+            memory_storage.get_symbol_history("top_gainers", ["TCS"], "a", "b", ["password"])
+        assert _without_created_at(memory_storage.get_snapshots_between("top_gainers", "2025-07-01", "2025-07-10T09:16:00")) == \
+            _without_created_at(sqlite_storage.get_snapshots_between("top_gainers", "2025-07-01", "2025-07-10T09:16:00"))
+
+        assert memory_storage.apply_retention("top_gainers", "2025-07-03T00:00:00") == \
+            sqlite_storage.apply_retention("top_gainers", "2025-07-03T00:00:00")
+        bar = memory_storage.intraday_ohlc[("top_gainers", "RELIANCE", "2025-07-01")]
+        assert (bar["open"], bar["high"], bar["low"], bar["close"], bar["samples"]) == (100.0, 100.0, 0.0, 0.0, 4)
+        assert _without_created_at(memory_storage.get_latest_data("top_gainers", 100)) == \
+            _without_created_at(sqlite_storage.get_latest_data("top_gainers", 100))
+    finally:
+        sqlite_storage.close_connection()
+
+def test_memory_type_shares_one_store(monkeypatch):
+    monkeypatch.setitem(configure.config['DB'], 'TYPE', DB_MEMORY)
+    writer, reader = get_storage(), get_storage()
+    assert isinstance(writer, MemoryStorage)
+    assert writer is reader
+
+if __name__ == "__main__":
+    print("Running tests for the in-memory storage backend")
+    pytest.main([__file__])
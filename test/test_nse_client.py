@@ -0,0 +1,144 @@
+import sys
+import os
+import asyncio
+import time
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import pytest
+from Services import nse_client as client_module
+from Services.nse_client import NSEHttpClient
+
+class FakeCookieManager:
+    def __init__(self):
+        self.jar = {"nsit": "stale"}
+        self.invalidations = 0
+
+    def get_cookies(self):
+        return self.jar
+
+    def invalidate(self, stale_cookies):
+        self.invalidations += 1
+        self.jar = None
+
+    def mark_valid(self, cookies):
+        self.valid = cookies
+
+    def wait_for_cookies(self, timeout):
+        self.jar = {"nsit": "fresh"}
+        return self.jar
+
+def _client_with(handler) -> NSEHttpClient:
+    client = NSEHttpClient()
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def _fetch(client, **kwargs):
+    async def run():
+        try:
+            return await client.get_payload("https://www.nseindia.com/api/test", **kwargs)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+def test_rejected_cookies_are_refreshed_and_retried(monkeypatch):
+    manager = FakeCookieManager()
+    monkeypatch.setattr(client_module, "cookie_manager", manager)
+
+    def handler(request):
+        if "nsit=fresh" in request.headers.get("cookie", ""):
+            return httpx.Response(200, json={"data": []})
+        return httpx.Response(403, text="Access Denied")
+
+    data, payload_hash = _fetch(_client_with(handler))
+    assert data == {"data": []}
+    assert payload_hash
+    assert manager.invalidations == 1
+
+def test_html_challenge_counts_as_auth_failure(monkeypatch):
+    manager = FakeCookieManager()
+    monkeypatch.setattr(client_module, "cookie_manager", manager)
+
+    def handler(request):
+        if "nsit=fresh" in request.headers.get("cookie", ""):
+            return httpx.Response(200, json={"ok": True})
+        return httpx.Response(200, text="<html>challenge</html>", headers={"content-type": "text/html"})
+
+    data, _ = _fetch(_client_with(handler))
+    assert data == {"ok": True}
+    assert manager.invalidations == 1
+
+def test_retry_budget_is_bounded(monkeypatch):
+    manager = FakeCookieManager()
+    monkeypatch.setattr(client_module, "cookie_manager", manager)
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(request)
+        return httpx.Response(401)
+
+    client = _client_with(handler)
+    client.max_retries = 2
+    assert _fetch(client) is None
+    assert len(requests_seen) == 3
+
+def test_retries_share_one_refresh_wait(monkeypatch):
+    class SlowCookieManager(FakeCookieManager):
+        def __init__(self):
+            super().__init__()
+            self.timeouts = []
+
+        def wait_for_cookies(self, timeout):
+            self.timeouts.append(timeout)
+            time.sleep(0.2)
+            return super().wait_for_cookies(timeout)
+
+    manager = SlowCookieManager()
+    monkeypatch.setattr(client_module, "cookie_manager", manager)
+    client = _client_with(lambda request: httpx.Response(403))
+    client.max_retries = 5
+    client.cookie_wait = 0.5
+
+    started = time.monotonic()
+    assert _fetch(client) is None
+    # Three waits fit the budget, not five
+    assert time.monotonic() - started < 1.0
+    assert len(manager.timeouts) == 3
+    assert all(later < earlier for earlier, later in zip(manager.timeouts, manager.timeouts[1:]))
+
+def test_timeout_bounds_each_attempt_not_the_refresh_wait(monkeypatch):
+    class SlowRefreshCookieManager(FakeCookieManager):
+        def wait_for_cookies(self, timeout):
+            time.sleep(0.3)
+            return super().wait_for_cookies(timeout)
+    monkeypatch.setattr(client_module, "cookie_manager", SlowRefreshCookieManager())
+
+    def handler(request):
+        if "nsit=fresh" in request.headers.get("cookie", ""):
+            return httpx.Response(200, json={"data": []})
+        return httpx.Response(403)
+
+    data, _ = _fetch(_client_with(handler), timeout=0.2)
+    assert data == {"data": []}
+
+    async def hang(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={})
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        _fetch(_client_with(hang), timeout=0.2)
+    assert time.monotonic() - started < 0.5
+
+def test_unchanged_payload_is_not_decoded(monkeypatch):
+    monkeypatch.setattr(client_module, "cookie_manager", FakeCookieManager())
+    client = _client_with(lambda request: httpx.Response(200, content=b'{"a": 1}'))
+    _, payload_hash = _fetch(client)
+    client = _client_with(lambda request: httpx.Response(200, content=b'{"a": 1}'))
+    assert _fetch(client, known_hash=payload_hash) == (None, payload_hash)
+
+if __name__ == "__main__":
+    print("Running tests for NSE HTTP client")
+    import pytest
+    pytest.main([__file__])
@@ -1,34 +1,78 @@
 import sys
 import os
+import asyncio
 
 # Setup path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from API.Controller.top_gainers_loosers import NSETopGainersloosersController
+from Utils.memory_storage import MemoryStorage
+from Utils.write_queue import write_queue
+
+def _payload(symbols):
+    """A live-analysis-variations payload with one NIFTY category"""
+    return {
+        "legends": [["NIFTY", "Nifty 50"]],
+        "NIFTY": {"data": [
+            {"symbol": symbol, "series": "EQ", "ltp": 100.0 + i, "prev_price": 99.0, "perChange": 1.0}
+            for i, symbol in enumerate(symbols)
+        ]}
+    }
+
+PAYLOADS = {
+    "gainers": _payload(["RELIANCE", "TCS"]),
+    "loosers": _payload(["INFY"])
+}
+
+async def _scrape_gainers_loosers(controller):
+    await controller.scrape_top_gainers()
+    await controller.scrape_top_loosers()
+    # Persist the queued snapshots before reading them back
+    write_queue.flush()
 
 def test_get_nse_gainers_loosers_data():
     controller = NSETopGainersloosersController()
+    # The application lifespan starts the writer; requests never do
+    write_queue.start()
+    # conftest selects the in-memory backend; NSE is replaced with canned payloads
+    assert isinstance(controller.db_manager, MemoryStorage)
+
+    async def make_request(url, headers=None, known_hash=None):
+        index = url.rsplit("=", 1)[-1]
+        return PAYLOADS[index], f"hash-{index}"
+    controller._make_request = make_request
 
     # First, ensure data exists
-    controller.scrape_top_gainers()
-    controller.scrape_top_loosers()
+    asyncio.run(_scrape_gainers_loosers(controller))
 
     # Then test gainers
     gainers_data = controller.get_top_gainers_from_db()
     assert gainers_data["success"], f"Gainers error: {gainers_data.get('message')}"
     assert "data" in gainers_data
-    assert len(gainers_data["data"]) > 0, "Gainers data is empty"
-    # print("data :", gainers_data["data"])
+    assert [row["symbol"] for row in gainers_data["data"]] == ["RELIANCE", "TCS"]
 
     # Then test loosers
     loosers_data = controller.get_top_loosers_from_db()
     assert loosers_data["success"], f"loosers error: {loosers_data.get('message')}"
     assert "data" in loosers_data
-    assert len(loosers_data["data"]) > 0, "loosers data is empty"
-    # print("data :", loosers_data["data"])
+    assert [row["symbol"] for row in loosers_data["data"]] == ["INFY"]
+
+def test_dropped_snapshot_is_reported(monkeypatch):
+    controller = NSETopGainersloosersController()
+
+    async def make_request(url, headers=None, known_hash=None):
+        return PAYLOADS["gainers"], "hash-dropped"
+    controller._make_request = make_request
+    monkeypatch.setattr(write_queue, "enqueue", lambda *args, **kwargs: False)
+
+    response = asyncio.run(controller.scrape_top_gainers())
+    assert response["success"]
+    assert response["metadata"] == {"stored": False}
+    assert response["errors"] == ["Snapshot dropped: write queue is full"]
+    assert "not stored" in response["message"]
 
 
 if __name__ == "__main__":
+    import pytest
     print("Running tests for NSE Top Gainers and loosers get data API")
-    test_get_nse_gainers_loosers_data()
-    print("✅ All tests passed successfully!")
+    pytest.main([__file__])
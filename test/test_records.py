@@ -0,0 +1,60 @@
+import sys
+import os
+import json
+
+import pytest
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+from Utils.records import RECORD_TYPES, ROW_TYPES, Quote, record_type
+from Utils.response import create_response, json_response
+from Services.nse_parsers import parse_gainers_loosers
+
+PAYLOAD = {
+    "legends": [["NIFTY", "Nifty 50"]],
+    "NIFTY": {"data": [
+        {"symbol": "RELIANCE", "series": "EQ", "high_price": 3050, "low_price": 2950, "prev_price": 3000, "ltp": "3,010.50"},
+        {"symbol": "TCS", "series": "EQ", "ltp": 4000}
+    ]}
+}
+
+def test_parsed_quotes_are_slotted_mappings():
+    records = parse_gainers_loosers(PAYLOAD, "gainers")["data"]
+    quote = records[0]
+    assert type(quote) is Quote and RECORD_TYPES["top_loosers"] is Quote
+    assert not hasattr(quote, "__dict__")
+    assert quote["ltp"] == quote.get("ltp") == quote.ltp == 3010.5
+    assert quote.get("password") is None
+    with pytest.raises(KeyError):
+        quote["password"]
+    assert list(quote) == [column for column in Quote.__slots__]
+    assert dict(quote) == quote and quote["category"] == "NIFTY" and quote["spread"] == 100.0
+
+def test_json_response_matches_dict_rendering():
+    processed = parse_gainers_loosers(PAYLOAD, "gainers")
+    response = create_response(success=True, data=processed)
+    as_dicts = create_response(success=True, data={**processed, "data": [dict(quote) for quote in processed["data"]]})
+    as_dicts["timestamp"] = response["timestamp"]
+    assert json.loads(json_response(response).body) == json.loads(json.dumps(as_dicts))
+
+def test_stored_rows_read_back_as_row_records(tmp_path):
+    storage = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        processed = parse_gainers_loosers(PAYLOAD, "gainers")
+        storage.save_data(processed, "top_gainers")
+        rows = storage.get_latest_data("top_gainers", 10)
+        assert [type(row) for row in rows] == [ROW_TYPES["top_gainers"]] * 2
+        assert rows[0]["timestamp"] == processed["timestamp"]
+        assert {column: rows[0][column] for column in Quote.__slots__} == processed["data"][0]
+    finally:
+        storage.close_connection()
+
+def test_record_type_rejects_fields_shadowing_mapping_methods():
+    with pytest.raises(ValueError):
+        record_type("Broken", ("symbol", "items"))
+
+if __name__ == "__main__":
+    print("Running tests for the slotted record types")
+    pytest.main([__file__])
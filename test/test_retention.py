@@ -0,0 +1,62 @@
+import sys
+import os
+from datetime import datetime
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+from Services.retention import RetentionEngine
+
+def _snapshot(timestamp: str, ltp: float, volume: int) -> dict:
+    return {
+        "timestamp": timestamp,
+        "data_type": "gainers",
+        "data": [{"symbol": "RELIANCE", "ltp": ltp, "trade_quantity": volume}, {"symbol": "TCS", "ltp": 10.0}]
+    }
+
+def test_old_days_are_rolled_up_and_dropped(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    engine = RetentionEngine(db_manager_factory=lambda: db_manager)
+    engine.raw_days = 7
+    try:
+        for timestamp, ltp, volume in [
+            ("2025-07-01T09:15:00", 100.0, 10),
+            ("2025-07-01T12:00:00", 120.0, 50),
+            ("2025-07-01T15:30:00", 90.0, 80),
+            ("2025-07-02T09:15:00", 95.0, 5),
+            ("2025-07-10T09:15:00", 101.0, 7),
+        ]:
+            db_manager.save_data(_snapshot(timestamp, ltp, volume), "top_gainers")
+
+        summary = engine.run(now=datetime(2025, 7, 10, 2, 0))
+        assert summary["datasets"]["top_gainers"] == {
+            "cutoff": "2025-07-03T00:00:00", "snapshots": 4, "rows": 8, "rollups": 4
+        }
+        assert not summary["errors"]
+
+        ohlc = db_manager.db_connection.execute(
+            "SELECT day, open, high, low, close, volume, samples FROM intraday_ohlc "
+            "WHERE symbol = 'RELIANCE' ORDER BY day"
+        ).fetchall()
+        assert [tuple(row) for row in ohlc] == [
+            ("2025-07-01", 100.0, 120.0, 90.0, 90.0, 80, 3),
+            ("2025-07-02", 95.0, 95.0, 95.0, 95.0, 5, 1),
+        ]
+        # Only the recent snapshot is still raw
+        assert [row["timestamp"] for row in db_manager.get_latest_data("top_gainers", 100)] == ["2025-07-10T09:15:00"] * 2
+        assert db_manager.db_connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    finally:
+        db_manager.close_connection()
+
+def test_zero_raw_days_keeps_everything():
+    engine = RetentionEngine(db_manager_factory=lambda: None)
+    engine.raw_days = 0
+    assert engine.cutoff_for("top_gainers") is None
+    # The shipped config keeps new listings forever
+    assert engine.raw_days_for("new_listings") == 0
+
+if __name__ == "__main__":
+    print("Running tests for snapshot retention")
+    import pytest
+    pytest.main([__file__])
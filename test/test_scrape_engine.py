@@ -0,0 +1,153 @@
+import sys
+import os
+import asyncio
+import time
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Services import scrape_engine as engine_module
+from Services.scrape_engine import NSEScrapeEngine
+from API.Controller.market_sweep import NSEMarketSweepController
+from Services.nse_parsers import parse_all_indices, parse_gainers_loosers, parse_records
+from Utils.db import DatabaseManager, SQLITE_INSERT_COLUMNS
+
+class FakeNSEClient:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def get_payload(self, url, headers=None, timeout=None, known_hash=None):
+        if "52weeklow" in url:
+            # The real client bounds each attempt by timeout
+            await asyncio.wait_for(asyncio.sleep(timeout + 1), timeout)
+        await asyncio.sleep(self.delay)
+        if known_hash == "same":
+            return None, "same"
+        return {"NIFTY": {"data": [{"symbol": "RELIANCE", "perChange": 1.5}]}}, "changed"
+
+def test_sweep_runs_datasets_concurrently(monkeypatch):
+    monkeypatch.setattr(engine_module, "get_nse_client", lambda: FakeNSEClient(delay=0.2))
+
+    engine = NSEScrapeEngine()
+    engine.max_concurrency = 10
+    engine.endpoint_timeout = 0.5
+
+    started = time.perf_counter()
+    results = asyncio.run(engine.sweep(["gainers", "loosers", "oi_spurts", "52week_high", "52week_low"]))
+    elapsed = time.perf_counter() - started
+
+    # Bounded by the slowest call (the timed out one), not the sum of all calls
+    assert elapsed < 1.0
+    assert results["gainers"]["success"]
+    assert results["gainers"]["data"]["data"][0]["per_change"] == 1.5
+    assert results["oi_spurts"]["data"]["data"][0]["category"] == "NIFTY"
+    assert not results["52week_low"]["success"]
+    assert "Timed out" in results["52week_low"]["error"]
+
+def test_cookie_refresh_is_not_cut_short_by_the_endpoint_timeout(monkeypatch):
+    class RefreshingNSEClient:
+        async def get_payload(self, url, headers=None, timeout=None, known_hash=None):
+            # A rejected attempt, then a refresh wait longer than the endpoint timeout
+            await asyncio.sleep(timeout * 2)
+            return {"NIFTY": {"data": [{"symbol": "RELIANCE", "perChange": 1.5}]}}, "refreshed"
+    monkeypatch.setattr(engine_module, "get_nse_client", lambda: RefreshingNSEClient())
+
+    engine = NSEScrapeEngine()
+    engine.endpoint_timeout = 0.1
+    result = asyncio.run(engine.sweep(["gainers"]))["gainers"]
+    assert result["success"]
+    assert result["payload_hash"] == "refreshed"
+
+def test_unchanged_payload_skips_parsing(monkeypatch):
+    monkeypatch.setattr(engine_module, "get_nse_client", lambda: FakeNSEClient(delay=0))
+    engine_module.payload_hashes.remember("oi_spurts", "same")
+
+    try:
+        results = asyncio.run(NSEScrapeEngine().sweep(["oi_spurts", "gainers"]))
+    finally:
+        engine_module.payload_hashes.forget()
+
+    assert results["oi_spurts"]["success"]
+    assert results["oi_spurts"]["not_modified"]
+    assert results["oi_spurts"]["data"] is None
+    assert not results["gainers"]["not_modified"]
+    assert results["gainers"]["payload_hash"] == "changed"
+
+class UnchangedNSEClient:
+    async def get_payload(self, url, headers=None, timeout=None, known_hash=None):
+        if known_hash == "changed":
+            return None, known_hash
+        return {"NIFTY": {"data": [{"symbol": "RELIANCE", "perChange": 1.5}]}}, "changed"
+
+def test_sweep_returns_unstored_datasets_every_time(monkeypatch):
+    monkeypatch.setattr(engine_module, "get_nse_client", lambda: UnchangedNSEClient())
+    controller = NSEMarketSweepController()
+
+    try:
+        # oi_spurts has no table, so nothing else holds its data between sweeps
+        for _ in range(2):
+            result = asyncio.run(controller.sweep(["oi_spurts"]))["data"]["oi_spurts"]
+            assert not result["not_modified"]
+            assert result["data"]["data"][0]["symbol"] == "RELIANCE"
+    finally:
+        engine_module.payload_hashes.forget()
+
+def test_payload_hashes_are_seeded_from_stored_snapshots(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    try:
+        db_manager.save_data(
+            {"timestamp": "2025-07-11T09:15:00", "data_type": "gainers", "data": [{"symbol": "RELIANCE"}]},
+            "top_gainers", payload_hash="stored"
+        )
+        engine_module.payload_hashes.seed(db_manager, NSEScrapeEngine().stored_datasets())
+        assert engine_module.payload_hashes.get("gainers") == "stored"
+        assert engine_module.payload_hashes.get("loosers") is None
+    finally:
+        engine_module.payload_hashes.forget()
+        db_manager.close_connection()
+
+def test_parsers_project_records_onto_registry_columns():
+    gainers = parse_gainers_loosers(
+        {
+            "legends": [],
+            "NIFTY": {"data": [{"symbol": "RELIANCE", "perChange": 1.5, "extra": 1}]},
+            "allSec": {"data": [{
+                "symbol": "TCS", "series": "EQ", "ltp": "3,510.00", "high_price": "3,520.50", "low_price": 3400,
+                "prev_price": "3,450", "perChange": "-", "trade_quantity": "12,345"
+            }]}
+        },
+        "gainers"
+    )
+    record = gainers["data"][0]
+    assert list(record) == SQLITE_INSERT_COLUMNS["top_gainers"]
+    assert (record["category"], record["symbol"], record["per_change"], record["ltp"]) == ("NIFTY", "RELIANCE", 1.5, None)
+    assert record["spread"] is None
+
+    # NSE text numbers are coerced; placeholders become None
+    record = gainers["data"][1]
+    assert (record["category"], record["ltp"], record["per_change"], record["trade_quantity"]) == ("allSec", 3510.0, None, 12345)
+    assert type(record["trade_quantity"]) is int
+    assert (record["spread"], record["range_percent"]) == (120.5, 3.49)
+
+    indices = parse_all_indices({"data": [{"index": "NIFTY 50", "indexSymbol": "NIFTY 50", "last": 25000.5}]}, "all_indices")
+    record = indices["data"][0]
+    assert list(record) == SQLITE_INSERT_COLUMNS["all_indexes"]
+    assert (record["index_name"], record["last_price"]) == ("NIFTY 50", 25000.5)
+
+def test_generic_payloads_get_text_numbers_coerced():
+    processed = parse_records({"data": [
+        {"symbol": "RELIANCE", "lastPrice": "2,950.40", "totalTradedVolume": "1,20,000", "expiryDate": "30-Oct-2025", "oi": 10},
+        {"symbol": "TCS", "lastPrice": "-", "totalTradedVolume": "350", "expiryDate": "-"},
+    ]}, "equity_derivatives")
+    first, second = processed["data"]
+    assert (first["lastPrice"], first["totalTradedVolume"], first["oi"]) == (2950.4, 120000, 10)
+    assert type(first["totalTradedVolume"]) is int
+    assert (second["lastPrice"], second["totalTradedVolume"]) == (None, 350)
+    # Text that is not a number keeps its column as text, and absent keys stay absent
+    assert (first["expiryDate"], second["expiryDate"]) == ("30-Oct-2025", "-")
+    assert "oi" not in second
+
+if __name__ == "__main__":
+    print("Running tests for NSE scrape engine")
+    import pytest
+    pytest.main([__file__])
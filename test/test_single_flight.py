@@ -0,0 +1,47 @@
+import sys
+import os
+import asyncio
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight()
+    calls = []
+
+    async def scrape():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"rows": len(calls)}
+
+    async def run():
+        results = await asyncio.gather(*(group.do("top_gainers", scrape) for _ in range(5)))
+        # Once the first call finished a new one runs again
+        later = await group.do("top_gainers", scrape)
+        return results, later
+
+    results, later = asyncio.run(run())
+    assert all(result is results[0] for result in results)
+    assert results[0] == {"rows": 1}
+    assert later == {"rows": 2}
+    assert not group.in_flight("top_gainers")
+
+def test_errors_propagate_to_every_waiter():
+    group = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("NSE down")
+
+    async def run():
+        return await asyncio.gather(*(group.do("refresh", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+if __name__ == "__main__":
+    print("Running tests for single-flight coalescing")
+    import pytest
+    pytest.main([__file__])
@@ -0,0 +1,115 @@
+import sys
+import os
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+
+def _quote(symbol: str, ltp: float) -> dict:
+    return {"category": "NIFTY", "symbol": symbol, "series": "EQ", "ltp": ltp}
+
+# Changed prices, a new listing, a dropped symbol and a reshuffled ranking
+SNAPSHOTS = [
+    [_quote("A", 1.0), _quote("B", 2.0), _quote("C", 3.0)],
+    [_quote("A", 1.0), _quote("B", 2.5), _quote("C", 3.0)],
+    [_quote("A", 1.0), _quote("B", 2.5), _quote("C", 3.0), _quote("D", 4.0)],
+    [_quote("A", 1.0), _quote("C", 3.0), _quote("D", 4.0)],
+    [_quote("D", 4.0), _quote("A", 1.5), _quote("C", 3.0)],
+    [_quote("D", 4.0), _quote("A", 1.5), _quote("C", 3.0)],
+]
+
+def _store(path: str, storage_mode: str, base_interval: int = 60) -> DatabaseManager:
+    db_manager = DatabaseManager(db_path=path)
+    db_manager.storage_mode = storage_mode
+    db_manager.delta_base_interval = base_interval
+    for day, records in enumerate(SNAPSHOTS, start=1):
+        db_manager.save_data(
+            {"timestamp": f"2025-07-0{day}T09:15:00", "data_type": "gainers", "data": records},
+            "top_gainers"
+        )
+    return db_manager
+
+def _snapshots(db_manager: DatabaseManager) -> list:
+    rows = db_manager.get_latest_data("top_gainers", 100)
+    return [(row["timestamp"], row["symbol"], row["ltp"]) for row in rows]
+
+def _stored_rows(db_manager: DatabaseManager) -> int:
+    return db_manager.db_connection.execute("SELECT COUNT(*) FROM top_gainers").fetchone()[0]
+
+def test_delta_reads_match_full_storage(tmp_path):
+    full = _store(str(tmp_path / "full.db"), "full")
+    delta = _store(str(tmp_path / "delta.db"), "delta")
+    try:
+        assert _snapshots(delta) == _snapshots(full)
+        assert [row["symbol"] for row in delta.get_latest_snapshot("top_gainers")["data"]] == ["D", "A", "C"]
+        # 3 base rows, then B, D, a removal marker for B, then A
+        assert _stored_rows(delta) == 7
+        assert _stored_rows(full) == 19
+    finally:
+        full.close_connection()
+        delta.close_connection()
+
+def test_delta_chains_restart_from_a_full_base(tmp_path):
+    db_manager = _store(str(tmp_path / "nse_data.db"), "delta", base_interval=3)
+    try:
+        parents = db_manager.db_connection.execute(
+            "SELECT parent_id IS NULL FROM snapshots ORDER BY id"
+        ).fetchall()
+        assert [row[0] for row in parents] == [1, 0, 0, 1, 0, 0]
+        # A new manager rebuilds the chain from disk rather than its writer cache
+        reopened = DatabaseManager(db_path=db_manager.db_path)
+        reopened.storage_mode = "delta"
+        assert _snapshots(reopened) == _snapshots(db_manager)
+        reopened.close_connection()
+    finally:
+        db_manager.close_connection()
+
+def test_retention_rebases_deltas_of_expired_snapshots(tmp_path):
+    db_manager = _store(str(tmp_path / "nse_data.db"), "delta")
+    try:
+        expected = [row for row in _snapshots(db_manager) if row[0] >= "2025-07-04"]
+        summary = db_manager.apply_retention("top_gainers", "2025-07-04T00:00:00")
+        assert summary["snapshots"] == 3
+
+        assert _snapshots(db_manager) == expected
+        rebased = db_manager.db_connection.execute(
+            "SELECT parent_id FROM snapshots ORDER BY id LIMIT 1"
+        ).fetchone()[0]
+        assert rebased is None
+        # Removal markers never reach the OHLC rollup
+        symbols = db_manager.db_connection.execute("SELECT DISTINCT symbol FROM intraday_ohlc").fetchall()
+        assert sorted(row[0] for row in symbols) == ["A", "B", "C", "D"]
+    finally:
+        db_manager.close_connection()
+
+def test_history_and_rollup_count_unchanged_rows(tmp_path):
+    full = _store(str(tmp_path / "full.db"), "full")
+    delta = _store(str(tmp_path / "delta.db"), "delta")
+    try:
+        history = delta.get_symbol_history("top_gainers", ["A", "C"], "2025-07-01", "2025-07-07", ["ltp"])
+        assert history == full.get_symbol_history("top_gainers", ["A", "C"], "2025-07-01", "2025-07-07", ["ltp"])
+        # A and C are stored once in delta mode but priced in every snapshot
+        assert history["symbol"].count("A") == 6 and history["symbol"].count("C") == 6
+
+        # Only the requested symbols' rows are rebuilt, removals and reorderings included
+        for symbols in (["B"], ["D", "B"]):
+            assert delta.get_symbol_history("top_gainers", symbols, "2025-07-01", "2025-07-07", ["ltp"]) == \
+                full.get_symbol_history("top_gainers", symbols, "2025-07-01", "2025-07-07", ["ltp"])
+        snapshot_ids = [row[0] for row in delta.db_connection.execute("SELECT id FROM snapshots ORDER BY id")]
+        states = delta._rebuild_snapshots(delta.db_connection, "top_gainers", snapshot_ids, ["D"])
+        assert [[record["symbol"] for record in states[snapshot_id].records()] for snapshot_id in snapshot_ids] == \
+            [[], [], ["D"], ["D"], ["D"], ["D"]]
+
+        assert delta.apply_retention("top_gainers", "2025-07-07T00:00:00")["rollups"] == \
+            full.apply_retention("top_gainers", "2025-07-07T00:00:00")["rollups"]
+        bars = "SELECT symbol, day, open, high, low, close, volume, samples, first_at, last_at FROM intraday_ohlc ORDER BY symbol, day"
+        assert delta.db_connection.execute(bars).fetchall() == full.db_connection.execute(bars).fetchall()
+    finally:
+        full.close_connection()
+        delta.close_connection()
+
+if __name__ == "__main__":
+    print("Running tests for delta snapshot storage")
+    import pytest
+    pytest.main([__file__])
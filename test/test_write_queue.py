@@ -0,0 +1,72 @@
+import sys
+import os
+import time
+import threading
+from functools import partial
+
+# Setup path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Utils.db import DatabaseManager
+from Utils.write_queue import SnapshotWriteQueue
+
+def _snapshot(symbol: str, data_type: str = "gainers") -> dict:
+    return {"timestamp": f"2025-07-11T20:00:00 {symbol}", "data_type": data_type, "data": [{"symbol": symbol}]}
+
+class SlowDatabase:
+    """Blocks every batch until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.batches = []
+
+    def save_batch(self, snapshots):
+        self.release.wait(5)
+        self.batches.append(snapshots)
+
+def test_writer_coalesces_datasets_into_one_transaction(tmp_path):
+    db_manager = DatabaseManager(db_path=str(tmp_path / "nse_data.db"))
+    writes = SnapshotWriteQueue(db_manager_factory=lambda: db_manager)
+    writes.start()
+    saved = []
+    blocker = threading.Event()
+    # Hold the writer on the first snapshot so the rest pile up into one batch
+    writes.enqueue(_snapshot("FIRST"), "top_gainers", on_saved=blocker.wait)
+    time.sleep(0.1)
+    writes.enqueue(_snapshot("UP"), "top_gainers", "g", on_saved=partial(saved.append, "gainers"))
+    writes.enqueue(_snapshot("DOWN", "loosers"), "top_loosers", "l", on_saved=partial(saved.append, "loosers"))
+    blocker.set()
+
+    assert writes.flush(5)
+    writes.stop()
+    assert saved == ["gainers", "loosers"]
+    assert writes.status()["written"] == 3
+    assert writes.status()["batches"] == 2
+    assert writes.status()["depth"] == 0
+    assert db_manager.get_latest_snapshot("top_loosers")["payload_hash"] == "l"
+    db_manager.close_connection()
+
+def test_full_queue_drops_without_blocking():
+    database = SlowDatabase()
+    writes = SnapshotWriteQueue(db_manager_factory=lambda: database)
+    writes._queue.maxsize = 1
+    writes.start()
+
+    assert writes.enqueue(_snapshot("A"), "top_gainers")
+    time.sleep(0.1)  # Writer takes A and blocks
+    assert writes.enqueue(_snapshot("B"), "top_gainers")
+    started = time.perf_counter()
+    assert not writes.enqueue(_snapshot("C"), "top_gainers")
+    # Request handlers call enqueue on the event loop, so a full queue must not wait for room
+    assert time.perf_counter() - started < 0.05
+    assert writes.status()["dropped"] == 1
+
+    database.release.set()
+    writes.stop()
+    # Shutdown flushed B before the writer exited
+    assert sum(len(batch) for batch in database.batches) == 2
+
+if __name__ == "__main__":
+    print("Running tests for snapshot write queue")
+    import pytest
+    pytest.main([__file__])